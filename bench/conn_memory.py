@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""Memory cost of an idle client connection.
+
+Two measurements:
+
+  objects  Python heap per connection (tracemalloc) for the state the server
+           keeps: ClientConnection with its outbound queue, rate limiter and
+           scheduler inbox, plus the connection's MessageReader, after a
+           login, a channel join, one frame in and one frame out.
+  server   Resident memory of a server process (child process, Linux) per
+           idle logged-in connection, which also counts the connection's
+           reader thread and socket buffers.
+
+Usage:
+    python -m bench.conn_memory
+    python -m bench.conn_memory --connections 5000 --output memory.json
+"""
+
+import argparse
+import gc
+import json
+import multiprocessing
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+import tracemalloc
+
+from shared.protocol import MessageReader, encode_message
+from shared.constants import (
+    DEFAULT_CHANNEL, MSG_AUTH_RESUME, MSG_HISTORY_CHUNK, MSG_MESSAGE,
+)
+
+USERNAME = "idler"
+
+
+def measure_objects(count: int) -> dict:
+    from server_app.chat_server import ClientConnection
+    from server_app.scheduler import FairScheduler
+
+    scheduler = FairScheduler(lambda item: None)
+    pairs = [socket.socketpair() for _ in range(count)]
+    frame = encode_message({"type": MSG_MESSAGE, "channel": DEFAULT_CHANNEL, "content": "hello"})
+    row = {"username": USERNAME}
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    conns = []
+    for i, (a, b) in enumerate(pairs):
+        conn = ClientConnection(a, ("127.0.0.1", 40000 + i), None, scheduler.inbox())
+        reader = MessageReader(a)
+        b.sendall(frame)
+        next(reader)  # one frame in
+        conn.username = "".join(row["username"])  # a fresh string, as from a database row
+        conn.authenticated = True
+        conn.current_channel = DEFAULT_CHANNEL.upper().lower()
+        conn.rate_limiter.is_allowed()
+        conn.outbound.push(frame)  # one frame out
+        conns.append((conn, reader))
+    gc.collect()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    total = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    for a, b in pairs:
+        a.close()
+        b.close()
+    return {"connections": count, "bytes_per_connection": round(total / count)}
+
+
+def _rss_bytes(pid: int) -> int:
+    with open(f"/proc/{pid}/status", encoding="ascii") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) * 1024
+    raise RuntimeError("VmRSS not found")
+
+
+def _serve(db_path: str, ports):
+    import contextlib
+    import io
+    from server_app.chat_server import ChatServer
+
+    with contextlib.redirect_stdout(io.StringIO()):  # server logging
+        srv = ChatServer(port=0, db_path=db_path, metrics_port=None)
+        thread = threading.Thread(target=srv.start, daemon=True)
+        thread.start()
+        while not srv.running:
+            time.sleep(0.01)
+        ports.put(srv.server_sock.getsockname()[1])
+        thread.join()
+
+
+def measure_server(count: int) -> dict:
+    from server_app.auth import hash_password, generate_session_token
+    from server_app.database import Database
+
+    scratch = tempfile.mkdtemp(prefix="chat-bench-")
+    db_path = os.path.join(scratch, "chat.db")
+    db = Database(db_path)
+    db.create_user(USERNAME, hash_password("bench123"))
+    user_id = db.get_user_by_username(USERNAME)["id"]
+    tokens = [generate_session_token() for _ in range(count)]
+    for token in tokens:
+        db.create_session(token, user_id)
+
+    ports = multiprocessing.Queue()
+    server = multiprocessing.Process(target=_serve, args=(db_path, ports), daemon=True)
+    server.start()
+    port = ports.get(timeout=30)
+    socks = []
+    try:
+        # Warm up with one connection so one-off allocations are not counted
+        for token in tokens[:1] + tokens:
+            sock = socket.create_connection(("127.0.0.1", port))
+            sock.sendall(encode_message({"type": MSG_AUTH_RESUME, "token": token}))
+            for msg in MessageReader(sock):
+                if msg.get("type") == MSG_HISTORY_CHUNK and msg.get("last"):
+                    break
+            socks.append(sock)
+            if len(socks) == 1:
+                time.sleep(0.5)
+                baseline = _rss_bytes(server.pid)
+        time.sleep(1.0)
+        loaded = _rss_bytes(server.pid)
+    finally:
+        for sock in socks:
+            sock.close()
+        server.terminate()
+        server.join()
+        shutil.rmtree(scratch, ignore_errors=True)
+    return {
+        "connections": count,
+        "rss_baseline_mb": round(baseline / 2**20, 1),
+        "rss_loaded_mb": round(loaded / 2**20, 1),
+        "bytes_per_connection": round((loaded - baseline) / count),
+    }
+
+
+def build_parser() -> argparse.ArgumentParser:
+    ap = argparse.ArgumentParser(description="Memory per idle client connection")
+    ap.add_argument("--mode", choices=("both", "objects", "server"), default="both",
+                    help="Heap objects, whole-server RSS, or both (default: both)")
+    ap.add_argument("--connections", type=int, default=1000, help="Idle connections to open (default: 1000)")
+    ap.add_argument("--output", help="Write the JSON result to this file")
+    return ap
+
+
+def main(argv=None):
+    opts = build_parser().parse_args(argv)
+    results = {}
+    if opts.mode in ("both", "objects"):
+        results["objects"] = measure_objects(opts.connections)
+    if opts.mode in ("both", "server"):
+        results["server"] = measure_server(opts.connections)
+    text = json.dumps(results, indent=2)
+    print(text)
+    if opts.output:
+        with open(opts.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""Chat content processing cost: shared.content against the previous
+per-character sanitize_content.
+
+For each sample text, times the previous sanitizer (a generator over every
+character), content.clean(), and content.clean() plus content.parse() (the
+whole pipeline the server runs on each chat message), using the
+micro-benchmark runner.
+
+Usage:
+    python -m bench.content_pipeline
+    python -m bench.content_pipeline --output content.json
+"""
+
+import argparse
+import json
+
+from bench.micro import measure
+from shared import content
+from shared.constants import MESSAGE_MAX_LEN
+
+_PROSE = "The quick brown fox jumps over the lazy dog. "
+
+
+def sanitize_reference(text: str) -> str:
+    """The previous sanitize_content."""
+    return "".join(ch for ch in text if ch in ('\n', '\t') or (ord(ch) >= 32))
+
+
+def samples() -> dict[str, str]:
+    return {
+        "short_ascii": _PROSE * 2,
+        "max_ascii": (_PROSE * 50)[:MESSAGE_MAX_LEN],
+        "max_ascii_lines": ((_PROSE + "\n") * 50)[:MESSAGE_MAX_LEN],
+        "max_ascii_controls": ((_PROSE + "\x07\x1b[0m\n") * 50)[:MESSAGE_MAX_LEN],
+        "max_unicode": ("Grüße aus Köln, schönes Wetter heute \U0001F600 " * 50)[:MESSAGE_MAX_LEN],
+        "max_unicode_lines": ("Grüße aus Köln \U0001F600\n" * 100)[:MESSAGE_MAX_LEN],
+        "max_markup": (("hey @alice_01 see https://example.com/a?b=1, run `make test` "
+                        "```\nprint('@nobody')\n``` ") * 20)[:MESSAGE_MAX_LEN],
+    }
+
+
+def run(opts) -> dict:
+    results = {}
+    for name, text in samples().items():
+        if content.clean(text) != sanitize_reference(text):
+            raise RuntimeError(f"{name}: clean() differs from the reference")
+        row = {}
+        for label, fn in (
+            ("reference_us", lambda: sanitize_reference(text)),
+            ("clean_us", lambda: content.clean(text)),
+            ("clean_parse_us", lambda: content.parse(content.clean(text))),
+        ):
+            row[label] = measure(fn, opts.warmup, opts.min_time, opts.repeat)["median_us"]
+        row["speedup"] = round(row["reference_us"] / row["clean_us"], 1)
+        row["entities"] = len(content.parse(content.clean(text)))
+        results[name] = row
+        print(f"{name:<20}{row['reference_us']:>10.2f} us{row['clean_us']:>10.2f} us"
+              f"{row['clean_parse_us']:>10.2f} us{row['speedup']:>8}x")
+    return results
+
+
+def build_parser() -> argparse.ArgumentParser:
+    ap = argparse.ArgumentParser(description="Content pipeline against the per-character sanitizer")
+    ap.add_argument("--warmup", type=float, default=0.2, help="Warmup seconds per measurement (default: 0.2)")
+    ap.add_argument("--min-time", type=float, default=0.1, help="Target seconds per round (default: 0.1)")
+    ap.add_argument("--repeat", type=int, default=5, help="Timed rounds per measurement (default: 5)")
+    ap.add_argument("--output", help="Write the JSON result to this file")
+    return ap
+
+
+def main(argv=None):
+    opts = build_parser().parse_args(argv)
+    print(f"{'sample':<20}{'reference':>13}{'clean':>13}{'clean+parse':>13}{'speedup':>9}")
+    results = run(opts)
+    if opts.output:
+        with open(opts.output, "w", encoding="utf-8") as f:
+            f.write(json.dumps(results, indent=2) + "\n")
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""Request latency of ordinary clients while other clients flood the server.
+
+Starts a server in a child process (so the load generator's threads do
+not compete with it for the GIL) on a scratch database, then connects:
+
+  - spammers that pipeline expensive requests (channel joins and user-list
+    refreshes), keeping a window of them in flight at all times
+  - normal clients that send one channel_list request at a time and time
+    the reply, matched by its ref
+
+and reports the normal clients' round-trip latency and how many requests
+each side got through. By default the run is repeated with the fair
+scheduler and with frames handled on each connection's own thread
+(workers=0).
+
+Usage:
+    python -m bench.fairness
+    python -m bench.fairness --spammers 8 --duration 20 --output fair.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+
+from bench.loadgen import summarize
+from shared.protocol import MessageReader, encode_message
+from shared.constants import (
+    DEFAULT_CHANNEL, MESSAGE_HISTORY_LIMIT,
+    MSG_AUTH_LOGIN, MSG_AUTH_RESULT, MSG_CHANNEL_JOIN, MSG_CHANNEL_LIST, MSG_CHANNEL_INFO,
+    MSG_HISTORY_CHUNK, MSG_USER_LIST,
+)
+from server_app.scheduler import WORKERS
+
+PASSWORD = "bench123"
+
+
+def _seed(db_path: str, usernames: list[str]):
+    from server_app.auth import hash_password
+    from server_app.database import Database
+
+    db = Database(db_path)
+    hashed = hash_password(PASSWORD)  # one bcrypt run for every account
+    for name in usernames:
+        db.create_user(name, hashed)
+    user = db.get_user_by_username(usernames[0])
+    channel = db.get_channel_by_name(DEFAULT_CHANNEL)
+    for i in range(MESSAGE_HISTORY_LIMIT):
+        db.save_message(channel["id"], user["id"], f"{i:04d} " + "h" * 200)
+
+
+def _serve(db_path: str, workers: int, ports):
+    """Child process: run a server and report its port."""
+    from server_app.chat_server import ChatServer
+
+    with contextlib.redirect_stdout(io.StringIO()):  # server logging
+        srv = ChatServer(port=0, db_path=db_path, metrics_port=None, workers=workers,
+                         handler_budget=1e9, queue_budget=1e9)  # measure without shedding
+        thread = threading.Thread(target=srv.start, daemon=True)
+        thread.start()
+        while not srv.running:
+            time.sleep(0.01)
+        ports.put(srv.server_sock.getsockname()[1])
+        thread.join()
+
+
+class _Client:
+    def __init__(self, port: int, username: str):
+        self.sock = socket.create_connection(("127.0.0.1", port))
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.reader = MessageReader(self.sock)
+        self.send({"type": MSG_AUTH_LOGIN, "username": username, "password": PASSWORD})
+        for msg in self.reader:
+            if msg.get("type") == MSG_AUTH_RESULT:
+                if not msg.get("success"):
+                    raise RuntimeError(f"login {username}: {msg.get('error')}")
+                break
+
+    def send(self, msg: dict):
+        self.sock.sendall(encode_message(msg))
+
+    def close(self):
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+
+def run_mode(opts, workers: int) -> dict:
+    spam_names = [f"spam{i}" for i in range(opts.spammers)]
+    normal_names = [f"user{i}" for i in range(opts.clients)]
+    scratch = tempfile.mkdtemp(prefix="chat-bench-")
+    db_path = os.path.join(scratch, "chat.db")
+    _seed(db_path, normal_names + spam_names)
+    ports = multiprocessing.Queue()
+    server = multiprocessing.Process(target=_serve, args=(db_path, workers, ports), daemon=True)
+    server.start()
+    port = ports.get(timeout=30)
+
+    stop = threading.Event()
+    measuring = threading.Event()
+    samples = []
+    counts = {"normal": 0, "spam": 0}
+    lock = threading.Lock()
+    clients = []
+
+    def spam(client, window):
+        requests = ({"type": MSG_CHANNEL_JOIN, "channel": DEFAULT_CHANNEL},
+                    {"type": MSG_USER_LIST, "channel": DEFAULT_CHANNEL})
+        i = 0
+        while not stop.is_set():
+            if not window.acquire(timeout=0.5):
+                continue
+            try:
+                client.send(requests[i % 2])
+            except OSError:
+                return
+            i += 1
+
+    def drain(client, window):
+        try:
+            for msg in client.reader:
+                if stop.is_set():
+                    return
+                msg_type = msg.get("type")
+                if msg_type == MSG_USER_LIST or (msg_type == MSG_HISTORY_CHUNK and msg.get("last")):
+                    window.release()
+                    if measuring.is_set():
+                        with lock:
+                            counts["spam"] += 1
+        except (OSError, ValueError):
+            pass
+
+    def normal(client):
+        ref = 0
+        while not stop.is_set():
+            ref += 1
+            sent = time.perf_counter()
+            try:
+                client.send({"type": MSG_CHANNEL_LIST, "ref": ref})
+                for msg in client.reader:
+                    if msg.get("type") == MSG_CHANNEL_INFO and msg.get("ref") == ref:
+                        break
+                else:
+                    return
+            except (OSError, ValueError):
+                return
+            if measuring.is_set():
+                with lock:
+                    samples.append(time.perf_counter() - sent)
+                    counts["normal"] += 1
+            time.sleep(opts.think)
+
+    threads = []
+    try:
+        for name in spam_names:
+            client = _Client(port, name)
+            clients.append(client)
+            window = threading.Semaphore(opts.window)
+            threads += [threading.Thread(target=spam, args=(client, window), daemon=True),
+                        threading.Thread(target=drain, args=(client, window), daemon=True)]
+        for name in normal_names:
+            client = _Client(port, name)
+            clients.append(client)
+            threads.append(threading.Thread(target=normal, args=(client,), daemon=True))
+        for t in threads:
+            t.start()
+        time.sleep(opts.warmup)
+        measuring.set()
+        time.sleep(opts.duration)
+        measuring.clear()
+    finally:
+        stop.set()
+        for client in clients:
+            client.close()
+        server.terminate()
+        server.join()
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    return {
+        "workers": workers,
+        "normal_requests_per_sec": round(counts["normal"] / opts.duration, 1),
+        "spam_replies_per_sec": round(counts["spam"] / opts.duration, 1),
+        "latency_ms": summarize(samples),
+    }
+
+
+def build_parser() -> argparse.ArgumentParser:
+    ap = argparse.ArgumentParser(description="Normal-client latency while other clients flood the server")
+    ap.add_argument("--mode", choices=("both", "fair", "inline"), default="both",
+                    help="Fair scheduler, per-connection threads, or one run each (default: both)")
+    ap.add_argument("--workers", type=int, default=WORKERS, help=f"Scheduler workers in fair mode (default: {WORKERS})")
+    ap.add_argument("--spammers", type=int, default=4, help="Flooding connections (default: 4)")
+    ap.add_argument("--window", type=int, default=32, help="Requests each spammer keeps in flight (default: 32)")
+    ap.add_argument("--clients", type=int, default=8, help="Normal connections (default: 8)")
+    ap.add_argument("--think", type=float, default=0.05, help="Normal client pause between requests in seconds (default: 0.05)")
+    ap.add_argument("--duration", type=float, default=10, help="Measurement window per mode in seconds (default: 10)")
+    ap.add_argument("--warmup", type=float, default=1.0, help="Seconds before measuring (default: 1)")
+    ap.add_argument("--output", help="Write the JSON result to this file")
+    return ap
+
+
+def main(argv=None):
+    opts = build_parser().parse_args(argv)
+    modes = {"both": ("fair", "inline"), "fair": ("fair",), "inline": ("inline",)}[opts.mode]
+    results = {}
+    for mode in modes:
+        results[mode] = run_mode(opts, opts.workers if mode == "fair" else 0)
+    text = json.dumps(results, indent=2)
+    print(text)
+    if opts.output:
+        with open(opts.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    return results
+
+
+if __name__ == "__main__":
+    main()
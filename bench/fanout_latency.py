@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""Broadcast delivery latency against channel size.
+
+Connects N socket pairs (optionally TLS), wraps the server ends in
+outbound queues as the server does, and times how long one broadcast takes
+to reach every recipient's socket, with fan-out on a single thread and in
+parallel shards. The receiving ends are drained between broadcasts, off
+the clock.
+
+Usage:
+    python -m bench.fanout_latency
+    python -m bench.fanout_latency --members 1000,10000 --tls --output fanout.json
+"""
+
+import argparse
+import json
+import socket
+import ssl
+import threading
+import time
+from types import SimpleNamespace
+
+from bench.loadgen import summarize
+from server_app.fanout import FanoutPool, SHARD_SIZE
+from server_app.outbound import OutboundQueue, LANE_CHAT
+from shared.protocol import encode_message
+from shared.constants import MSG_MESSAGE
+
+
+def _pairs(count: int, opts) -> list[tuple]:
+    """(server end, client end) socket pairs, TLS-wrapped if requested."""
+    server_ctx = client_ctx = None
+    if opts.tls:
+        server_ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        server_ctx.load_cert_chain(opts.cert, opts.key)
+        client_ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+        client_ctx.check_hostname = False
+        client_ctx.verify_mode = ssl.CERT_NONE
+    pairs = []
+    for _ in range(count):
+        a, b = socket.socketpair()
+        if opts.tls:
+            wrapped = {}
+            t = threading.Thread(target=lambda: wrapped.setdefault("b", client_ctx.wrap_socket(b)))
+            t.start()
+            a = server_ctx.wrap_socket(a, server_side=True)
+            t.join()
+            b = wrapped["b"]
+        b.setblocking(False)
+        pairs.append((a, b))
+    return pairs
+
+
+def _drain(clients):
+    for sock in clients:
+        try:
+            while sock.recv(65536):
+                pass
+        except (BlockingIOError, ssl.SSLWantReadError):
+            pass
+
+
+def run_size(opts, members: int) -> dict:
+    pairs = _pairs(members, opts)
+    targets = [SimpleNamespace(outbound=OutboundQueue(a)) for a, _ in pairs]
+    clients = [b for _, b in pairs]
+    data = encode_message({"type": MSG_MESSAGE, "channel": "general", "username": "bench",
+                           "content": "x" * opts.size, "timestamp": "2024-01-01T00:00:00"})
+    result = {}
+    try:
+        for name, workers in (("serial", 0), ("parallel", opts.workers)):
+            pool = FanoutPool(workers, opts.shard_size)
+            samples = []
+            for _ in range(opts.rounds):
+                start = time.perf_counter()
+                dead = pool.deliver(targets, data, LANE_CHAT)
+                samples.append(time.perf_counter() - start)
+                if dead:
+                    raise RuntimeError(f"{len(dead)} writes failed")
+                _drain(clients)
+            pool.shutdown()
+            result[name] = summarize(samples)
+    finally:
+        for a, b in pairs:
+            a.close()
+            b.close()
+    return result
+
+
+def build_parser() -> argparse.ArgumentParser:
+    ap = argparse.ArgumentParser(description="Broadcast delivery latency against channel size")
+    ap.add_argument("--members", default="100,1000,5000", help="Comma-separated channel sizes (default: 100,1000,5000)")
+    ap.add_argument("--workers", type=int, default=4, help="Fan-out threads in parallel mode (default: 4)")
+    ap.add_argument("--shard-size", type=int, default=SHARD_SIZE, help=f"Recipients per shard (default: {SHARD_SIZE})")
+    ap.add_argument("--rounds", type=int, default=30, help="Broadcasts per size and mode (default: 30)")
+    ap.add_argument("--size", type=int, default=200, help="Message content length (default: 200)")
+    ap.add_argument("--tls", action="store_true", help="Wrap every connection in TLS")
+    ap.add_argument("--cert", default="certs/server.crt", help="TLS certificate file")
+    ap.add_argument("--key", default="certs/server.key", help="TLS private key file")
+    ap.add_argument("--output", help="Write the JSON result to this file")
+    return ap
+
+
+def main(argv=None):
+    opts = build_parser().parse_args(argv)
+    results = {}
+    for members in (int(n) for n in opts.members.split(",")):
+        results[str(members)] = run_size(opts, members)
+    text = json.dumps({"tls": opts.tls, "workers": opts.workers, "shard_size": opts.shard_size,
+                       "latency_ms": results}, indent=2)
+    print(text)
+    if opts.output:
+        with open(opts.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    return results
+
+
+if __name__ == "__main__":
+    main()
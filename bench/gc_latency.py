@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""Delivery latency with the default and the tuned garbage collector.
+
+Starts a server in a child process (so the load generator's threads do
+not compete with it for the GIL) on a scratch database, drives it with the
+load harness (bench.loadgen), then reads the server's GC pause histogram
+from /metrics. The run is repeated with --gc-tuned, using a short warmup
+so the second freeze happens before measuring starts.
+
+Usage:
+    python -m bench.gc_latency
+    python -m bench.gc_latency --users 200 --duration 60 --output gc.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import urllib.request
+
+from bench import loadgen
+
+_SAMPLE = re.compile(r'^chat_gc_pause_seconds_(sum|count)\{generation="(\d)"\} (\S+)$')
+
+
+def _serve(db_path: str, gc_tuned: bool, gc_warmup: float, ports):
+    """Child process: run a server and report its chat and metrics ports."""
+    from server_app.chat_server import ChatServer
+
+    with contextlib.redirect_stdout(io.StringIO()):  # server logging
+        srv = ChatServer(port=0, db_path=db_path, metrics_port=0,
+                         gc_tuned=gc_tuned, gc_warmup=gc_warmup)
+        thread = threading.Thread(target=srv.start, daemon=True)
+        thread.start()
+        while not srv.running or srv.metrics_server is None:
+            time.sleep(0.01)
+        ports.put((srv.server_sock.getsockname()[1], srv.metrics_server.port))
+        thread.join()
+
+
+def gc_pauses(metrics_port: int) -> dict:
+    """Collections and total / mean pause per generation from /metrics."""
+    with urllib.request.urlopen(f"http://127.0.0.1:{metrics_port}/metrics", timeout=10) as resp:
+        text = resp.read().decode()
+    seen = {}
+    for line in text.splitlines():
+        m = _SAMPLE.match(line)
+        if m:
+            seen.setdefault(m.group(2), {})[m.group(1)] = float(m.group(3))
+    pauses = {}
+    for generation, v in sorted(seen.items()):
+        count = int(v.get("count", 0))
+        pauses[generation] = {
+            "collections": count,
+            "total_ms": round(v.get("sum", 0) * 1000, 2),
+            "mean_ms": round(v.get("sum", 0) * 1000 / count, 3) if count else None,
+        }
+    return pauses
+
+
+def run_mode(opts, gc_tuned: bool) -> dict:
+    scratch = tempfile.mkdtemp(prefix="chat-bench-")
+    ports = multiprocessing.Queue()
+    server = multiprocessing.Process(
+        target=_serve, args=(os.path.join(scratch, "chat.db"), gc_tuned, opts.gc_warmup, ports), daemon=True)
+    server.start()
+    port, metrics_port = ports.get(timeout=30)
+    try:
+        load_opts = loadgen.build_parser().parse_args([
+            "--port", str(port), "--users", str(opts.users), "--ramp", str(opts.ramp),
+            "--settle", str(max(opts.settle, opts.gc_warmup)), "--duration", str(opts.duration),
+            "--msg-rate", str(opts.msg_rate), "--auth", "register",
+            "--label", "gc-tuned" if gc_tuned else "gc-default",
+        ])
+        result = loadgen.run(load_opts)
+        pauses = gc_pauses(metrics_port)
+    finally:
+        server.terminate()
+        server.join()
+        shutil.rmtree(scratch, ignore_errors=True)
+    return {
+        "delivered_per_sec": result["throughput"]["delivered_per_sec"],
+        "fanout_latency_ms": result["latency_ms"]["fanout"],
+        "gc_pauses": pauses,
+    }
+
+
+def build_parser() -> argparse.ArgumentParser:
+    ap = argparse.ArgumentParser(description="Delivery latency with the default and the tuned garbage collector")
+    ap.add_argument("--mode", choices=("both", "default", "tuned"), default="both",
+                    help="Default collector, --gc-tuned, or one run each (default: both)")
+    ap.add_argument("--users", type=int, default=40, help="Simulated users (default: 40)")
+    ap.add_argument("--ramp", type=float, default=10, help="User arrival rate per second (default: 10)")
+    ap.add_argument("--settle", type=float, default=15,
+                    help="Seconds after ramp before measuring; covers the bcrypt of every registration (default: 15)")
+    ap.add_argument("--duration", type=float, default=30, help="Measurement window in seconds (default: 30)")
+    ap.add_argument("--msg-rate", type=float, default=2.0, help="Chat sends per user per second (default: 2)")
+    ap.add_argument("--gc-warmup", type=float, default=3.0,
+                    help="Seconds before the tuned server's second freeze (default: 3)")
+    ap.add_argument("--output", help="Write the JSON result to this file")
+    return ap
+
+
+def main(argv=None):
+    opts = build_parser().parse_args(argv)
+    results = {}
+    if opts.mode in ("both", "default"):
+        results["default"] = run_mode(opts, gc_tuned=False)
+    if opts.mode in ("both", "tuned"):
+        results["tuned"] = run_mode(opts, gc_tuned=True)
+    text = json.dumps(results, indent=2)
+    print(text)
+    if opts.output:
+        with open(opts.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    return results
+
+
+if __name__ == "__main__":
+    main()
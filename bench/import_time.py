@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""Import-time benchmark for the client and server entry points.
+
+Each target is imported in a fresh interpreter under `python -X importtime`
+several times; the median cumulative import time is reported together with
+the slowest modules of the median run. Targets that must stay headless are
+also checked for forbidden modules (Tk, customtkinter, plyer).
+
+Usage:
+    python -m bench.import_time                         # all targets
+    python -m bench.import_time -k cli --top 15         # one target, more detail
+    python -m bench.import_time --startup               # also time ChatApp() to login screen (needs a display)
+    python -m bench.import_time --save base.json
+    python -m bench.import_time --compare base.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# name -> (module, modules that must not be loaded)
+TARGETS = {
+    "gui": ("client_app.ui.app", ()),
+    "cli": ("client_app.cli", ("tkinter", "customtkinter", "plyer")),
+    "sdk": ("client_app.aio_client", ("tkinter", "customtkinter", "plyer")),
+    "server": ("server_app.chat_server", ("tkinter", "customtkinter", "plyer")),
+}
+
+_STARTUP_SNIPPET = """
+import time
+start = time.perf_counter()
+from client_app.ui.app import ChatApp
+app = ChatApp()
+app.root.update()
+print(time.perf_counter() - start)
+app.root.destroy()
+"""
+
+
+def parse_importtime(stderr: str) -> list[tuple[str, int, int, int]]:
+    """Parse -X importtime output into (module, self us, cumulative us, depth)."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3:
+            continue
+        name = parts[2].rstrip()
+        depth = (len(name) - len(name.lstrip(" "))) // 2
+        rows.append((name.strip(), int(parts[0]), int(parts[1]), depth))
+    return rows
+
+
+def run_target(module: str) -> tuple[list, list[str]]:
+    """Import `module` in a fresh interpreter; return importtime rows and sys.modules."""
+    code = f"import sys, json, {module}; print(json.dumps(sorted(sys.modules)))"
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    return parse_importtime(proc.stderr), json.loads(proc.stdout)
+
+
+def measure_target(module: str, forbidden, repeat: int, top: int) -> dict:
+    runs = []
+    loaded = []
+    for _ in range(repeat):
+        rows, loaded = run_target(module)
+        # Sum the top-level imports triggered by the -c snippet (depth 0)
+        total = sum(cum for _, _, cum, depth in rows if depth == 0)
+        runs.append((total, rows))
+    runs.sort(key=lambda r: r[0])
+    median_total, median_rows = runs[len(runs) // 2]
+    slowest = sorted(median_rows, key=lambda r: r[1], reverse=True)[:top]
+    return {
+        "module": module,
+        "median_ms": round(median_total / 1000, 2),
+        "best_ms": round(runs[0][0] / 1000, 2),
+        "modules_loaded": len(loaded),
+        "forbidden_loaded": sorted(m for m in loaded if m.split(".")[0] in forbidden),
+        "slowest_self_ms": [(name, round(self_us / 1000, 2)) for name, self_us, _, _ in slowest],
+    }
+
+
+def measure_startup(repeat: int) -> dict:
+    """Time from interpreter start to the login screen being drawn once."""
+    samples = []
+    for _ in range(repeat):
+        proc = subprocess.run([sys.executable, "-c", _STARTUP_SNIPPET], cwd=ROOT, capture_output=True, text=True)
+        if proc.returncode != 0:
+            return {"error": (proc.stderr.strip().splitlines() or ["failed"])[-1]}
+        samples.append(float(proc.stdout.strip()) * 1000)
+    return {"median_ms": round(statistics.median(samples), 2), "best_ms": round(min(samples), 2)}
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> tuple[str, int]:
+    lines = [f"{'target':<12}{'baseline ms':>13}{'current ms':>13}{'change':>10}"]
+    regressions = 0
+    for name, cur in results.items():
+        old = baseline.get("results", {}).get(name)
+        if not old or "median_ms" not in old or "median_ms" not in cur:
+            continue
+        change = (cur["median_ms"] - old["median_ms"]) / old["median_ms"] * 100 if old["median_ms"] else 0.0
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        elif change < -threshold:
+            flag = "  faster"
+        lines.append(f"{name:<12}{old['median_ms']:>13.2f}{cur['median_ms']:>13.2f}{change:>+9.1f}%{flag}")
+    return "\n".join(lines), regressions
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Client/server import-time benchmark")
+    ap.add_argument("-k", "--filter", default="", help="Only targets whose name contains this")
+    ap.add_argument("--repeat", type=int, default=7, help="Fresh interpreters per target (default: 7)")
+    ap.add_argument("--top", type=int, default=8, help="Slowest modules listed per target (default: 8)")
+    ap.add_argument("--startup", action="store_true", help="Also time GUI start to login screen (needs a display)")
+    ap.add_argument("--save", help="Write results to this JSON baseline file")
+    ap.add_argument("--compare", help="Compare against a saved baseline")
+    ap.add_argument("--threshold", type=float, default=15.0,
+                    help="Percent slowdown reported as a regression (default: 15)")
+    args = ap.parse_args(argv)
+
+    results = {}
+    failures = 0
+    for name, (module, forbidden) in TARGETS.items():
+        if args.filter not in name:
+            continue
+        r = results[name] = measure_target(module, forbidden, args.repeat, args.top)
+        print(f"{name:<8}{module:<28}{r['median_ms']:>9.2f} ms  (best {r['best_ms']:.2f}, {r['modules_loaded']} modules)")
+        for mod, ms in r["slowest_self_ms"]:
+            print(f"          {mod:<52}{ms:>8.2f} ms self")
+        if r["forbidden_loaded"]:
+            failures += 1
+            print(f"          FORBIDDEN: {', '.join(r['forbidden_loaded'])}")
+
+    if args.startup:
+        r = results["startup"] = measure_startup(args.repeat)
+        if "error" in r:
+            print(f"startup  skipped: {r['error']}")
+        else:
+            print(f"startup  ChatApp() to login screen      {r['median_ms']:>9.2f} ms  (best {r['best_ms']:.2f})")
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "results": results,
+            }, f, indent=2)
+            f.write("\n")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        report, regressions = compare(results, baseline, args.threshold)
+        print()
+        print(report)
+        failures += regressions
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""Live-message latency while channel joins stream history.
+
+Starts an in-process server on a scratch database whose default channel
+holds a full page of long messages, then connects two clients:
+
+  - an observer with a small receive buffer that reads at a capped rate and
+    keeps rejoining the channel, so a history stream is always in flight
+  - a sender that posts timestamped messages to the channel
+
+and reports how long the sender's messages take to reach the observer. By
+default the run is repeated with the server's priority lanes on and off.
+
+Usage:
+    python -m bench.join_latency
+    python -m bench.join_latency --duration 20 --read-kbps 256 --output lanes.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+
+from bench.loadgen import summarize
+from shared.protocol import MessageReader, encode_message
+from shared.constants import (
+    DEFAULT_CHANNEL, MESSAGE_HISTORY_LIMIT, RECV_BUFSIZE,
+    MSG_AUTH_REGISTER, MSG_AUTH_RESULT, MSG_CHANNEL_JOIN, MSG_HISTORY_CHUNK, MSG_MESSAGE,
+)
+
+_STAMP = "jl:"
+PASSWORD = "bench123"
+
+
+def _seed(db_path: str, content_len: int):
+    from server_app.auth import hash_password
+    from server_app.database import Database
+
+    db = Database(db_path)
+    db.create_user("seed", hash_password(PASSWORD))
+    user = db.get_user_by_username("seed")
+    channel = db.get_channel_by_name(DEFAULT_CHANNEL)
+    for i in range(MESSAGE_HISTORY_LIMIT):
+        db.save_message(channel["id"], user["id"], f"{i:04d} " + "h" * content_len)
+
+
+class _Client:
+    def __init__(self, port: int, username: str, rcvbuf: int | None = None):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        if rcvbuf:
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, rcvbuf)
+        self.sock.connect(("127.0.0.1", port))
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.reader = MessageReader(self.sock)
+        self.send({"type": MSG_AUTH_REGISTER, "username": username, "password": PASSWORD})
+        for msg in self.reader:
+            if msg.get("type") == MSG_AUTH_RESULT:
+                if not msg.get("success"):
+                    raise RuntimeError(f"register {username}: {msg.get('error')}")
+                break
+
+    def send(self, msg: dict):
+        self.sock.sendall(encode_message(msg))
+
+    def close(self):
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+
+def run_mode(opts, priority_lanes: bool) -> dict:
+    from server_app.chat_server import ChatServer
+
+    scratch = tempfile.mkdtemp(prefix="chat-bench-")
+    db_path = os.path.join(scratch, "chat.db")
+    _seed(db_path, opts.history_len)
+    srv = ChatServer(port=0, db_path=db_path, metrics_port=None, priority_lanes=priority_lanes)
+    threading.Thread(target=srv.start, daemon=True).start()
+    while not srv.running:
+        time.sleep(0.01)
+    port = srv.server_sock.getsockname()[1]
+
+    observer = _Client(port, "observer", rcvbuf=opts.rcvbuf)
+    sender = _Client(port, "sender")
+    stop = threading.Event()
+    measuring = threading.Event()
+    samples = []
+    state = {"joins": 0, "in_flight": 0, "bytes": 0}
+    lock = threading.Lock()
+
+    def observe():
+        budget = opts.read_kbps * 1024
+        while not stop.is_set():
+            try:
+                chunk = observer.sock.recv(RECV_BUFSIZE)
+            except OSError:
+                return
+            if not chunk:
+                return
+            observer.reader.feed(chunk)
+            for msg in observer.reader.drain():
+                msg_type = msg.get("type")
+                if msg_type == MSG_MESSAGE and msg.get("content", "").startswith(_STAMP):
+                    if measuring.is_set():
+                        samples.append(time.perf_counter() - float(msg["content"][len(_STAMP):]))
+                elif msg_type == MSG_HISTORY_CHUNK and msg.get("last"):
+                    with lock:
+                        state["in_flight"] = max(0, state["in_flight"] - 1)
+                        state["joins"] += measuring.is_set()
+            if measuring.is_set():
+                state["bytes"] += len(chunk)
+            time.sleep(len(chunk) / budget)  # simulate a slow link
+
+    def drain_sender():
+        for _ in sender.reader:
+            if stop.is_set():
+                return
+
+    def rejoin():
+        while not stop.is_set():
+            with lock:
+                send = state["in_flight"] < opts.joins_in_flight
+                if send:
+                    state["in_flight"] += 1
+            if send:
+                observer.send({"type": MSG_CHANNEL_JOIN, "channel": DEFAULT_CHANNEL})
+            time.sleep(0.01)
+
+    threads = [threading.Thread(target=t, daemon=True) for t in (observe, drain_sender, rejoin)]
+    for t in threads:
+        t.start()
+    try:
+        deadline = time.perf_counter() + opts.warmup + opts.duration
+        measure_at = time.perf_counter() + opts.warmup
+        while time.perf_counter() < deadline:
+            if not measuring.is_set() and time.perf_counter() >= measure_at:
+                measuring.set()
+            sender.send({"type": MSG_MESSAGE, "channel": DEFAULT_CHANNEL,
+                         "content": f"{_STAMP}{time.perf_counter():.6f}"})
+            time.sleep(1.0 / opts.msg_rate)
+        time.sleep(0.5)
+    finally:
+        stop.set()
+        observer.close()
+        sender.close()
+        srv.shutdown()
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    return {
+        "priority_lanes": priority_lanes,
+        "joins": state["joins"],
+        "observer_kb_per_sec": round(state["bytes"] / 1024 / opts.duration, 1),
+        "latency_ms": summarize(samples),
+    }
+
+
+def build_parser() -> argparse.ArgumentParser:
+    ap = argparse.ArgumentParser(description="Live-message latency during streamed channel joins")
+    ap.add_argument("--mode", choices=("both", "lanes", "fifo"), default="both",
+                    help="Priority lanes on, off, or one run each (default: both)")
+    ap.add_argument("--duration", type=float, default=10, help="Measurement window per mode in seconds (default: 10)")
+    ap.add_argument("--warmup", type=float, default=1.0, help="Seconds before measuring (default: 1)")
+    ap.add_argument("--msg-rate", type=float, default=4, help="Sender messages per second (default: 4)")
+    ap.add_argument("--read-kbps", type=float, default=512, help="Observer read rate in KiB/s (default: 512)")
+    ap.add_argument("--rcvbuf", type=int, default=32 * 1024, help="Observer SO_RCVBUF in bytes (default: 32768)")
+    ap.add_argument("--joins-in-flight", type=int, default=2, help="Rejoins the observer keeps pending (default: 2)")
+    ap.add_argument("--history-len", type=int, default=1900, help="Length of each seeded message (default: 1900)")
+    ap.add_argument("--output", help="Write the JSON result to this file")
+    return ap
+
+
+def main(argv=None):
+    opts = build_parser().parse_args(argv)
+    modes = {"both": (True, False), "lanes": (True,), "fifo": (False,)}[opts.mode]
+    results = {}
+    for lanes in modes:
+        with contextlib.redirect_stdout(io.StringIO()):  # server logging
+            results["lanes" if lanes else "fifo"] = run_mode(opts, lanes)
+    text = json.dumps(results, indent=2)
+    print(text)
+    if opts.output:
+        with open(opts.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    return results
+
+
+if __name__ == "__main__":
+    main()
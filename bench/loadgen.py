@@ -0,0 +1,392 @@
+#!/usr/bin/env python3
+"""Headless load generator speaking the chat protocol.
+
+Spawns simulated users that log in (or register), join a channel and send
+a configurable mix of channel messages, private messages and /me actions.
+Every outgoing chat payload carries its send time, so receivers measure
+end-to-end fan-out latency. Results are printed (and optionally written)
+as JSON so runs can be compared.
+
+Usage:
+    python -m bench.loadgen --users 500 --ramp 50 --duration 60 --output run.json
+    python -m bench.loadgen --users 500 --compare run.json
+"""
+
+import argparse
+import json
+import math
+import random
+import socket
+import ssl
+import sys
+import threading
+import time
+from collections import deque
+
+from shared.protocol import MessageReader, encode_message
+from shared.constants import (
+    DEFAULT_HOST, DEFAULT_PORT, RECV_BUFSIZE,
+    MSG_AUTH_LOGIN, MSG_AUTH_REGISTER, MSG_AUTH_RESULT,
+    MSG_CHANNEL_JOIN, MSG_CHANNEL_CREATE, MSG_CHANNEL_JOINED,
+    MSG_MESSAGE, MSG_PRIVATE_MESSAGE, MSG_ACTION, MSG_ERROR,
+)
+
+_STAMP = "lg:"  # content prefix: "lg:<perf_counter>:" followed by filler
+
+MIX_TYPES = {"message": MSG_MESSAGE, "pm": MSG_PRIVATE_MESSAGE, "action": MSG_ACTION}
+
+
+def percentile(sorted_values: list[float], pct: float) -> float | None:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(pct / 100.0 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def summarize(samples: list[float]) -> dict:
+    """Latency summary in milliseconds."""
+    values = sorted(samples)
+    out = {"count": len(values)}
+    for name, pct in (("p50", 50), ("p90", 90), ("p99", 99), ("p999", 99.9)):
+        v = percentile(values, pct)
+        out[name] = round(v * 1000, 3) if v is not None else None
+    out["max"] = round(values[-1] * 1000, 3) if values else None
+    return out
+
+
+def parse_mix(text: str) -> list[tuple[str, float]]:
+    """Parse 'message=80,pm=10,action=10' into (type, weight) pairs."""
+    mix = []
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in MIX_TYPES:
+            raise argparse.ArgumentTypeError(f"unknown mix entry '{name}' (expected {', '.join(MIX_TYPES)})")
+        mix.append((MIX_TYPES[name], float(weight or 1)))
+    return mix
+
+
+class Stats:
+    """Thread-safe collection of samples and counters for one run."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.fanout = []
+        self.auth = []
+        self.join = []
+        self.sent = {}
+        self.received = 0
+        self.errors = {}
+        self.connect_failures = 0
+        self.auth_failures = 0
+
+    def add(self, name: str, value: float):
+        with self._lock:
+            getattr(self, name).append(value)
+
+    def count(self, name: str, key: str, amount: int = 1):
+        with self._lock:
+            bucket = getattr(self, name)
+            bucket[key] = bucket.get(key, 0) + amount
+
+    def bump(self, name: str, amount: int = 1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+
+class SimUser(threading.Thread):
+    """One simulated user: a single thread multiplexing send and receive."""
+
+    def __init__(self, index: int, opts, stats: Stats, stop: threading.Event, measuring: threading.Event):
+        super().__init__(daemon=True)
+        self.index = index
+        self.username = f"{opts.prefix}{index}"
+        self.opts = opts
+        self.stats = stats
+        self.stop = stop
+        self.measuring = measuring
+        self.rng = random.Random(opts.seed * 1_000_003 + index)
+        self.channel = f"{opts.channel_prefix}{index % opts.channels}" if opts.channels else "general"
+        self.sock = None
+        self.reader = None
+        self._unclaimed = deque()  # frames read (and observed) but not yet returned by _wait_for
+        self._filler = "x" * max(0, opts.size)
+
+    # --- I/O helpers ---
+
+    def _connect(self):
+        raw = socket.create_connection((self.opts.host, self.opts.port), timeout=self.opts.timeout)
+        raw.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        if self.opts.tls:
+            ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+            ctx.check_hostname = False
+            ctx.verify_mode = ssl.CERT_NONE
+            raw = ctx.wrap_socket(raw, server_hostname=self.opts.host)
+        self.sock = raw
+        self.reader = MessageReader(raw)
+
+    def _send(self, msg: dict):
+        self.sock.sendall(encode_message(msg))
+
+    def _read_some(self, timeout: float) -> list[dict]:
+        """Wait up to `timeout` for data and return any complete frames."""
+        if self.opts.tls and self.sock.pending():
+            timeout = 0
+        self.sock.settimeout(max(timeout, 0.001))
+        try:
+            chunk = self.sock.recv(RECV_BUFSIZE)
+        except (socket.timeout, ssl.SSLWantReadError):
+            return []
+        if not chunk:
+            raise ConnectionError("server closed connection")
+        self.reader.feed(chunk)
+        return list(self.reader.drain())
+
+    def _wait_for(self, msg_type: str, timeout: float, match=None) -> dict | None:
+        """Return the first frame of `msg_type` (accepted by `match`), or None
+        after `timeout`. One read can hold several frames, such as auth_result
+        and the login's channel_joined; frames after a match stay queued for
+        the next call. Every frame is observed once, when it is read."""
+        deadline = time.perf_counter() + timeout
+        while True:
+            while self._unclaimed:
+                msg = self._unclaimed.popleft()
+                if msg.get("type") == msg_type and (match is None or match(msg)):
+                    return msg
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                return None
+            for msg in self._read_some(remaining):
+                self._observe(msg)
+                self._unclaimed.append(msg)
+
+    def _observe(self, msg: dict):
+        """Record latency for stamped chat payloads and count errors."""
+        msg_type = msg.get("type")
+        if msg_type in (MSG_MESSAGE, MSG_ACTION, MSG_PRIVATE_MESSAGE):
+            if msg_type == MSG_PRIVATE_MESSAGE and msg.get("to"):
+                return  # sender echo, not a delivery
+            content = msg.get("content", "")
+            if content.startswith(_STAMP):
+                try:
+                    sent_at = float(content[len(_STAMP):content.index(":", len(_STAMP))])
+                except ValueError:
+                    return
+                if self.measuring.is_set():
+                    self.stats.add("fanout", time.perf_counter() - sent_at)
+                    self.stats.bump("received")
+        elif msg_type == MSG_ERROR and self.measuring.is_set():
+            self.stats.count("errors", msg.get("code", "unknown"))
+
+    # --- Scenario ---
+
+    def _authenticate(self) -> bool:
+        modes = {"login": [MSG_AUTH_LOGIN], "register": [MSG_AUTH_REGISTER],
+                 "auto": [MSG_AUTH_LOGIN, MSG_AUTH_REGISTER]}[self.opts.auth]
+        for auth_type in modes:
+            start = time.perf_counter()
+            while True:
+                self._send({"type": auth_type, "username": self.username, "password": self.opts.password})
+                result = self._wait_for(MSG_AUTH_RESULT, self.opts.timeout)
+                if not result or result.get("code") != "overloaded" or self.stop.is_set():
+                    break
+                # Deferred by the server's load shedding: retry as hinted
+                self.stats.count("errors", "login_deferred")
+                self.stop.wait(float(result.get("retry_after", 5)))
+            if result and result.get("success"):
+                self.stats.add("auth", time.perf_counter() - start)
+                return True
+        return False
+
+    def _join(self) -> bool:
+        # Login auto-joins the default channel; wait for that first.
+        self._wait_for(MSG_CHANNEL_JOINED, self.opts.timeout)
+        if self.channel == "general":
+            return True
+        start = time.perf_counter()
+        self._send({"type": MSG_CHANNEL_JOIN, "channel": self.channel})
+        joined = self._wait_for(MSG_CHANNEL_JOINED, self.opts.timeout,
+                                match=lambda m: m.get("channel") == self.channel)
+        if joined:
+            self.stats.add("join", time.perf_counter() - start)
+        return joined is not None
+
+    def _next_payload(self) -> dict:
+        msg_type = self.rng.choices([t for t, _ in self.opts.mix], [w for _, w in self.opts.mix])[0]
+        content = f"{_STAMP}{time.perf_counter():.6f}:{self._filler}"
+        if msg_type == MSG_PRIVATE_MESSAGE:
+            peer = self.rng.randrange(self.opts.users)
+            if peer == self.index:
+                peer = (peer + 1) % self.opts.users
+            return {"type": msg_type, "to": f"{self.opts.prefix}{peer}", "content": content}
+        return {"type": msg_type, "channel": self.channel, "content": content}
+
+    def run(self):
+        try:
+            self._connect()
+        except OSError:
+            self.stats.bump("connect_failures")
+            return
+        try:
+            if not self._authenticate():
+                self.stats.bump("auth_failures")
+                return
+            self._join()
+            self._unclaimed.clear()  # already observed; nothing waits for them
+            interval = 1.0 / self.opts.msg_rate if self.opts.msg_rate > 0 else None
+            next_send = time.perf_counter() + (self.rng.expovariate(1.0 / interval) if interval else 0)
+            while not self.stop.is_set():
+                now = time.perf_counter()
+                if interval and now >= next_send:
+                    msg = self._next_payload()
+                    self._send(msg)
+                    if self.measuring.is_set():
+                        self.stats.count("sent", msg["type"])
+                    next_send = now + self.rng.expovariate(1.0 / interval)
+                wait = min(0.25, max(0.0, next_send - time.perf_counter())) if interval else 0.25
+                for msg in self._read_some(wait):
+                    self._observe(msg)
+        except (OSError, ConnectionError):
+            pass
+        finally:
+            try:
+                self.sock.close()
+            except Exception:
+                pass
+
+
+def setup_channels(opts):
+    """Create the load channels (ignoring ones that already exist)."""
+    if not opts.channels:
+        return
+    user = SimUser(opts.users, opts, Stats(), threading.Event(), threading.Event())
+    user.username = f"{opts.prefix}setup"
+    user._connect()
+    try:
+        if not user._authenticate():
+            raise SystemExit("setup user could not authenticate")
+        for i in range(opts.channels):
+            user._send({"type": MSG_CHANNEL_CREATE, "name": f"{opts.channel_prefix}{i}", "description": "load test"})
+        user._wait_for("_never", 1.0)
+    finally:
+        user.sock.close()
+
+
+def run(opts) -> dict:
+    stats = Stats()
+    stop = threading.Event()
+    measuring = threading.Event()
+    setup_channels(opts)
+
+    users = []
+    ramp_start = time.perf_counter()
+    for i in range(opts.users):
+        target = ramp_start + (i / opts.ramp if opts.ramp > 0 else 0)
+        delay = target - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        user = SimUser(i, opts, stats, stop, measuring)
+        user.start()
+        users.append(user)
+    time.sleep(opts.settle)
+
+    measuring.set()
+    measure_start = time.perf_counter()
+    time.sleep(opts.duration)
+    measuring.clear()
+    elapsed = time.perf_counter() - measure_start
+    stop.set()
+    for user in users:
+        user.join(timeout=2)
+
+    sent_total = sum(stats.sent.values())
+    return {
+        "label": opts.label,
+        "config": {
+            "host": opts.host, "port": opts.port, "tls": opts.tls, "users": opts.users,
+            "ramp": opts.ramp, "duration": opts.duration, "msg_rate": opts.msg_rate,
+            "channels": opts.channels, "size": opts.size, "auth": opts.auth,
+            "mix": {t: w for t, w in opts.mix},
+        },
+        "throughput": {
+            "sent_per_sec": round(sent_total / elapsed, 2),
+            "delivered_per_sec": round(stats.received / elapsed, 2),
+        },
+        "counts": {
+            "sent": stats.sent,
+            "delivered": stats.received,
+            "errors": stats.errors,
+            "connect_failures": stats.connect_failures,
+            "auth_failures": stats.auth_failures,
+        },
+        "latency_ms": {
+            "fanout": summarize(stats.fanout),
+            "auth": summarize(stats.auth),
+            "join": summarize(stats.join),
+        },
+    }
+
+
+def compare(current: dict, baseline: dict) -> str:
+    """Human-readable diff of latency percentiles and throughput."""
+    lines = [f"{'metric':<28}{'baseline':>12}{'current':>12}{'change':>10}"]
+
+    def row(name, old, new):
+        if old is None or new is None:
+            return
+        change = f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+        lines.append(f"{name:<28}{old:>12}{new:>12}{change:>10}")
+
+    for key in ("sent_per_sec", "delivered_per_sec"):
+        row(key, baseline["throughput"].get(key), current["throughput"].get(key))
+    for group in ("fanout", "auth", "join"):
+        for pct in ("p50", "p99", "p999"):
+            row(f"{group}.{pct} (ms)", baseline["latency_ms"][group].get(pct), current["latency_ms"][group].get(pct))
+    return "\n".join(lines)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    ap = argparse.ArgumentParser(description="Chat protocol load generator")
+    ap.add_argument("--host", default=DEFAULT_HOST)
+    ap.add_argument("--port", type=int, default=DEFAULT_PORT)
+    ap.add_argument("--tls", action="store_true", help="Connect with TLS")
+    ap.add_argument("--users", type=int, default=100, help="Simulated users (default: 100)")
+    ap.add_argument("--ramp", type=float, default=50, help="User arrival rate per second, 0 = all at once (default: 50)")
+    ap.add_argument("--settle", type=float, default=2.0, help="Seconds to wait after ramp before measuring")
+    ap.add_argument("--duration", type=float, default=30, help="Measurement window in seconds (default: 30)")
+    ap.add_argument("--msg-rate", type=float, default=0.5, help="Chat sends per user per second (default: 0.5)")
+    ap.add_argument("--mix", type=parse_mix, default=parse_mix("message=80,pm=10,action=10"),
+                    help="Scenario mix, e.g. message=80,pm=10,action=10")
+    ap.add_argument("--channels", type=int, default=4, help="Load channels to spread users over, 0 = general only")
+    ap.add_argument("--channel-prefix", default="load-")
+    ap.add_argument("--size", type=int, default=64, help="Filler bytes per chat payload (default: 64)")
+    ap.add_argument("--auth", choices=("auto", "login", "register"), default="auto",
+                    help="auto tries login then register (default: auto)")
+    ap.add_argument("--prefix", default="lg_", help="Username prefix (default: lg_)")
+    ap.add_argument("--password", default="loadtest123")
+    ap.add_argument("--timeout", type=float, default=30, help="Per-step network timeout")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--label", default="", help="Free-form label stored in the result")
+    ap.add_argument("--output", help="Write the JSON result to this file")
+    ap.add_argument("--compare", help="Compare against a previous JSON result")
+    return ap
+
+
+def main(argv=None):
+    opts = build_parser().parse_args(argv)
+    result = run(opts)
+    text = json.dumps(result, indent=2)
+    print(text)
+    if opts.output:
+        with open(opts.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    if opts.compare:
+        with open(opts.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        print(compare(result, baseline), file=sys.stderr)
+    return result
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,398 @@
+#!/usr/bin/env python3
+"""Micro-benchmarks for protocol, validation and server hot paths.
+
+Each benchmark is a setup function returning a zero-argument callable that
+performs one operation. The runner warms it up, calibrates the number of
+calls per round to roughly --min-time, then times --repeat rounds and
+reports the best and median cost per call.
+
+Usage:
+    python -m bench.micro                          # run everything
+    python -m bench.micro -k protocol              # only names containing "protocol"
+    python -m bench.micro --save baseline.json     # store a baseline
+    python -m bench.micro --compare baseline.json  # report regressions
+"""
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+from shared.protocol import MessageReader, encode_message, decode_message
+from shared.validators import (
+    validate_username, validate_password, validate_message, validate_channel_name, sanitize_content,
+)
+from shared.constants import MESSAGE_HISTORY_LIMIT, MESSAGE_MAX_LEN
+
+BENCHMARKS: dict[str, callable] = {}
+
+_scratch_dir = None  # temp directory for benchmark databases, removed on exit
+_db_counter = itertools.count()
+
+
+def bench(name: str):
+    """Register a benchmark setup function under `name`."""
+    def decorator(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return decorator
+
+
+# --- Payloads ---
+
+def _chat_frame(content_len: int = 120) -> dict:
+    return {
+        "type": "message",
+        "channel": "general",
+        "sender": "someuser_42",
+        "content": ("The quick brown fox jumps over the lazy dog. " * 50)[:content_len],
+        "timestamp": "2024-05-01T12:34:56.789012+00:00",
+        "id": 123456,
+    }
+
+
+def _history_frame() -> dict:
+    return {
+        "type": "channel_history",
+        "channel": "general",
+        "history": [
+            {"sender": f"user{i}", "content": _chat_frame(80 + i * 7)["content"],
+             "timestamp": "2024-05-01T12:34:56", "msg_type": "message", "id": i}
+            for i in range(MESSAGE_HISTORY_LIMIT)
+        ],
+        "users": [{"username": f"user{i}", "status": "online"} for i in range(200)],
+    }
+
+
+class _ChunkSocket:
+    """Socket stand-in whose recv() replays a fixed list of chunks forever."""
+
+    def __init__(self, chunks: list[bytes]):
+        self._chunks = chunks
+        self._i = 0
+
+    def recv(self, bufsize: int) -> bytes:
+        chunk = self._chunks[self._i]
+        self._i = (self._i + 1) % len(self._chunks)
+        return chunk
+
+
+# --- Protocol ---
+
+@bench("protocol.encode_message.chat")
+def _():
+    msg = _chat_frame()
+    return lambda: encode_message(msg)
+
+
+@bench("protocol.encode_message.history")
+def _():
+    msg = _history_frame()
+    return lambda: encode_message(msg)
+
+
+@bench("protocol.decode_message.chat")
+def _():
+    payload = encode_message(_chat_frame())[4:]
+    return lambda: decode_message(payload)
+
+
+@bench("protocol.decode_message.history")
+def _():
+    payload = encode_message(_history_frame())[4:]
+    return lambda: decode_message(payload)
+
+
+@bench("protocol.reader.fragmented")
+def _():
+    # One chat frame arriving 16 bytes at a time.
+    frame = encode_message(_chat_frame())
+    reader = MessageReader(_ChunkSocket([frame[i:i + 16] for i in range(0, len(frame), 16)]))
+    return lambda: next(reader)
+
+
+@bench("protocol.reader.coalesced")
+def _():
+    # Many frames arriving in a single 4 KB read.
+    frame = encode_message(_chat_frame())
+    blob = frame * (4096 // len(frame))
+    reader = MessageReader(_ChunkSocket([blob]))
+    return lambda: next(reader)
+
+
+# --- Validation ---
+
+@bench("validators.sanitize_content.max_len")
+def _():
+    text = ("hello world, this is a long message\tline\n" * 100)[:MESSAGE_MAX_LEN]
+    return lambda: sanitize_content(text)
+
+
+@bench("validators.sanitize_content.short")
+def _():
+    text = _chat_frame()["content"]
+    return lambda: sanitize_content(text)
+
+
+@bench("validators.validate_message.max_len")
+def _():
+    text = ("x" * 99 + " ") * (MESSAGE_MAX_LEN // 100)
+    return lambda: validate_message(text)
+
+
+@bench("validators.validate_username")
+def _():
+    return lambda: validate_username("someuser_42")
+
+
+@bench("validators.validate_password")
+def _():
+    return lambda: validate_password("correct horse battery")
+
+
+@bench("validators.validate_channel_name")
+def _():
+    return lambda: validate_channel_name("off-topic-2")
+
+
+@bench("message_types.parse.chat")
+def _():
+    from shared.message_types import CLIENT_MESSAGES
+    spec, msg = CLIENT_MESSAGES["message"], _chat_frame()
+    return lambda: spec.parse(msg)
+
+
+@bench("message_types.parse.channel_join")
+def _():
+    from shared.message_types import CLIENT_MESSAGES
+    spec, msg = CLIENT_MESSAGES["channel_join"], {"type": "channel_join", "channel": " Off-Topic ", "since_id": 42}
+    return lambda: spec.parse(msg)
+
+
+# --- Server components ---
+
+@bench("server.rate_limiter.is_allowed")
+def _():
+    from server_app.rate_limiter import RateLimiter
+    limiter = RateLimiter(5, 1.0)
+    return limiter.is_allowed
+
+
+@bench("server.channel_manager.join_leave")
+def _():
+    from server_app.channel_manager import ChannelManager
+    mgr = ChannelManager()
+    for i in range(1000):
+        mgr.join(f"user{i}", f"chan{i % 10}")
+
+    def op():
+        mgr.join("bench_user", "chan3")
+        mgr.leave("bench_user", "chan3")
+    return op
+
+
+@bench("server.channel_manager.get_users.100")
+def _():
+    from server_app.channel_manager import ChannelManager
+    mgr = ChannelManager()
+    for i in range(1000):
+        mgr.join(f"user{i}", f"chan{i % 10}")
+    return lambda: mgr.get_users("chan3")
+
+
+@bench("server.channel_manager.get_user_channel")
+def _():
+    from server_app.channel_manager import ChannelManager
+    mgr = ChannelManager()
+    for i in range(1000):
+        mgr.join(f"user{i}", f"chan{i % 10}")
+    return lambda: mgr.get_user_channel("user999")
+
+
+def _database():
+    from server_app.database import Database
+    global _scratch_dir
+    if _scratch_dir is None:
+        _scratch_dir = tempfile.mkdtemp(prefix="chat-bench-")
+    path = os.path.join(_scratch_dir, f"bench-{next(_db_counter)}.db")
+    db = Database(path)
+    db.create_user("bench_user", "x" * 60)
+    user_id = db.get_user_by_username("bench_user")["id"]
+    channel_id = db.get_channel_by_name("general")["id"]
+    for i in range(500):
+        db.save_message(channel_id, user_id, _chat_frame(100)["content"], "message")
+    db.create_session("bench-token", user_id)
+    return db, user_id, channel_id
+
+
+@bench("db.create_user")
+def _():
+    db, _, _ = _database()
+    counter = itertools.count()
+    return lambda: db.create_user(f"u{next(counter)}", "x" * 60)
+
+
+@bench("db.get_user_by_username")
+def _():
+    db, _, _ = _database()
+    return lambda: db.get_user_by_username("bench_user")
+
+
+@bench("db.create_channel")
+def _():
+    db, user_id, _ = _database()
+    counter = itertools.count()
+    return lambda: db.create_channel(f"c{next(counter)}", "", user_id)
+
+
+@bench("db.get_channel_by_name")
+def _():
+    db, _, _ = _database()
+    return lambda: db.get_channel_by_name("general")
+
+
+@bench("db.list_channels")
+def _():
+    db, user_id, _ = _database()
+    for i in range(50):
+        db.create_channel(f"chan-{i}", "bench", user_id)
+    return db.list_channels
+
+
+@bench("db.save_message")
+def _():
+    db, user_id, channel_id = _database()
+    content = _chat_frame()["content"]
+    return lambda: db.save_message(channel_id, user_id, content, "message")
+
+
+@bench("db.get_message_history")
+def _():
+    db, _, channel_id = _database()
+    return lambda: db.get_message_history(channel_id, limit=MESSAGE_HISTORY_LIMIT)
+
+
+@bench("db.create_session")
+def _():
+    db, user_id, _ = _database()
+    counter = itertools.count()
+    return lambda: db.create_session(f"tok{next(counter)}", user_id)
+
+
+@bench("db.validate_session")
+def _():
+    db, _, _ = _database()
+    return lambda: db.validate_session("bench-token")
+
+
+# --- Runner ---
+
+def measure(fn, warmup: float, min_time: float, repeat: int) -> dict:
+    """Time `fn` and return per-call statistics in microseconds."""
+    timer = time.perf_counter
+    end = timer() + warmup
+    while timer() < end:
+        fn()
+
+    # Calibrate calls per round so that one round takes about min_time.
+    number = 1
+    while True:
+        start = timer()
+        for _ in range(number):
+            fn()
+        elapsed = timer() - start
+        if elapsed >= min_time or number >= 1 << 24:
+            break
+        number *= 2 if elapsed <= 0 else max(2, min(10, int(min_time / elapsed) + 1))
+
+    rounds = []
+    for _ in range(repeat):
+        start = timer()
+        for _ in range(number):
+            fn()
+        rounds.append((timer() - start) / number * 1e6)
+    return {
+        "best_us": round(min(rounds), 4),
+        "median_us": round(statistics.median(rounds), 4),
+        "stdev_us": round(statistics.pstdev(rounds), 4),
+        "number": number,
+        "repeat": repeat,
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> tuple[str, int]:
+    """Return a comparison report and the number of regressions."""
+    lines = [f"{'benchmark':<44}{'baseline us':>13}{'current us':>13}{'change':>10}"]
+    regressions = 0
+    for name, cur in results.items():
+        old = baseline.get("results", {}).get(name)
+        if not old:
+            lines.append(f"{name:<44}{'-':>13}{cur['median_us']:>13.3f}{'new':>10}")
+            continue
+        change = (cur["median_us"] - old["median_us"]) / old["median_us"] * 100 if old["median_us"] else 0.0
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        elif change < -threshold:
+            flag = "  faster"
+        lines.append(f"{name:<44}{old['median_us']:>13.3f}{cur['median_us']:>13.3f}{change:>+9.1f}%{flag}")
+    return "\n".join(lines), regressions
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Chat micro-benchmarks")
+    ap.add_argument("-k", "--filter", default="", help="Only run benchmarks whose name contains this")
+    ap.add_argument("--warmup", type=float, default=0.2, help="Warmup seconds per benchmark (default: 0.2)")
+    ap.add_argument("--min-time", type=float, default=0.1, help="Target seconds per round (default: 0.1)")
+    ap.add_argument("--repeat", type=int, default=5, help="Timed rounds per benchmark (default: 5)")
+    ap.add_argument("--list", action="store_true", help="List benchmark names and exit")
+    ap.add_argument("--save", help="Write results to this JSON baseline file")
+    ap.add_argument("--compare", help="Compare against a saved baseline")
+    ap.add_argument("--threshold", type=float, default=10.0,
+                    help="Percent slowdown reported as a regression (default: 10)")
+    args = ap.parse_args(argv)
+
+    names = [n for n in BENCHMARKS if args.filter in n]
+    if args.list:
+        print("\n".join(names))
+        return 0
+
+    results = {}
+    try:
+        for name in names:
+            fn = BENCHMARKS[name]()
+            results[name] = measure(fn, args.warmup, args.min_time, args.repeat)
+            r = results[name]
+            print(f"{name:<44}{r['median_us']:>12.3f} us  (best {r['best_us']:.3f}, n={r['number']}x{r['repeat']})")
+    finally:
+        if _scratch_dir:
+            shutil.rmtree(_scratch_dir, ignore_errors=True)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "results": results,
+            }, f, indent=2)
+            f.write("\n")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        report, regressions = compare(results, baseline, args.threshold)
+        print()
+        print(report)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
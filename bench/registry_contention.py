@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""Client-registry contention under many concurrent broadcasters.
+
+Fills a registry with stand-in connections spread over a few channels,
+then runs broadcaster threads that repeatedly pick their targets (channel
+members, as _broadcast_to_channel does) while a churn thread connects and
+drops clients. Reports target selections per second and how long one
+selection takes, for the copy-on-write ClientRegistry and for the previous
+lock-around-a-dict registry.
+
+Usage:
+    python -m bench.registry_contention
+    python -m bench.registry_contention --clients 5000 --threads 64 --output registry.json
+"""
+
+import argparse
+import itertools
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+from bench.loadgen import summarize
+from server_app.client_registry import ClientRegistry
+
+
+class LockedRegistry:
+    """The previous scheme: one lock held while a dict is scanned or changed."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clients = {}
+
+    def add(self, conn):
+        with self.lock:
+            self.clients[conn.sock] = conn
+
+    def remove(self, conn):
+        with self.lock:
+            self.clients.pop(conn.sock, None)
+
+    def channel_targets(self, channel: str) -> list:
+        with self.lock:
+            return [c for c in self.clients.values() if c.authenticated and c.current_channel == channel]
+
+
+class CowRegistry(ClientRegistry):
+    def add(self, conn):
+        super().add(conn)
+        self.login(conn)
+
+    def channel_targets(self, channel: str) -> list:
+        return [c for c in self.members() if c.current_channel == channel]
+
+
+_ids = itertools.count()
+
+
+def _conn(channels: int):
+    i = next(_ids)
+    return SimpleNamespace(sock=object(), username=f"user{i}", authenticated=True,
+                           current_channel=f"ch{i % channels}")
+
+
+def run_mode(opts, registry) -> dict:
+    conns = [_conn(opts.channels) for _ in range(opts.clients)]
+    for c in conns:
+        registry.add(c)
+
+    stop = threading.Event()
+    samples = [[] for _ in range(opts.threads)]
+    churned = [0]
+
+    def broadcaster(out: list, index: int):
+        channel = f"ch{index % opts.channels}"
+        while not stop.is_set():
+            start = time.perf_counter()
+            registry.channel_targets(channel)
+            out.append(time.perf_counter() - start)
+            time.sleep(opts.pause)  # the writes of a real broadcast
+
+    def churn():
+        interval = 1.0 / opts.churn_rate
+        i = 0
+        while not stop.is_set():
+            registry.remove(conns[i])
+            conns[i] = _conn(opts.channels)
+            registry.add(conns[i])
+            churned[0] += 1
+            i = (i + 1) % len(conns)
+            time.sleep(interval)
+
+    threads = [threading.Thread(target=broadcaster, args=(samples[i], i), daemon=True) for i in range(opts.threads)]
+    threads.append(threading.Thread(target=churn, daemon=True))
+    for t in threads:
+        t.start()
+    time.sleep(opts.duration)
+    stop.set()
+    for t in threads:
+        t.join()
+
+    flat = [s for per_thread in samples for s in per_thread]
+    return {
+        "selections_per_sec": round(len(flat) / opts.duration),
+        "churn_per_sec": round(churned[0] / opts.duration),
+        "selection_ms": summarize(flat),
+    }
+
+
+def build_parser() -> argparse.ArgumentParser:
+    ap = argparse.ArgumentParser(description="Client-registry contention with many concurrent broadcasters")
+    ap.add_argument("--clients", type=int, default=2000, help="Registered connections (default: 2000)")
+    ap.add_argument("--channels", type=int, default=8, help="Channels the connections are spread over (default: 8)")
+    ap.add_argument("--threads", type=int, default=32, help="Broadcaster threads (default: 32)")
+    ap.add_argument("--pause", type=float, default=0.002,
+                    help="Seconds each broadcaster sleeps between selections (default: 0.002)")
+    ap.add_argument("--churn-rate", type=float, default=200, help="Connects plus drops per second (default: 200)")
+    ap.add_argument("--duration", type=float, default=5, help="Seconds per registry (default: 5)")
+    ap.add_argument("--output", help="Write the JSON result to this file")
+    return ap
+
+
+def main(argv=None):
+    opts = build_parser().parse_args(argv)
+    results = {
+        "copy_on_write": run_mode(opts, CowRegistry()),
+        "locked": run_mode(opts, LockedRegistry()),
+    }
+    text = json.dumps(results, indent=2)
+    print(text)
+    if opts.output:
+        with open(opts.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    return results
+
+
+if __name__ == "__main__":
+    main()
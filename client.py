@@ -1,10 +1,21 @@
 #!/usr/bin/env python3
-"""Chat client entry point."""
+"""Chat client entry point.
 
-from client_app.ui.app import ChatApp
+    python client.py                 # GUI
+    python client.py --cli [OPTIONS]  # terminal client, see --cli --help
+"""
+
+import sys
 
 
 def main():
+    # The GUI is only imported when it is used, so --cli never loads Tk.
+    if "--cli" in sys.argv[1:]:
+        from client_app.cli import main as cli_main
+        argv = [arg for arg in sys.argv[1:] if arg != "--cli"]
+        sys.exit(cli_main(argv))
+
+    from client_app.ui.app import ChatApp
     app = ChatApp()
     app.run()
 
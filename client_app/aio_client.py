@@ -0,0 +1,337 @@
+"""Headless asyncio chat client for bots and integrations.
+
+Built directly on shared/protocol.py and imports nothing from the GUI, so a
+single process can hold hundreds of connections on one event loop:
+
+    async with AsyncChatClient("127.0.0.1", 5050) as client:
+        await client.login("bot", "secret1")
+        await client.join("general")
+        await client.send("general", "hello")
+        async for event in client.events():
+            if event["type"] == "message":
+                ...
+
+Requests are pipelined: each frame carries a "ref" that the server echoes
+on its direct reply (or error), so any number of requests may be in
+flight at once and are matched to their replies out of order. Frames that
+are not replies to a pending request are delivered by events().
+"""
+
+import asyncio
+import itertools
+import ssl
+import struct
+
+from shared.constants import (
+    HEADER_SIZE, MAX_MESSAGE_SIZE,
+    MSG_AUTH_LOGIN, MSG_AUTH_REGISTER, MSG_AUTH_RESULT, MSG_AUTH_RESUME,
+    MSG_CHANNEL_JOIN, MSG_CHANNEL_LEAVE, MSG_CHANNEL_CREATE,
+    MSG_CHANNEL_LIST, MSG_CHANNEL_INFO, MSG_CHANNEL_JOINED, MSG_CHANNEL_HISTORY,
+    MSG_HISTORY_CHUNK, MSG_MEMBER_CHUNK,
+    MSG_MESSAGE, MSG_PRIVATE_MESSAGE, MSG_ACTION, MSG_USER_LIST, MSG_ERROR,
+)
+from shared.protocol import encode_message, decode_message
+
+REQUEST_TIMEOUT = 30.0   # seconds to wait for a reply
+EVENT_QUEUE_MAX = 10_000  # undelivered events kept per connection; oldest dropped beyond
+
+
+class ChatError(Exception):
+    """The server answered a request with an error frame. `retry_after` is
+    the server's hint (seconds) when it refused the request under load."""
+
+    def __init__(self, code: str, message: str, retry_after: float | None = None):
+        super().__init__(f"{code}: {message}")
+        self.code = code
+        self.message = message
+        self.retry_after = retry_after
+
+
+class AuthError(ChatError):
+    """Login, registration or session resume was rejected."""
+
+
+def _error(msg: dict) -> ChatError:
+    return ChatError(msg.get("code", ""), msg.get("message", ""), msg.get("retry_after"))
+
+
+class _JoinCollector:
+    """Assembles a streamed join (channel_joined header, then history_chunk
+    and member_chunk frames) into a single channel_joined-shaped dict."""
+
+    def __init__(self, future: asyncio.Future):
+        self.future = future
+        self.joined = None
+        self.history: list[dict] = []
+        self.users: list[dict] = []
+        self.history_done = False
+        self.members_done = False
+
+    def feed(self, msg: dict) -> bool:
+        """Consume a frame belonging to this join; returns False for others."""
+        msg_type = msg.get("type")
+        if msg_type == MSG_ERROR:
+            self.future.set_exception(_error(msg))
+        elif msg_type == MSG_CHANNEL_JOINED:
+            self.joined = msg
+        elif msg_type == MSG_HISTORY_CHUNK:
+            self.history[:0] = msg.get("history", [])  # newest page first
+            if msg.get("last"):
+                self.history_done = True
+                if "complete" in msg:
+                    self.joined["complete"] = msg["complete"]
+        elif msg_type == MSG_MEMBER_CHUNK:
+            self.users.extend(msg.get("users", []))
+            self.members_done = bool(msg.get("last"))
+        else:
+            return False
+        if self.joined is not None and self.history_done and self.members_done and not self.future.done():
+            self.future.set_result(dict(self.joined, history=self.history, users=self.users))
+        return True
+
+
+class AsyncChatClient:
+    """One chat connection. All methods must be called on the same event loop."""
+
+    def __init__(self, host: str, port: int, use_tls: bool = False,
+                 request_timeout: float = REQUEST_TIMEOUT, max_events: int = EVENT_QUEUE_MAX):
+        self.host = host
+        self.port = port
+        self.use_tls = use_tls
+        self.request_timeout = request_timeout
+
+        self.username: str | None = None
+        self.token: str | None = None
+        self.channel: str | None = None
+        self.dropped_events = 0
+
+        self._reader: asyncio.StreamReader | None = None
+        self._writer: asyncio.StreamWriter | None = None
+        self._read_task: asyncio.Task | None = None
+        self._drain_lock = asyncio.Lock()
+        self._refs = itertools.count(1)
+        self._pending: dict[int, tuple[str, asyncio.Future]] = {}  # ref -> (reply type, future)
+        self._joins: dict[int, _JoinCollector] = {}  # ref -> streamed join being assembled
+        self._events: asyncio.Queue = asyncio.Queue(max_events)
+        self._closed = False
+
+    # --- Connection ---
+
+    async def connect(self):
+        context = None
+        if self.use_tls:
+            context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+            context.check_hostname = False
+            context.verify_mode = ssl.CERT_NONE  # self-signed certs
+        self._reader, self._writer = await asyncio.open_connection(
+            self.host, self.port, ssl=context, server_hostname=self.host if context else None,
+        )
+        self._closed = False
+        self._read_task = asyncio.create_task(self._read_loop())
+
+    async def close(self):
+        if self._writer is None:
+            return
+        self._writer.close()
+        try:
+            await self._writer.wait_closed()
+        except (OSError, ConnectionError):
+            pass
+        if self._read_task is not None:
+            await self._read_task
+        self._writer = None
+
+    @property
+    def connected(self) -> bool:
+        return self._writer is not None and not self._closed
+
+    async def __aenter__(self) -> "AsyncChatClient":
+        await self.connect()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    # --- Authentication ---
+
+    async def login(self, username: str, password: str) -> dict:
+        """Log in; returns the auth_result frame. Raises AuthError on failure."""
+        return await self._authenticate({"type": MSG_AUTH_LOGIN, "username": username, "password": password})
+
+    async def register(self, username: str, password: str) -> dict:
+        return await self._authenticate({"type": MSG_AUTH_REGISTER, "username": username, "password": password})
+
+    async def resume(self, token: str, channel: str | None = None, since_id: int | None = None) -> dict:
+        """Re-authenticate with a session token from an earlier login."""
+        msg = {"type": MSG_AUTH_RESUME, "token": token}
+        if channel:
+            msg["channel"] = channel
+        if since_id is not None:
+            msg["since_id"] = since_id
+        return await self._authenticate(msg)
+
+    async def _authenticate(self, msg: dict) -> dict:
+        """Send an auth frame, retrying as hinted while the server defers
+        logins under load, for up to request_timeout seconds."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.request_timeout
+        while True:
+            result = await self.request(msg, MSG_AUTH_RESULT)
+            retry_after = result.get("retry_after")
+            if result.get("code") != "overloaded" or retry_after is None or loop.time() + retry_after > deadline:
+                break
+            await asyncio.sleep(retry_after)
+        if not result.get("success"):
+            raise AuthError(result.get("code", "auth_failed"), result.get("error", "Authentication failed."),
+                            result.get("retry_after"))
+        self.username = result.get("username")
+        self.token = result.get("token")
+        return result
+
+    # --- Channels ---
+
+    async def join(self, channel: str, since_id: int | None = None) -> dict:
+        """Join a channel; returns the channel_joined header with the streamed
+        "history" (chronological) and "users" collected into it."""
+        msg = {"type": MSG_CHANNEL_JOIN, "channel": channel}
+        if since_id is not None:
+            msg["since_id"] = since_id
+        ref = next(self._refs)
+        collector = self._joins[ref] = _JoinCollector(asyncio.get_running_loop().create_future())
+        try:
+            await self.send_frame(dict(msg, ref=ref))
+            joined = await asyncio.wait_for(collector.future, self.request_timeout)
+        finally:
+            self._joins.pop(ref, None)
+        self.channel = joined.get("channel", channel)
+        return joined
+
+    async def leave(self, channel: str):
+        await self.send_frame({"type": MSG_CHANNEL_LEAVE, "channel": channel})
+        if self.channel == channel:
+            self.channel = None
+
+    async def history(self, channel: str, since_id: int | None = None) -> list[dict]:
+        """Recent messages of a channel without joining it."""
+        msg = {"type": MSG_CHANNEL_HISTORY, "channel": channel}
+        if since_id is not None:
+            msg["since_id"] = since_id
+        reply = await self.request(msg, MSG_CHANNEL_HISTORY)
+        return reply.get("history", [])
+
+    async def list_channels(self) -> list[dict]:
+        reply = await self.request({"type": MSG_CHANNEL_LIST}, MSG_CHANNEL_INFO)
+        return reply.get("channels", [])
+
+    async def users(self, channel: str) -> list[dict]:
+        reply = await self.request({"type": MSG_USER_LIST, "channel": channel}, MSG_USER_LIST)
+        return reply.get("users", [])
+
+    async def create_channel(self, name: str, description: str = ""):
+        """Create a channel. The channel_created broadcast arrives via events()."""
+        await self.send_frame({"type": MSG_CHANNEL_CREATE, "name": name, "description": description})
+
+    # --- Chat ---
+
+    async def send(self, channel: str, content: str):
+        """Post a message. Delivery is confirmed by the broadcast in events();
+        a rejection (e.g. rate limiting) arrives there as an error frame."""
+        await self.send_frame({"type": MSG_MESSAGE, "channel": channel, "content": content})
+
+    async def action(self, channel: str, content: str):
+        await self.send_frame({"type": MSG_ACTION, "channel": channel, "content": content})
+
+    async def pm(self, to: str, content: str) -> dict:
+        """Send a private message; returns the server's echo of it."""
+        return await self.request({"type": MSG_PRIVATE_MESSAGE, "to": to, "content": content}, MSG_PRIVATE_MESSAGE)
+
+    # --- Events ---
+
+    async def events(self):
+        """Yield frames that are not replies to a request, until the connection closes."""
+        while True:
+            msg = await self._events.get()
+            if msg is None:
+                return
+            yield msg
+
+    def __aiter__(self):
+        return self.events()
+
+    # --- Requests ---
+
+    async def request(self, msg: dict, reply_type: str, timeout: float | None = None) -> dict:
+        """Send `msg` and wait for its `reply_type` reply.
+
+        Raises:
+            ChatError: If the server answers with an error frame.
+            ConnectionError: If the connection closes first.
+            asyncio.TimeoutError: If no reply arrives in time.
+        """
+        ref = next(self._refs)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[ref] = (reply_type, future)
+        try:
+            await self.send_frame(dict(msg, ref=ref))
+            return await asyncio.wait_for(future, timeout or self.request_timeout)
+        finally:
+            self._pending.pop(ref, None)
+
+    async def send_frame(self, msg: dict):
+        """Write a frame without waiting for a reply. Frames are written in
+        call order; the write buffer is drained once it passes its limit."""
+        if not self.connected:
+            raise ConnectionError("Not connected")
+        if "ref" not in msg:
+            msg = dict(msg, ref=next(self._refs))
+        self._writer.write(encode_message(msg))
+        async with self._drain_lock:
+            await self._writer.drain()
+
+    async def _read_frame(self) -> dict:
+        header = await self._reader.readexactly(HEADER_SIZE)
+        (length,) = struct.unpack("!I", header)
+        if length > MAX_MESSAGE_SIZE:
+            raise ConnectionError(f"Message too large: {length} bytes")
+        return decode_message(await self._reader.readexactly(length))
+
+    async def _read_loop(self):
+        try:
+            while True:
+                msg = await self._read_frame()
+                if not isinstance(msg, dict):
+                    continue
+                collector = self._joins.get(msg.get("ref"))
+                if collector is not None and not collector.future.done() and collector.feed(msg):
+                    continue
+                pending = self._pending.get(msg.get("ref"))
+                if pending is not None and not pending[1].done():
+                    reply_type, future = pending
+                    if msg.get("type") == MSG_ERROR:
+                        future.set_exception(_error(msg))
+                        continue
+                    if msg.get("type") == reply_type:
+                        future.set_result(msg)
+                        continue
+                self._deliver(msg)
+        except (asyncio.IncompleteReadError, ConnectionError, OSError, ValueError):
+            pass
+        finally:
+            self._closed = True
+            futures = [future for _, future in self._pending.values()]
+            futures += [collector.future for collector in self._joins.values()]
+            for future in futures:
+                if not future.done():
+                    future.set_exception(ConnectionError("Connection closed"))
+            self._deliver(None)
+
+    def _deliver(self, msg: dict | None):
+        if msg is not None and msg.get("type") == MSG_CHANNEL_JOINED:
+            self.channel = msg.get("channel", self.channel)  # auto-join after login
+        while True:
+            try:
+                self._events.put_nowait(msg)
+                return
+            except asyncio.QueueFull:
+                self._events.get_nowait()
+                self.dropped_events += 1
@@ -0,0 +1,91 @@
+"""In-memory LRU of recently viewed channels' display rows.
+
+Switching to a cached channel rebinds MessageArea to the stored row list
+(see MessageArea.attach) instead of waiting for the server's history, so
+the switch is immediate; the join that follows only fetches messages
+newer than the cached view. All methods are called on the UI thread.
+"""
+
+import collections
+
+from client_app.formatting import make_row, rows_from_history, last_row_id
+
+MAX_CACHED_CHANNELS = 8
+MAX_ROWS_PER_CHANNEL = 2_000
+
+
+class ChannelViews:
+    """Channel name -> list of display rows, least recently used evicted first."""
+
+    def __init__(self, capacity: int = MAX_CACHED_CHANNELS, max_rows: int = MAX_ROWS_PER_CHANNEL):
+        self.capacity = capacity
+        self.max_rows = max_rows
+        self._views: collections.OrderedDict[str, list[tuple]] = collections.OrderedDict()
+
+    def __contains__(self, channel: str) -> bool:
+        return channel in self._views
+
+    def get(self, channel: str) -> list[tuple] | None:
+        """The channel's rows (marking it most recently used), or None."""
+        rows = self._views.get(channel)
+        if rows is not None:
+            self._views.move_to_end(channel)
+        return rows
+
+    def put(self, channel: str, rows: list[tuple], recent: bool = True) -> list[tuple]:
+        """Store `rows` as the channel's view and return it.
+
+        recent=False (prefetch) only fills a free slot and never evicts a
+        channel the user actually viewed.
+        """
+        if len(rows) > self.max_rows:
+            del rows[:len(rows) - self.max_rows]
+        if not recent and channel not in self._views and len(self._views) >= self.capacity:
+            return rows
+        is_new = channel not in self._views
+        self._views[channel] = rows
+        if recent:
+            self._views.move_to_end(channel)
+        elif is_new:
+            self._views.move_to_end(channel, last=False)
+        while len(self._views) > self.capacity:
+            self._views.popitem(last=False)
+        return rows
+
+    def put_history(self, channel: str, entries: list[dict], recent: bool = True) -> list[tuple]:
+        return self.put(channel, rows_from_history(entries), recent)
+
+    def merge_history(self, channel: str, entries: list[dict], complete: bool = True):
+        """Apply a history page to a cached view without changing its recency.
+
+        When `complete` is false the page is not contiguous with the view,
+        which is replaced. Uncached channels are ignored.
+        """
+        rows = self._views.get(channel)
+        if rows is None:
+            return
+        if not complete:
+            rows[:] = rows_from_history(entries)
+            return
+        last_id = last_row_id(rows)
+        for e in entries:
+            msg_id = e.get("id")
+            if last_id is not None and isinstance(msg_id, int) and msg_id <= last_id:
+                continue
+            rows.append(make_row(
+                e.get("msg_type", "message"), e.get("sender", ""), e.get("content", ""),
+                e.get("timestamp", ""), msg_id, e.get("time_str"),
+            ))
+        if len(rows) > self.max_rows:
+            del rows[:len(rows) - self.max_rows]
+
+    def max_id(self, channel: str) -> int | None:
+        rows = self._views.get(channel)
+        return last_row_id(rows) if rows else None
+
+    def recent(self, exclude: str | None = None) -> list[str]:
+        """Cached channel names, most recently used first."""
+        return [ch for ch in reversed(self._views) if ch != exclude]
+
+    def clear(self):
+        self._views.clear()
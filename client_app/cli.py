@@ -0,0 +1,270 @@
+"""Terminal chat client. Uses the same network and session layers as the GUI
+but never imports Tk, so it starts quickly and runs over SSH or in scripts.
+
+Lines typed on stdin are sent to the current channel; slash commands:
+    /join <channel>   /msg <user> <text>   /me <text>
+    /create <name> [description]   /channels   /users   /quit
+"""
+
+import argparse
+import getpass
+import sys
+import threading
+import time
+
+from client_app.network import NetworkClient
+from client_app.session import Session
+from client_app.formatting import format_timestamp
+from shared.constants import (
+    DEFAULT_HOST, DEFAULT_PORT,
+    MSG_AUTH_LOGIN, MSG_AUTH_REGISTER, MSG_AUTH_RESULT,
+    MSG_CHANNEL_JOIN, MSG_CHANNEL_CREATE, MSG_CHANNEL_LIST,
+    MSG_CHANNEL_INFO, MSG_CHANNEL_JOINED, MSG_CHANNEL_CREATED,
+    MSG_HISTORY_CHUNK, MSG_MEMBER_CHUNK,
+    MSG_MESSAGE, MSG_PRIVATE_MESSAGE, MSG_ACTION,
+    MSG_USER_LIST, MSG_USER_JOINED, MSG_USER_LEFT,
+    MSG_ERROR, MSG_SYSTEM,
+)
+
+AUTH_TIMEOUT = 30.0  # seconds
+
+
+class ChatCLI:
+    def __init__(self, out=sys.stdout):
+        self.network = NetworkClient()
+        self.session = Session()
+        self.out = out
+        self._print_lock = threading.Lock()
+        self._auth_done = threading.Event()
+        self._auth_error = None
+        self._retry_after = None  # set when the server defers the login
+        self._disconnected = threading.Event()
+        self._list_channels = False  # print the next channel_info
+        self._history = []  # streamed history of the channel being joined
+        self._held = None   # live messages that overtook that history, or None once it is in
+        self._members = []
+
+    # --- Output ---
+
+    def _print(self, text: str):
+        with self._print_lock:
+            self.out.write(text + "\n")
+            self.out.flush()
+
+    def _print_chat(self, sender: str, content: str, timestamp: str = "", action: bool = False):
+        time_str = format_timestamp(timestamp)
+        prefix = f"[{time_str}] " if time_str else ""
+        if action:
+            self._print(f"{prefix}* {sender} {content}")
+        else:
+            self._print(f"{prefix}<{sender}> {content}")
+
+    # --- Connection ---
+
+    def connect(self, host: str, port: int, use_tls: bool, username: str, password: str,
+                register: bool = False) -> bool:
+        """Connect and authenticate. Returns True on success."""
+        request = {
+            "type": MSG_AUTH_REGISTER if register else MSG_AUTH_LOGIN,
+            "username": username,
+            "password": password,
+        }
+        try:
+            self.network.connect(host, port, use_tls)
+            self.network.start_recv_loop(self._on_message)
+            self.network.send(request)
+            while True:
+                if not self._auth_done.wait(AUTH_TIMEOUT):
+                    self._print("Connection failed: no response from server.")
+                    return False
+                if self._retry_after is None or self._disconnected.is_set():
+                    break
+                # The server defers logins while shedding load; retry as hinted
+                self._print(f"Server busy, retrying in {self._retry_after:.0f}s...")
+                time.sleep(self._retry_after)
+                self._retry_after = None
+                self._auth_done.clear()
+                self.network.send(request)
+        except Exception as e:
+            self._print(f"Connection failed: {e}")
+            return False
+        if self._auth_error is not None:
+            self._print(f"Authentication failed: {self._auth_error}")
+            return False
+        if self._disconnected.is_set():
+            self._print("Connection failed: server closed the connection.")
+            return False
+        return True
+
+    # --- Incoming (recv thread) ---
+
+    def _on_message(self, msg: dict):
+        msg_type = msg.get("type", "")
+
+        if msg_type == MSG_AUTH_RESULT:
+            if msg.get("success"):
+                self.session.set_authenticated(msg["username"], msg.get("token"))
+                self._print(f"Logged in as {msg['username']}.")
+            elif msg.get("code") == "overloaded":
+                self._retry_after = float(msg.get("retry_after", 5))
+            else:
+                self._auth_error = msg.get("error", "Authentication failed.")
+            self._auth_done.set()
+        elif msg_type == MSG_CHANNEL_JOINED:
+            self.session.current_channel = msg.get("channel", "")
+            self._history = []
+            self._held = []
+            self._members = []
+            self._print(f"--- #{self.session.current_channel} ---")
+        elif msg_type == MSG_HISTORY_CHUNK:
+            # Chunks arrive newest first; print in order once all are in
+            channel = msg.get("channel", "")
+            if channel != self.session.current_channel:
+                return
+            self._history[:0] = msg.get("history", [])
+            if msg.get("last"):
+                for entry in self._history:
+                    self.session.note_message(channel, entry.get("id"))
+                    self._print_chat(entry.get("sender", ""), entry.get("content", ""),
+                                     entry.get("timestamp", ""), entry.get("msg_type") == "action")
+                self._history = []
+                held, self._held = self._held or [], None
+                for live in held:
+                    self._on_message(live)
+        elif msg_type == MSG_MEMBER_CHUNK:
+            if msg.get("channel") != self.session.current_channel:
+                return
+            self._members.extend(u.get("username", "") for u in msg.get("users", []))
+            if msg.get("last"):
+                self._print(f"--- {len(self._members)} online: {', '.join(self._members)} ---")
+                self._members = []
+        elif msg_type in (MSG_MESSAGE, MSG_ACTION):
+            channel = msg.get("channel", "")
+            if channel == self.session.current_channel and self._held is not None:
+                self._held.append(msg)  # print after the join's history
+                return
+            self.session.note_message(channel, msg.get("id"))
+            if channel == self.session.current_channel:
+                self._print_chat(msg.get("sender", ""), msg.get("content", ""),
+                                 msg.get("timestamp", ""), msg_type == MSG_ACTION)
+        elif msg_type == MSG_PRIVATE_MESSAGE:
+            if msg.get("to"):
+                self._print(f"[PM -> {msg['to']}] {msg.get('content', '')}")
+            else:
+                self._print(f"[PM] {msg.get('from', '')}: {msg.get('content', '')}")
+        elif msg_type == MSG_CHANNEL_INFO:
+            self.session.channels = msg.get("channels", [])
+            if self._list_channels:
+                self._list_channels = False
+                names = ", ".join(f"#{ch.get('name', '')}" for ch in self.session.channels)
+                self._print(f"* Channels: {names}")
+        elif msg_type == MSG_CHANNEL_CREATED:
+            channel = msg.get("channel", {})
+            self.session.channels.append(channel)
+            self._print(f"* Channel #{channel.get('name', '')} created.")
+        elif msg_type == MSG_USER_JOINED:
+            if msg.get("channel") == self.session.current_channel:
+                self._print(f"* {msg.get('username', '')} joined the channel.")
+        elif msg_type == MSG_USER_LEFT:
+            if msg.get("channel") == self.session.current_channel:
+                self._print(f"* {msg.get('username', '')} left the channel.")
+        elif msg_type == MSG_USER_LIST:
+            users = [u.get("username", "") for u in msg.get("users", [])]
+            self._print(f"* Online in #{msg.get('channel', '')}: {', '.join(users)}")
+        elif msg_type == MSG_ERROR:
+            self._print(f"Error: {msg.get('message', 'Unknown error')}")
+        elif msg_type == MSG_SYSTEM:
+            self._print(f"* {msg.get('message', '')}")
+        elif msg_type == "_send_failed":
+            self._print("A message could not be sent (connection stalled).")
+        elif msg_type == "_disconnected":
+            self._print("Disconnected from server.")
+            self._disconnected.set()
+            self._auth_done.set()
+
+    # --- Input (main thread) ---
+
+    def run(self, stdin=sys.stdin):
+        """Read lines from stdin until /quit, EOF or disconnect."""
+        for line in stdin:
+            if self._disconnected.is_set():
+                break
+            text = line.rstrip("\n")
+            if not text.strip():
+                continue
+            if not self.handle_input(text):
+                break
+        self.network.disconnect()
+
+    def handle_input(self, text: str) -> bool:
+        """Send one line of user input. Returns False when the user quits."""
+        try:
+            if not text.startswith("/"):
+                if self.session.current_channel:
+                    self.network.send({"type": MSG_MESSAGE, "channel": self.session.current_channel, "content": text})
+                return True
+
+            parts = text.split(" ", 2)
+            cmd = parts[0].lower()
+            if cmd == "/quit":
+                return False
+            if cmd == "/join" and len(parts) >= 2:
+                self.network.send({"type": MSG_CHANNEL_JOIN, "channel": parts[1]})
+            elif cmd == "/msg" and len(parts) >= 3:
+                self.network.send({"type": MSG_PRIVATE_MESSAGE, "to": parts[1], "content": parts[2]})
+            elif cmd == "/me" and len(parts) >= 2:
+                self.network.send({
+                    "type": MSG_ACTION,
+                    "channel": self.session.current_channel,
+                    "content": " ".join(parts[1:]),
+                })
+            elif cmd == "/create" and len(parts) >= 2:
+                self.network.send({
+                    "type": MSG_CHANNEL_CREATE,
+                    "name": parts[1],
+                    "description": parts[2] if len(parts) > 2 else "",
+                })
+            elif cmd == "/channels":
+                self._list_channels = True
+                self.network.send({"type": MSG_CHANNEL_LIST})
+            elif cmd == "/users":
+                self.network.send({"type": MSG_USER_LIST, "channel": self.session.current_channel})
+            else:
+                self._print(f"Unknown command: {cmd}")
+        except ConnectionError as e:
+            self._print(f"Not sent: {e}")
+        return True
+
+
+def build_parser() -> argparse.ArgumentParser:
+    ap = argparse.ArgumentParser(description="Terminal chat client")
+    ap.add_argument("--host", default=DEFAULT_HOST, help=f"Server host (default: {DEFAULT_HOST})")
+    ap.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"Server port (default: {DEFAULT_PORT})")
+    ap.add_argument("--tls", action="store_true", help="Connect with TLS")
+    ap.add_argument("--username", "-u", help="Username (prompted if omitted)")
+    ap.add_argument("--password", "-p", help="Password (prompted if omitted)")
+    ap.add_argument("--register", action="store_true", help="Register a new account instead of logging in")
+    ap.add_argument("--channel", "-c", help="Channel to join after login")
+    return ap
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    username = args.username or input("Username: ")
+    password = args.password or getpass.getpass("Password: ")
+
+    cli = ChatCLI()
+    if not cli.connect(args.host, args.port, args.tls, username, password, args.register):
+        cli.network.disconnect()
+        return 1
+    if args.channel:
+        cli.handle_input(f"/join {args.channel}")
+    try:
+        cli.run()
+    except KeyboardInterrupt:
+        cli.network.disconnect()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,70 @@
+"""Display formatting that does not need Tk (safe to call off the UI thread)."""
+
+from datetime import datetime
+
+_CHAT_TYPES = ("message", "action", "private_message")
+
+# Display row tuple used by MessageArea and the channel view cache
+KIND, SENDER, CONTENT, TIME, MSG_ID = range(5)
+
+
+def format_timestamp(timestamp: str) -> str:
+    """Format an ISO timestamp as 'Today at HH:MM' or 'dd/mm/YYYY HH:MM'."""
+    if not timestamp:
+        return ""
+    try:
+        dt = datetime.fromisoformat(timestamp)
+        now = datetime.now(dt.tzinfo)
+        if dt.date() == now.date():
+            return f"Today at {dt.strftime('%H:%M')}"
+        return dt.strftime("%d/%m/%Y %H:%M")
+    except (ValueError, TypeError):
+        return timestamp
+
+
+def prepare_message(msg: dict) -> dict:
+    """Precompute display fields for a received frame, in place.
+
+    Adds "time_str" to chat frames and to each history entry so the UI
+    thread only has to bind text to widgets.
+    """
+    if msg.get("type") in _CHAT_TYPES:
+        msg["time_str"] = format_timestamp(msg.get("timestamp", ""))
+    history = msg.get("history")
+    if isinstance(history, list):
+        for entry in history:
+            if isinstance(entry, dict):
+                entry["time_str"] = format_timestamp(entry.get("timestamp", ""))
+    return msg
+
+
+def make_row(msg_type: str, sender: str, content: str, timestamp: str = "", msg_id=None,
+             time_str: str | None = None) -> tuple:
+    """Build a display row: (kind, sender, content, time string, message id)."""
+    kind = "action" if msg_type == "action" else "message"
+    if time_str is None:
+        time_str = format_timestamp(timestamp)
+    return (kind, sender, content, time_str, msg_id)
+
+
+def system_row(text: str) -> tuple:
+    return ("system", "", text, "", None)
+
+
+def rows_from_history(entries: list[dict]) -> list[tuple]:
+    """Display rows for history entries (sender, content, timestamp, msg_type, id)."""
+    return [
+        make_row(
+            e.get("msg_type", "message"), e.get("sender", ""), e.get("content", ""),
+            e.get("timestamp", ""), e.get("id"), e.get("time_str"),
+        )
+        for e in entries
+    ]
+
+
+def last_row_id(rows: list[tuple], lookback: int = 50) -> int | None:
+    """Highest message id among the last `lookback` rows (system rows have none)."""
+    for row in reversed(rows[-lookback:]):
+        if row[MSG_ID] is not None:
+            return row[MSG_ID]
+    return None
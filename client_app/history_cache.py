@@ -0,0 +1,173 @@
+"""Persistent on-disk cache of received messages, one SQLite file per server/account.
+
+Channel messages are keyed by their server id, so the client can render a
+channel straight from disk and then ask the server only for messages newer
+than the highest cached id. Old rows are evicted to keep the file bounded.
+"""
+
+import os
+import re
+import sqlite3
+import threading
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".python-socket-chat", "cache")
+MAX_MESSAGES_PER_CHANNEL = 5_000
+MAX_MESSAGES_TOTAL = 50_000
+MAX_PMS = 5_000
+EVICT_EVERY = 500  # inserts between eviction passes
+
+_UNSAFE_CHARS = re.compile(r"[^A-Za-z0-9_.-]")
+
+
+class HistoryCache:
+    """Thread-safe message cache. Writes come from the network thread,
+    reads from the UI thread, so a single connection is shared under a lock."""
+
+    def __init__(self, path: str, max_per_channel: int = MAX_MESSAGES_PER_CHANNEL,
+                 max_total: int = MAX_MESSAGES_TOTAL, max_pms: int = MAX_PMS):
+        self.path = path
+        self.max_per_channel = max_per_channel
+        self.max_total = max_total
+        self.max_pms = max_pms
+        self._lock = threading.Lock()
+        self._inserts = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._init_schema()
+
+    @classmethod
+    def for_account(cls, host: str, port: int, username: str, cache_dir: str = DEFAULT_CACHE_DIR) -> "HistoryCache":
+        """Open (creating if needed) the cache file for one server/account."""
+        os.makedirs(cache_dir, exist_ok=True)
+        name = _UNSAFE_CHARS.sub("_", f"{host}_{port}_{username.lower()}")
+        return cls(os.path.join(cache_dir, f"{name}.sqlite3"))
+
+    def _init_schema(self):
+        with self._lock:
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS messages (
+                    channel    TEXT    NOT NULL,
+                    id         INTEGER NOT NULL,
+                    sender     TEXT    NOT NULL,
+                    content    TEXT    NOT NULL,
+                    msg_type   TEXT    NOT NULL DEFAULT 'message',
+                    timestamp  TEXT    NOT NULL DEFAULT '',
+                    PRIMARY KEY (channel, id)
+                );
+
+                CREATE TABLE IF NOT EXISTS private_messages (
+                    id         INTEGER PRIMARY KEY AUTOINCREMENT,
+                    peer       TEXT    NOT NULL,
+                    sender     TEXT    NOT NULL,
+                    content    TEXT    NOT NULL,
+                    timestamp  TEXT    NOT NULL DEFAULT ''
+                );
+            """)
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # --- Channel messages ---
+
+    def store_messages(self, channel: str, entries: list[dict], replace: bool = False):
+        """Insert channel messages (dicts with id, sender, content, msg_type, timestamp).
+
+        replace=True first drops the channel's cached rows, for when the new
+        entries are not contiguous with what is cached.
+        """
+        rows = [
+            (channel, e["id"], e.get("sender", ""), e.get("content", ""),
+             e.get("msg_type", "message"), e.get("timestamp", ""))
+            for e in entries if isinstance(e.get("id"), int)
+        ]
+        with self._lock:
+            if replace:
+                self._conn.execute("DELETE FROM messages WHERE channel = ?", (channel,))
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO messages (channel, id, sender, content, msg_type, timestamp) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+            self._inserts += len(rows)
+            if self._inserts >= EVICT_EVERY:
+                self._inserts = 0
+                self._evict()
+
+    def load_channel(self, channel: str, limit: int = 500) -> list[dict]:
+        """Newest `limit` cached messages of a channel, in chronological order."""
+        with self._lock:
+            rows = self._conn.execute(
+                """SELECT id, sender, content, msg_type, timestamp FROM messages
+                   WHERE channel = ? ORDER BY id DESC LIMIT ?""",
+                (channel, limit),
+            ).fetchall()
+        return [dict(r) for r in reversed(rows)]
+
+    def max_id(self, channel: str) -> int | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MAX(id) FROM messages WHERE channel = ?", (channel,)
+            ).fetchone()
+        return row[0]
+
+    # --- Private messages ---
+
+    def store_private_message(self, peer: str, sender: str, content: str, timestamp: str = ""):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO private_messages (peer, sender, content, timestamp) VALUES (?, ?, ?, ?)",
+                (peer, sender, content, timestamp),
+            )
+            self._conn.commit()
+            self._inserts += 1
+            if self._inserts >= EVICT_EVERY:
+                self._inserts = 0
+                self._evict()
+
+    def load_private_messages(self, peer: str | None = None, limit: int = 200) -> list[dict]:
+        """Newest cached PMs (optionally with one peer), in chronological order."""
+        with self._lock:
+            if peer is None:
+                rows = self._conn.execute(
+                    "SELECT peer, sender, content, timestamp FROM private_messages ORDER BY id DESC LIMIT ?",
+                    (limit,),
+                ).fetchall()
+            else:
+                rows = self._conn.execute(
+                    """SELECT peer, sender, content, timestamp FROM private_messages
+                       WHERE peer = ? COLLATE NOCASE ORDER BY id DESC LIMIT ?""",
+                    (peer, limit),
+                ).fetchall()
+        return [dict(r) for r in reversed(rows)]
+
+    # --- Eviction ---
+
+    def _evict(self):
+        """Drop the oldest rows beyond the per-channel, total and PM caps.
+        Caller must hold the lock."""
+        conn = self._conn
+        channels = [r[0] for r in conn.execute(
+            "SELECT channel FROM messages GROUP BY channel HAVING COUNT(*) > ?", (self.max_per_channel,)
+        )]
+        for channel in channels:
+            conn.execute(
+                """DELETE FROM messages WHERE channel = ? AND id <= (
+                       SELECT id FROM messages WHERE channel = ? ORDER BY id DESC LIMIT 1 OFFSET ?)""",
+                (channel, channel, self.max_per_channel),
+            )
+        conn.execute(
+            """DELETE FROM messages WHERE id <= (
+                   SELECT id FROM messages ORDER BY id DESC LIMIT 1 OFFSET ?)""",
+            (self.max_total,),
+        )
+        conn.execute(
+            """DELETE FROM private_messages WHERE id <= (
+                   SELECT id FROM private_messages ORDER BY id DESC LIMIT 1 OFFSET ?)""",
+            (self.max_pms,),
+        )
+        conn.commit()
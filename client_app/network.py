@@ -1,32 +1,81 @@
 """Client-side network layer: connection, TLS, send/receive."""
 
+import collections
+import random
 import socket
-import ssl
 import threading
+import time
 
-from shared.protocol import MessageReader, send_message
+from shared.protocol import MessageReader, encode_message
 from shared.constants import SOCKET_TIMEOUT
 
+SEND_QUEUE_MAX = 1000          # frames waiting to be written
+SEND_TIMEOUT = 10.0            # seconds a frame may wait before it is dropped
+MAX_COALESCE_BYTES = 64 * 1024  # bytes joined into a single write
+
+RECONNECT_BASE_DELAY = 0.5     # seconds
+RECONNECT_MAX_DELAY = 30.0
+
+
+class Backoff:
+    """Exponential backoff with full jitter.
+
+    Each delay is drawn uniformly from [0, min(max_delay, base * 2**attempt)],
+    so clients that lost the connection at the same moment spread out
+    instead of reconnecting in lockstep.
+    """
+
+    def __init__(self, base: float = RECONNECT_BASE_DELAY, max_delay: float = RECONNECT_MAX_DELAY):
+        self.base = base
+        self.max_delay = max_delay
+        self.attempt = 0
+
+    def next_delay(self) -> float:
+        ceiling = min(self.max_delay, self.base * (2 ** self.attempt))
+        self.attempt = min(self.attempt + 1, 32)
+        return random.uniform(0, ceiling)
+
+    def reset(self):
+        self.attempt = 0
+
 
 class NetworkClient:
     def __init__(self):
         self.sock = None
         self._reader = None
         self._recv_thread = None
+        self._writer_thread = None
         self._connected = False
         self._callback = None
+        self._endpoint = None  # (host, port, use_tls) of the last connect()
+
+        # Outbound frames: (deadline or None, encoded bytes, msg type)
+        self._outbox = collections.deque()
+        self._send_cond = threading.Condition()
 
     @property
     def connected(self) -> bool:
         return self._connected
 
+    @property
+    def endpoint(self) -> tuple | None:
+        """(host, port, use_tls) of the last connect(), or None."""
+        return self._endpoint
+
+    @property
+    def queue_depth(self) -> int:
+        """Frames queued but not yet written to the socket."""
+        return len(self._outbox)
+
     def connect(self, host: str, port: int, use_tls: bool = False):
         """Connect to the chat server."""
+        self._endpoint = (host, port, use_tls)
         raw_sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         raw_sock.settimeout(SOCKET_TIMEOUT)
         raw_sock.connect((host, port))
 
         if use_tls:
+            import ssl  # deferred: only TLS connections pay for loading it
             context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
             context.check_hostname = False
             context.verify_mode = ssl.CERT_NONE  # self-signed certs
@@ -36,6 +85,18 @@ class NetworkClient:
 
         self._connected = True
         self._reader = MessageReader(self.sock)
+        with self._send_cond:
+            self._outbox.clear()
+        self._writer_thread = threading.Thread(target=self._writer_loop, args=(self.sock,), daemon=True)
+        self._writer_thread.start()
+
+    def reconnect(self):
+        """Reconnect to the last endpoint and resume delivering to the same callback."""
+        if not self._endpoint:
+            raise ConnectionError("Never connected")
+        self.disconnect()
+        self.connect(*self._endpoint)
+        self.start_recv_loop(self._callback)
 
     def start_recv_loop(self, callback):
         """Start a background thread that calls callback(msg_dict) for each message.
@@ -56,18 +117,72 @@ class NetworkClient:
             pass
         finally:
             self._connected = False
+            with self._send_cond:
+                self._send_cond.notify_all()
             if self._callback:
                 self._callback({"type": "_disconnected"})
 
-    def send(self, msg: dict):
-        """Send a message dict to the server."""
+    def send(self, msg: dict, timeout: float | None = SEND_TIMEOUT):
+        """Queue a message dict for the writer thread. Never blocks on the network.
+
+        If the frame is still queued after `timeout` seconds it is dropped
+        and the callback receives {"type": "_send_failed", ...}.
+
+        Raises:
+            ConnectionError: If not connected or the send queue is full.
+        """
         if not self._connected or not self.sock:
             raise ConnectionError("Not connected")
-        send_message(self.sock, msg)
+        payload = encode_message(msg)
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        with self._send_cond:
+            if len(self._outbox) >= SEND_QUEUE_MAX:
+                raise ConnectionError("Send queue full")
+            self._outbox.append((deadline, payload, msg.get("type", "")))
+            self._send_cond.notify()
+
+    def _writer_loop(self, sock):
+        """Drain the outbox, joining queued frames into single writes."""
+        while True:
+            with self._send_cond:
+                while not self._outbox and self._connected and self.sock is sock:
+                    self._send_cond.wait()
+                if not self._connected or self.sock is not sock:
+                    return
+                batch = []
+                size = 0
+                while self._outbox and size < MAX_COALESCE_BYTES:
+                    item = self._outbox.popleft()
+                    batch.append(item)
+                    size += len(item[1])
+
+            now = time.monotonic()
+            data = []
+            for deadline, payload, msg_type in batch:
+                if deadline is not None and now > deadline:
+                    if self._callback:
+                        self._callback({"type": "_send_failed", "msg_type": msg_type, "reason": "timeout"})
+                else:
+                    data.append(payload)
+            if not data:
+                continue
+            try:
+                sock.sendall(b"".join(data))
+            except OSError:
+                # Shutting the socket down ends the recv loop, which reports the disconnect.
+                self._connected = False
+                try:
+                    sock.shutdown(socket.SHUT_RDWR)
+                except Exception:
+                    pass
+                return
 
     def disconnect(self):
         """Disconnect from the server."""
         self._connected = False
+        with self._send_cond:
+            self._outbox.clear()
+            self._send_cond.notify_all()
         if self.sock:
             try:
                 self.sock.shutdown(socket.SHUT_RDWR)
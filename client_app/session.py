@@ -10,15 +10,25 @@ class Session:
         self.current_channel = None
         self.channels = []  # list of channel dicts
         self.authenticated = False
+        self.last_message_ids = {}  # channel_name -> highest message id seen
 
     def set_authenticated(self, username: str, token: str):
         self.username = username
         self.token = token
         self.authenticated = True
 
+    def note_message(self, channel: str, msg_id):
+        """Remember the newest message id seen in a channel (for backfill)."""
+        if isinstance(msg_id, int) and msg_id > self.last_message_ids.get(channel, 0):
+            self.last_message_ids[channel] = msg_id
+
+    def last_message_id(self, channel: str) -> int | None:
+        return self.last_message_ids.get(channel)
+
     def clear(self):
         self.username = None
         self.token = None
         self.current_channel = None
         self.channels = []
         self.authenticated = False
+        self.last_message_ids = {}
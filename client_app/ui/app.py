@@ -1,25 +1,36 @@
 """Main CustomTkinter application - orchestrates screens and network."""
 
+import queue
+import sqlite3
 import threading
+import time
 import customtkinter as ctk
 
-from client_app.network import NetworkClient
+from client_app.network import NetworkClient, Backoff
 from client_app.session import Session
+from client_app.formatting import prepare_message, rows_from_history
+from client_app.history_cache import HistoryCache
+from client_app.channel_cache import ChannelViews
 from client_app.ui.theme import (
-    BG_DARKEST, MIN_WINDOW_WIDTH, MIN_WINDOW_HEIGHT, FONT_FAMILY,
+    BG_DARKEST, MIN_WINDOW_WIDTH, MIN_WINDOW_HEIGHT,
 )
 from client_app.ui.login_screen import LoginScreen
-from client_app.ui.chat_screen import ChatScreen
-from client_app.ui.notifications import notify
+from client_app.ui.notifications import NotificationDispatcher
 from shared.constants import (
-    MSG_AUTH_LOGIN, MSG_AUTH_REGISTER, MSG_AUTH_RESULT,
-    MSG_CHANNEL_JOIN, MSG_CHANNEL_CREATE, MSG_CHANNEL_LIST,
-    MSG_CHANNEL_INFO, MSG_CHANNEL_JOINED, MSG_CHANNEL_CREATED,
+    MSG_AUTH_LOGIN, MSG_AUTH_REGISTER, MSG_AUTH_RESULT, MSG_AUTH_RESUME,
+    MSG_CHANNEL_JOIN, MSG_CHANNEL_CREATE,
+    MSG_CHANNEL_INFO, MSG_CHANNEL_JOINED, MSG_CHANNEL_CREATED, MSG_CHANNEL_HISTORY,
+    MSG_HISTORY_CHUNK, MSG_MEMBER_CHUNK,
     MSG_MESSAGE, MSG_PRIVATE_MESSAGE, MSG_ACTION,
     MSG_USER_LIST, MSG_USER_JOINED, MSG_USER_LEFT, MSG_STATUS_CHANGE,
-    MSG_ERROR, MSG_SYSTEM,
+    MSG_ERROR, MSG_SYSTEM, MESSAGE_HISTORY_LIMIT,
 )
 
+UI_TICK_MS = 16          # how often the main thread drains received frames
+MAX_FRAMES_PER_TICK = 2000
+PREFETCH_CHANNELS = 2    # channels refreshed in the background after each switch
+PREFETCH_INTERVAL = 30.0  # seconds before the same channel is prefetched again
+
 
 class ChatApp:
     def __init__(self):
@@ -37,12 +48,48 @@ class ChatApp:
 
         self._login_screen = None
         self._chat_screen = None
-        self._pending_auth_action = None  # "login" or "register"
+        self._pending_auth_action = None  # "login", "register" or "resume"
+        self._auth_request = None  # login/register frame, kept to retry when the server defers it
+        self._closing = False
+        self._reconnect_stop = None  # threading.Event while a reconnect loop runs
 
         self._channel_descriptions = {}  # channel_name -> description
+        self._cache = None  # HistoryCache for the logged-in account
+        self._views = ChannelViews()  # recently viewed channels, for instant switching
+        self._prefetched = {}  # channel_name -> monotonic time of last prefetch
+        self._notifier = NotificationDispatcher()
+        self._join = None  # state of the channel join being streamed in (main thread)
+        self._cache_joins = {}  # channel -> {"since_id", "history", "live"} being streamed (recv thread)
+
+        # Frames from the recv thread, drained on the main thread each tick
+        self._inbox = queue.SimpleQueue()
+        # Message type -> handler; "_"-prefixed types are local events from NetworkClient
+        self._handlers = {
+            MSG_AUTH_RESULT: self._handle_auth_result,
+            MSG_CHANNEL_INFO: self._handle_channel_info,
+            MSG_CHANNEL_JOINED: self._handle_channel_joined,
+            MSG_HISTORY_CHUNK: self._handle_history_chunk,
+            MSG_MEMBER_CHUNK: self._handle_member_chunk,
+            MSG_CHANNEL_HISTORY: self._handle_channel_history,
+            MSG_CHANNEL_CREATED: self._handle_channel_created,
+            MSG_MESSAGE: self._handle_chat_message,
+            MSG_PRIVATE_MESSAGE: self._handle_private_message,
+            MSG_ACTION: self._handle_action,
+            MSG_USER_JOINED: self._handle_user_joined,
+            MSG_USER_LEFT: self._handle_user_left,
+            MSG_USER_LIST: self._handle_user_list,
+            MSG_STATUS_CHANGE: self._handle_status_change,
+            MSG_ERROR: self._handle_error,
+            MSG_SYSTEM: self._handle_system,
+            "_disconnected": lambda msg: self._handle_disconnect(),
+            "_connect_error": lambda msg: self._on_connect_error(msg.get("error", "")),
+            "_send_failed": self._handle_send_failed,
+            "_reconnect_done": self._handle_reconnect_done,
+        }
 
         self._show_login_screen()
         self.root.protocol("WM_DELETE_WINDOW", self._on_close)
+        self.root.after(UI_TICK_MS, self._drain_inbox)
 
     def run(self):
         self.root.mainloop()
@@ -68,6 +115,9 @@ class ChatApp:
             self._login_screen.destroy()
             self._login_screen = None
 
+        # Imported on first use: the chat screen and its components are not
+        # needed to show the login screen.
+        from client_app.ui.chat_screen import ChatScreen
         self._chat_screen = ChatScreen(
             self.root,
             on_send_message=self._on_send_message,
@@ -88,19 +138,30 @@ class ChatApp:
         self._connect_and_auth(username, password, host, port, use_tls, MSG_AUTH_REGISTER)
 
     def _connect_and_auth(self, username, password, host, port, use_tls, auth_type):
+        request = self._auth_request = {
+            "type": auth_type,
+            "username": username,
+            "password": password,
+        }
+
         def task():
             try:
                 self.network.connect(host, port, use_tls)
                 self.network.start_recv_loop(self._on_message_received)
-                self.network.send({
-                    "type": auth_type,
-                    "username": username,
-                    "password": password,
-                })
+                self.network.send(request)
             except Exception as e:
-                self.root.after(0, lambda: self._on_connect_error(str(e)))
+                self._inbox.put({"type": "_connect_error", "error": str(e)})
         threading.Thread(target=task, daemon=True).start()
 
+    def _retry_auth(self):
+        request = self._auth_request
+        if request is None or self.session.authenticated:
+            return
+        try:
+            self.network.send(request)
+        except Exception as e:
+            self._on_connect_error(str(e))
+
     def _on_connect_error(self, error):
         if self._login_screen:
             self._login_screen.set_status(f"Connection failed: {error}")
@@ -109,48 +170,150 @@ class ChatApp:
     # --- Network message dispatcher (called from recv thread) ---
 
     def _on_message_received(self, msg: dict):
-        """Called from the network recv thread. Schedules UI updates on main thread."""
-        self.root.after(0, lambda: self._dispatch_message(msg))
+        """Called from the network recv thread. Does Tk-free preparation here
+        (including the disk cache write) and queues the frame for the main thread."""
+        self._update_cache(msg)
+        self._inbox.put(prepare_message(msg))
+
+    def _update_cache(self, msg: dict):
+        """Record received messages in the on-disk history cache (recv thread)."""
+        msg_type = msg.get("type")
+        try:
+            if msg_type == MSG_AUTH_RESULT:
+                if msg.get("success") and not msg.get("resumed"):
+                    self._open_cache(msg.get("username", ""))
+                return
+            cache = self._cache
+            if cache is None:
+                return
+            if msg_type in (MSG_MESSAGE, MSG_ACTION):
+                channel = msg.get("channel", "")
+                entry = {
+                    "id": msg.get("id"),
+                    "sender": msg.get("sender", ""),
+                    "content": msg.get("content", ""),
+                    "msg_type": "action" if msg_type == MSG_ACTION else "message",
+                    "timestamp": msg.get("timestamp", ""),
+                }
+                join = self._cache_joins.get(channel)
+                if join is not None:
+                    join["live"].append(entry)  # stored after the join's history
+                else:
+                    cache.store_messages(channel, [entry])
+            elif msg_type == MSG_CHANNEL_JOINED:
+                channel = msg.get("channel", "")
+                previous = self._cache_joins.get(channel)
+                if previous is not None and previous["live"]:
+                    cache.store_messages(channel, previous["live"])
+                self._cache_joins[channel] = {"since_id": "since_id" in msg, "history": [], "live": []}
+            elif msg_type == MSG_HISTORY_CHUNK:
+                # Chunks arrive newest first; store the join's history once complete
+                channel = msg.get("channel", "")
+                join = self._cache_joins.get(channel)
+                if join is not None:
+                    join["history"][:0] = msg.get("history", [])
+                    if msg.get("last"):
+                        del self._cache_joins[channel]
+                        self._store_history(cache, channel, join["history"], join["since_id"], msg.get("complete"))
+                        if join["live"]:
+                            cache.store_messages(channel, join["live"])
+            elif msg_type == MSG_CHANNEL_HISTORY:
+                self._store_history(cache, msg.get("channel", ""), msg.get("history", []),
+                                    "since_id" in msg, msg.get("complete"))
+            elif msg_type == MSG_PRIVATE_MESSAGE:
+                cache.store_private_message(
+                    msg.get("to") or msg.get("from", ""), msg.get("from", ""),
+                    msg.get("content", ""), msg.get("timestamp", ""),
+                )
+        except sqlite3.Error as e:
+            print(f"[CLIENT] History cache error: {e}")
+
+    @staticmethod
+    def _store_history(cache: HistoryCache, channel: str, history: list[dict], backfill: bool, complete):
+        if backfill:
+            contiguous = bool(complete)
+        else:
+            # complete=False without since_id: the server sent a shortened page under load
+            cached_max = cache.max_id(channel)
+            contiguous = (len(history) < MESSAGE_HISTORY_LIMIT and complete is not False) or (
+                cached_max is not None and history[0].get("id", 0) <= cached_max
+            )
+        cache.store_messages(channel, history, replace=not contiguous)
+
+    def _open_cache(self, username: str):
+        self._close_cache()
+        endpoint = self.network.endpoint
+        if not endpoint or not username:
+            return
+        try:
+            self._cache = HistoryCache.for_account(endpoint[0], endpoint[1], username)
+        except (OSError, sqlite3.Error) as e:
+            print(f"[CLIENT] History cache unavailable: {e}")
+
+    def _close_cache(self):
+        cache, self._cache = self._cache, None
+        if cache is not None:
+            cache.close()
+
+    def _drain_inbox(self):
+        """Dispatch every queued frame in one batch; widgets coalesce their
+        redraws, so a burst costs a single layout pass."""
+        try:
+            for _ in range(MAX_FRAMES_PER_TICK):
+                try:
+                    msg = self._inbox.get_nowait()
+                except queue.Empty:
+                    break
+                try:
+                    self._dispatch_message(msg)
+                except Exception as e:
+                    print(f"[CLIENT] Error handling {msg.get('type')}: {e}")
+        finally:
+            self.root.after(UI_TICK_MS, self._drain_inbox)
 
     def _dispatch_message(self, msg: dict):
-        msg_type = msg.get("type", "")
-
-        if msg_type == MSG_AUTH_RESULT:
-            self._handle_auth_result(msg)
-        elif msg_type == MSG_CHANNEL_INFO:
-            self._handle_channel_info(msg)
-        elif msg_type == MSG_CHANNEL_JOINED:
-            self._handle_channel_joined(msg)
-        elif msg_type == MSG_CHANNEL_CREATED:
-            self._handle_channel_created(msg)
-        elif msg_type == MSG_MESSAGE:
-            self._handle_chat_message(msg)
-        elif msg_type == MSG_PRIVATE_MESSAGE:
-            self._handle_private_message(msg)
-        elif msg_type == MSG_ACTION:
-            self._handle_action(msg)
-        elif msg_type == MSG_USER_JOINED:
-            self._handle_user_joined(msg)
-        elif msg_type == MSG_USER_LEFT:
-            self._handle_user_left(msg)
-        elif msg_type == MSG_USER_LIST:
-            self._handle_user_list(msg)
-        elif msg_type == MSG_STATUS_CHANGE:
-            self._handle_status_change(msg)
-        elif msg_type == MSG_ERROR:
-            self._handle_error(msg)
-        elif msg_type == MSG_SYSTEM:
-            self._handle_system(msg)
-        elif msg_type == "_disconnected":
-            self._handle_disconnect()
+        handler = self._handlers.get(msg.get("type", ""))
+        if handler is not None:
+            handler(msg)
 
     # --- Message handlers ---
 
+    def _handle_reconnect_done(self, msg):
+        self._reconnect_stop = None
+        if not self.network.connected:
+            self._handle_disconnect()  # dropped again before the resume landed
+
     def _handle_auth_result(self, msg):
+        if msg.get("resumed"):
+            self._pending_auth_action = None
+            if msg.get("success"):
+                self.session.set_authenticated(msg["username"], msg.get("token"))
+                if self._chat_screen:
+                    self._chat_screen.message_area.add_system_message("Reconnected.")
+            return
+        if self._pending_auth_action == "resume" and not msg.get("success"):
+            # Token no longer valid: fall back to a manual login.
+            self._pending_auth_action = None
+            self.session.clear()
+            self._reset_views()
+            self._close_cache()
+            self.network.disconnect()
+            self._show_login_screen()
+            self._login_screen.set_status(msg.get("error", "Session expired. Please log in again."))
+            return
         if msg.get("success"):
+            self._auth_request = None
             self.session.set_authenticated(msg["username"], msg.get("token"))
+            self._reset_views()
             self._show_chat_screen()
+        elif msg.get("code") == "overloaded" and self._auth_request is not None:
+            # The server defers logins while shedding load; retry as hinted
+            delay = float(msg.get("retry_after", 5))
+            if self._login_screen:
+                self._login_screen.set_status(f"Server busy, retrying in {delay:.0f}s...")
+            self.root.after(int(delay * 1000), self._retry_auth)
         else:
+            self._auth_request = None
             if self._login_screen:
                 self._login_screen.set_status(msg.get("error", "Authentication failed."))
                 self._login_screen.reset_buttons()
@@ -163,18 +326,112 @@ class ChatApp:
             self._chat_screen.sidebar_channels.set_channels(channels)
 
     def _handle_channel_joined(self, msg):
+        """Join header; history_chunk and member_chunk frames follow."""
         channel = msg.get("channel", "")
+        previous = self._join
+        self._join = {
+            "channel": channel,
+            # The view already shows this channel; only newer messages follow
+            "backfill": "since_id" in msg and channel == self.session.current_channel,
+            "pending": [],       # backfill entries, applied once complete
+            "rows": None,        # view being filled by a full load
+            "members": False,    # first member chunk seen
+            "live": [],          # live messages that overtook the history
+        }
         self.session.current_channel = channel
         if self._chat_screen:
             self._chat_screen.sidebar_channels.set_active_channel(channel)
             self._chat_screen.top_bar.set_channel(channel, self._channel_descriptions.get(channel, ""))
-            self._chat_screen.message_area.load_history(msg.get("history", []))
             self._chat_screen.message_input.set_placeholder(channel)
             self._chat_screen.message_input.focus_input()
+        if previous is not None and previous["live"]:
+            for live in previous["live"]:  # the last join was cut short
+                self._dispatch_message(live)
+        self._prefetch(channel)
+
+    def _held_for_join(self, channel: str, msg: dict) -> bool:
+        """Live messages can arrive ahead of a join's history (history goes
+        out in the server's bulk lane); hold them until the history is in."""
+        join = self._join
+        if join is None or join["live"] is None or join["channel"] != channel:
+            return False
+        join["live"].append(msg)
+        return True
+
+    def _handle_history_chunk(self, msg):
+        join = self._join
+        if join is None or msg.get("channel", "") != join["channel"]:
+            return
+        self._apply_history_chunk(join, msg)
+        if msg.get("last"):
+            held, join["live"] = join["live"], None
+            for live in held or ():
+                self._dispatch_message(live)
+
+    def _apply_history_chunk(self, join: dict, msg: dict):
+        """Paint the first (newest) page as soon as it arrives and put older
+        pages above it."""
+        channel = join["channel"]
+        history = msg.get("history", [])
+        for entry in history:
+            self.session.note_message(channel, entry.get("id"))
+        if not self._chat_screen:
+            return
+        area = self._chat_screen.message_area
+
+        if join["backfill"]:
+            join["pending"][:0] = history
+            if not msg.get("last"):
+                return
+            if msg.get("complete"):
+                for entry in join["pending"]:
+                    area.add_message(
+                        entry.get("sender", ""), entry.get("content", ""), entry.get("timestamp", ""),
+                        msg_type=entry.get("msg_type", "message"), msg_id=entry.get("id"),
+                        time_str=entry.get("time_str"),
+                    )
+            else:
+                # More was missed than one history page: start the view afresh
+                entries = self._cache.load_channel(channel) if self._cache is not None else join["pending"]
+                area.attach(self._views.put_history(channel, entries))
+            return
 
-            users = msg.get("users", [])
+        if join["rows"] is None:
+            join["rows"] = self._views.put_history(channel, history)
+            area.attach(join["rows"])
+        else:
+            area.prepend(rows_from_history(history))
+        if msg.get("last") and self._cache is not None:
+            # The recv thread has merged the page into the disk cache, which may hold more
+            entries = self._cache.load_channel(channel)
+            if len(entries) > len(join["rows"]):
+                area.attach(self._views.put_history(channel, entries))
+
+    def _handle_member_chunk(self, msg):
+        join = self._join
+        if join is None or msg.get("channel") != join["channel"] or not self._chat_screen:
+            return
+        users = msg.get("users", [])
+        if join["members"]:
+            self._chat_screen.sidebar_users.add_users(users)
+        else:
+            join["members"] = True
             self._chat_screen.sidebar_users.set_users(users)
 
+    def _handle_channel_history(self, msg):
+        """A background prefetch reply: refresh the channel's cached view."""
+        channel = msg.get("channel", "")
+        history = msg.get("history", [])
+        for entry in history:
+            self.session.note_message(channel, entry.get("id"))
+        if channel == self.session.current_channel:
+            return  # the join reply is authoritative for the shown channel
+        if channel in self._views:
+            self._views.merge_history(channel, history, complete="since_id" in msg and bool(msg.get("complete")))
+        else:
+            entries = self._cache.load_channel(channel) if self._cache is not None else history
+            self._views.put_history(channel, entries, recent=False)
+
     def _handle_channel_created(self, msg):
         channel = msg.get("channel", {})
         name = channel.get("name", "")
@@ -188,15 +445,24 @@ class ChatApp:
         if not self._chat_screen:
             return
         channel = msg.get("channel", "")
+        if self._held_for_join(channel, msg):
+            return
         sender = msg.get("sender", "")
         content = msg.get("content", "")
         timestamp = msg.get("timestamp", "")
+        self.session.note_message(channel, msg.get("id"))
 
         if channel == self.session.current_channel:
-            self._chat_screen.message_area.add_message(sender, content, timestamp)
+            self._chat_screen.message_area.add_message(
+                sender, content, timestamp, msg_id=msg.get("id"), time_str=msg.get("time_str"),
+            )
         else:
+            self._views.merge_history(channel, [msg])
             # Notification for message in another channel
-            notify(f"#{channel}", f"{sender}: {content}")
+            self._notifier.notify(
+                f"#{channel}", f"#{channel}", f"{sender}: {content}",
+                summary=f"{{count}} new messages in #{channel}",
+            )
 
     def _handle_private_message(self, msg):
         if not self._chat_screen:
@@ -209,24 +475,33 @@ class ChatApp:
         if to_user:
             # This is our sent message echoed back
             self._chat_screen.message_area.add_message(
-                f"[PM -> {to_user}]", content, timestamp
+                f"[PM -> {to_user}]", content, timestamp, time_str=msg.get("time_str")
             )
         else:
             # Incoming PM
             self._chat_screen.message_area.add_message(
-                f"[PM] {from_user}", content, timestamp
+                f"[PM] {from_user}", content, timestamp, time_str=msg.get("time_str")
+            )
+            self._notifier.notify(
+                f"pm:{from_user}", f"PM from {from_user}", content,
+                summary=f"{{count}} new messages from {from_user}",
             )
-            notify(f"PM from {from_user}", content)
 
     def _handle_action(self, msg):
         if not self._chat_screen:
             return
         channel = msg.get("channel", "")
+        if self._held_for_join(channel, msg):
+            return
+        self.session.note_message(channel, msg.get("id"))
         if channel == self.session.current_channel:
             self._chat_screen.message_area.add_message(
                 msg.get("sender", ""), msg.get("content", ""),
-                msg.get("timestamp", ""), msg_type="action"
+                msg.get("timestamp", ""), msg_type="action",
+                msg_id=msg.get("id"), time_str=msg.get("time_str"),
             )
+        else:
+            self._views.merge_history(channel, [{**msg, "msg_type": "action"}])
 
     def _handle_user_joined(self, msg):
         if not self._chat_screen:
@@ -252,7 +527,8 @@ class ChatApp:
         self._chat_screen.sidebar_users.set_users(msg.get("users", []))
 
     def _handle_status_change(self, msg):
-        pass  # Could update user status indicators globally
+        if self._chat_screen:
+            self._chat_screen.sidebar_users.set_status(msg.get("username", ""), msg.get("status", "online"))
 
     def _handle_error(self, msg):
         error_text = msg.get("message", "Unknown error")
@@ -266,10 +542,48 @@ class ChatApp:
             self._chat_screen.message_area.add_system_message(msg.get("message", ""))
 
     def _handle_disconnect(self):
+        if self._closing:
+            return
+        if self.session.token and self._chat_screen:
+            self._chat_screen.message_area.add_system_message("Disconnected from server. Reconnecting...")
+            self._start_reconnect()
+            return
         self.session.clear()
         if self._chat_screen:
             self._chat_screen.message_area.add_system_message("Disconnected from server.")
 
+    def _start_reconnect(self):
+        """Reconnect in the background with jittered exponential backoff, then
+        resume the session and backfill the current channel."""
+        if self._reconnect_stop is not None:
+            return
+        stop = self._reconnect_stop = threading.Event()
+        resume = {
+            "type": MSG_AUTH_RESUME,
+            "token": self.session.token,
+            "channel": self.session.current_channel,
+        }
+        last_id = self.session.last_message_id(self.session.current_channel)
+        if last_id is not None:
+            resume["since_id"] = last_id
+        self._pending_auth_action = "resume"
+
+        def task():
+            backoff = Backoff()
+            while not stop.wait(backoff.next_delay()):
+                try:
+                    self.network.reconnect()
+                    self.network.send(resume)
+                    break
+                except Exception:
+                    continue
+            self._inbox.put({"type": "_reconnect_done"})
+        threading.Thread(target=task, daemon=True).start()
+
+    def _handle_send_failed(self, msg):
+        if self._chat_screen and msg.get("msg_type") in (MSG_MESSAGE, MSG_PRIVATE_MESSAGE, MSG_ACTION):
+            self._chat_screen.message_area.add_system_message("A message could not be sent (connection stalled).")
+
     # --- User actions ---
 
     def _on_send_message(self, text: str):
@@ -323,14 +637,57 @@ class ChatApp:
                 self._chat_screen.message_area.add_system_message(f"Unknown command: {cmd}")
 
     def _on_channel_select(self, channel_name: str):
+        join = {"type": MSG_CHANNEL_JOIN, "channel": channel_name}
+        rows = self._views.get(channel_name)
+        if rows is None and self._cache is not None:
+            rows = self._views.put_history(channel_name, self._cache.load_channel(channel_name))
+        if rows is not None and self._chat_screen:
+            # Show the cached view now; the server then sends only newer messages.
+            self.session.current_channel = channel_name
+            self._chat_screen.top_bar.set_channel(channel_name, self._channel_descriptions.get(channel_name, ""))
+            self._chat_screen.message_area.attach(rows)
+            self._chat_screen.message_input.set_placeholder(channel_name)
+            since_id = self._views.max_id(channel_name)
+            if since_id is not None:
+                join["since_id"] = since_id
         try:
-            self.network.send({
-                "type": MSG_CHANNEL_JOIN,
-                "channel": channel_name,
-            })
+            self.network.send(join)
         except Exception:
             pass
 
+    def _prefetch(self, current: str):
+        """Refresh the most recently used and neighbouring channels in the
+        background, so switching to them is instant and already up to date."""
+        names = [ch.get("name", "") for ch in self.session.channels]
+        candidates = self._views.recent(exclude=current)[:1]
+        if current in names:
+            i = names.index(current)
+            candidates += [names[j] for j in (i + 1, i - 1) if 0 <= j < len(names)]
+
+        now = time.monotonic()
+        sent = 0
+        for channel in candidates:
+            if sent >= PREFETCH_CHANNELS:
+                break
+            if not channel or channel == current or now - self._prefetched.get(channel, -PREFETCH_INTERVAL) < PREFETCH_INTERVAL:
+                continue
+            request = {"type": MSG_CHANNEL_HISTORY, "channel": channel}
+            since_id = self._views.max_id(channel)
+            if since_id is None and self._cache is not None and channel not in self._views:
+                since_id = self._cache.max_id(channel)
+            if since_id is not None:
+                request["since_id"] = since_id
+            try:
+                self.network.send(request)
+            except Exception:
+                return
+            self._prefetched[channel] = now
+            sent += 1
+
+    def _reset_views(self):
+        self._views.clear()
+        self._prefetched.clear()
+
     def _on_channel_create(self, name: str):
         try:
             self.network.send({
@@ -342,8 +699,13 @@ class ChatApp:
             pass
 
     def _on_close(self):
+        self._closing = True
+        if self._reconnect_stop is not None:
+            self._reconnect_stop.set()
         try:
             self.network.disconnect()
         except Exception:
             pass
+        self._close_cache()
+        self._notifier.stop()
         self.root.destroy()
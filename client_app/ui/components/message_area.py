@@ -1,130 +1,240 @@
-"""Scrollable message display area."""
+"""Virtualized message display area.
+
+Messages are kept as compact row tuples in a list model; only a fixed pool
+of row widgets exists, and rendering rebinds those widgets to whichever
+rows are visible. Rows are stacked from the bottom up, so the view is
+described by `_end` (one past the newest visible row, None = follow the
+newest message).
+"""
 
 import customtkinter as ctk
-from datetime import datetime
+from client_app.formatting import (
+    KIND, SENDER, CONTENT, TIME, make_row, system_row, last_row_id,
+)
 from client_app.ui.theme import (
-    BG_MAIN, BG_HOVER, TEXT_PRIMARY, TEXT_SECONDARY, ACCENT, ACCENT_GREEN,
+    BG_MAIN, TEXT_PRIMARY, TEXT_SECONDARY, ACCENT_GREEN,
     FONT_FAMILY, FONT_SIZE_NORMAL, FONT_SIZE_SMALL,
 )
+from client_app.ui.wheel import bind_wheel, unbind_wheel
+
+MAX_MESSAGES = 100_000     # oldest rows beyond this are discarded
+_TRIM_SLACK = 1_000        # trim in batches to keep appends O(1) amortized
+MIN_ROW_HEIGHT = 22        # px, a single-line action/system row
+MAX_POOL_SIZE = 80
+WHEEL_STEP = 3             # rows per mouse wheel notch
+
+
+class _MessageRow(ctk.CTkFrame):
+    """A reusable row widget that can display any kind of message."""
+
+    def __init__(self, parent):
+        super().__init__(parent, fg_color="transparent")
+        self._kind = None
+        self._row = None
+
+        # Header line: username + timestamp
+        self.header = ctk.CTkFrame(self, fg_color="transparent")
+        self.sender_label = ctk.CTkLabel(
+            self.header, text="",
+            font=(FONT_FAMILY, FONT_SIZE_NORMAL, "bold"),
+            text_color=ACCENT_GREEN,
+            anchor="w",
+        )
+        self.sender_label.pack(side="left")
+        self.time_label = ctk.CTkLabel(
+            self.header, text="",
+            font=(FONT_FAMILY, FONT_SIZE_SMALL),
+            text_color=TEXT_SECONDARY,
+            anchor="w",
+        )
+        self.time_label.pack(side="left", padx=(8, 0))
+
+        # Message content (also used alone for action/system rows)
+        self.body_label = ctk.CTkLabel(
+            self, text="",
+            font=(FONT_FAMILY, FONT_SIZE_NORMAL),
+            text_color=TEXT_PRIMARY,
+            anchor="w",
+            wraplength=600,
+            justify="left",
+        )
+
+    def show(self, row: tuple):
+        if row is self._row:
+            return
+        self._row = row
+        kind = row[KIND]
+        if kind != self._kind:
+            self._restyle(kind)
+
+        if kind == "message":
+            self.sender_label.configure(text=row[SENDER], text_color=ACCENT_GREEN if row[SENDER] else TEXT_PRIMARY)
+            self.time_label.configure(text=row[TIME])
+            self.body_label.configure(text=row[CONTENT])
+        elif kind == "action":
+            self.body_label.configure(text=f"* {row[SENDER]} {row[CONTENT]}")
+        else:
+            self.body_label.configure(text=row[CONTENT])
+
+    def _restyle(self, kind: str):
+        self._kind = kind
+        self.header.pack_forget()
+        self.body_label.pack_forget()
+        if kind == "message":
+            self.header.pack(fill="x")
+            self.body_label.configure(font=(FONT_FAMILY, FONT_SIZE_NORMAL), text_color=TEXT_PRIMARY)
+        elif kind == "action":
+            self.body_label.configure(font=(FONT_FAMILY, FONT_SIZE_NORMAL, "italic"), text_color=TEXT_SECONDARY)
+        else:
+            self.body_label.configure(font=(FONT_FAMILY, FONT_SIZE_SMALL, "italic"), text_color=TEXT_SECONDARY)
+        self.body_label.pack(fill="x")
 
 
 class MessageArea(ctk.CTkFrame):
     def __init__(self, parent):
         super().__init__(parent, fg_color=BG_MAIN, corner_radius=0)
-        self._auto_scroll = True
-
-        # Scrollable container
-        self.scroll_frame = ctk.CTkScrollableFrame(
-            self, fg_color="transparent",
-            scrollbar_button_color="#4a4d52",
-            scrollbar_button_hover_color="#5c5f63",
+        self._messages: list[tuple] = []
+        self._end = None          # None = pinned to newest message
+        self._pool: list[_MessageRow] = []
+        self._packed = 0          # pool rows currently packed
+        self._render_pending = False
+
+        self.scrollbar = ctk.CTkScrollbar(
+            self, command=self._on_scrollbar,
+            button_color="#4a4d52",
+            button_hover_color="#5c5f63",
         )
-        self.scroll_frame.pack(fill="both", expand=True, padx=0, pady=0)
+        self.scrollbar.pack(side="right", fill="y")
 
-        # Track scroll position for auto-scroll
-        self.scroll_frame.bind("<Configure>", self._on_configure)
+        self.viewport = ctk.CTkFrame(self, fg_color="transparent", corner_radius=0)
+        self.viewport.pack(side="left", fill="both", expand=True)
+        self.viewport.pack_propagate(False)
+        self.viewport.bind("<Configure>", self._on_configure)
 
-    def _on_configure(self, event=None):
-        pass  # Auto-scroll handled in add_message
+        self._wheel_bindings = bind_wheel(self, self._on_mousewheel)
+
+    def destroy(self):
+        unbind_wheel(self, self._wheel_bindings)
+        self._wheel_bindings = []
+        super().destroy()
+
+    # --- Public API ---
 
     def clear(self):
         """Remove all messages."""
-        for widget in self.scroll_frame.winfo_children():
-            widget.destroy()
-
-    def load_history(self, messages: list[dict]):
-        """Load message history. Each msg has sender, content, timestamp, msg_type."""
-        self.clear()
-        for msg in messages:
-            self._render_message(
-                sender=msg.get("sender", ""),
-                content=msg.get("content", ""),
-                timestamp=msg.get("timestamp", ""),
-                msg_type=msg.get("msg_type", "message"),
-            )
-        self._scroll_to_bottom()
-
-    def add_message(self, sender: str, content: str, timestamp: str = "", msg_type: str = "message"):
-        """Add a new message to the display."""
-        self._render_message(sender, content, timestamp, msg_type)
-        self._scroll_to_bottom()
+        self.attach([])
 
-    def add_system_message(self, text: str):
-        """Add a system notification message."""
-        frame = ctk.CTkFrame(self.scroll_frame, fg_color="transparent")
-        frame.pack(fill="x", padx=16, pady=2)
+    def attach(self, rows: list[tuple]):
+        """Display `rows` (a list of formatting.make_row tuples) as the model.
 
-        ctk.CTkLabel(
-            frame, text=text,
-            font=(FONT_FAMILY, FONT_SIZE_SMALL, "italic"),
-            text_color=TEXT_SECONDARY,
-            anchor="w",
-            wraplength=600,
-        ).pack(fill="x")
-        self._scroll_to_bottom()
-
-    def _render_message(self, sender: str, content: str, timestamp: str, msg_type: str):
-        """Render a single message in the chat area."""
-        # Message container
-        msg_frame = ctk.CTkFrame(self.scroll_frame, fg_color="transparent")
-        msg_frame.pack(fill="x", padx=16, pady=3)
-
-        if msg_type == "action":
-            # Action message: * username does something
-            text = f"* {sender} {content}"
-            ctk.CTkLabel(
-                msg_frame, text=text,
-                font=(FONT_FAMILY, FONT_SIZE_NORMAL, "italic"),
-                text_color=TEXT_SECONDARY,
-                anchor="w",
-                wraplength=600,
-            ).pack(fill="x")
+        The list is shared, not copied: messages added to the area are
+        appended to it, which keeps a cached channel view current.
+        """
+        self._messages = rows
+        self._end = None
+        self._schedule_render()
+
+    def prepend(self, rows: list[tuple]):
+        """Insert older rows above the current ones (streamed history)."""
+        if not rows:
             return
+        self._messages[:0] = rows
+        if self._end is not None:
+            self._end += len(rows)
+        self._schedule_render()
+
+    def add_message(self, sender: str, content: str, timestamp: str = "", msg_type: str = "message",
+                    msg_id=None, time_str: str | None = None):
+        """Add a new message to the display. Pass a precomputed `time_str`
+        to skip timestamp formatting on the UI thread."""
+        if msg_id is not None:
+            last_id = last_row_id(self._messages)
+            if last_id is not None and msg_id <= last_id:
+                return  # already shown (e.g. both in a backfill page and live)
+        self._append(make_row(msg_type, sender, content, timestamp, msg_id, time_str))
 
-        # Header line: username + timestamp
-        header = ctk.CTkFrame(msg_frame, fg_color="transparent")
-        header.pack(fill="x")
+    def add_system_message(self, text: str):
+        """Add a system notification message."""
+        self._append(system_row(text))
+
+    # --- Model ---
+
+    def _append(self, row: tuple):
+        self._messages.append(row)
+        if len(self._messages) > MAX_MESSAGES + _TRIM_SLACK:
+            excess = len(self._messages) - MAX_MESSAGES
+            del self._messages[:excess]
+            if self._end is not None:
+                self._end = max(1, self._end - excess)
+        self._schedule_render()
+
+    # --- Rendering ---
+
+    def _schedule_render(self):
+        if not self._render_pending:
+            self._render_pending = True
+            self.after_idle(self._render)
+
+    def _visible_end(self) -> int:
+        return len(self._messages) if self._end is None else self._end
+
+    def _render(self):
+        self._render_pending = False
+        end = self._visible_end()
+        wanted = min(len(self._pool), end)
+
+        # Re-pack only when the number of used rows changes; rows stack
+        # bottom-up so pool[0] always shows the newest visible message.
+        if wanted != self._packed:
+            for row in self._pool[:self._packed]:
+                row.pack_forget()
+            for row in self._pool[:wanted]:
+                row.pack(side="bottom", fill="x", padx=16, pady=3)
+            self._packed = wanted
+
+        for i in range(wanted):
+            self._pool[i].show(self._messages[end - 1 - i])
+        self._update_scrollbar(end, wanted)
+
+    def _update_scrollbar(self, end: int, shown: int):
+        total = len(self._messages)
+        if total == 0 or shown >= total:
+            self.scrollbar.set(0.0, 1.0)
+            return
+        self.scrollbar.set((end - shown) / total, end / total)
 
-        # Username
-        ctk.CTkLabel(
-            header, text=sender,
-            font=(FONT_FAMILY, FONT_SIZE_NORMAL, "bold"),
-            text_color=ACCENT_GREEN if sender else TEXT_PRIMARY,
-            anchor="w",
-        ).pack(side="left")
-
-        # Timestamp
-        time_str = self._format_timestamp(timestamp)
-        if time_str:
-            ctk.CTkLabel(
-                header, text=time_str,
-                font=(FONT_FAMILY, FONT_SIZE_SMALL),
-                text_color=TEXT_SECONDARY,
-                anchor="w",
-            ).pack(side="left", padx=(8, 0))
-
-        # Message content
-        ctk.CTkLabel(
-            msg_frame, text=content,
-            font=(FONT_FAMILY, FONT_SIZE_NORMAL),
-            text_color=TEXT_PRIMARY,
-            anchor="w",
-            wraplength=600,
-            justify="left",
-        ).pack(fill="x")
-
-    def _format_timestamp(self, timestamp: str) -> str:
-        if not timestamp:
-            return ""
-        try:
-            dt = datetime.fromisoformat(timestamp)
-            now = datetime.now(dt.tzinfo)
-            if dt.date() == now.date():
-                return f"Today at {dt.strftime('%H:%M')}"
-            return dt.strftime("%d/%m/%Y %H:%M")
-        except (ValueError, TypeError):
-            return timestamp
-
-    def _scroll_to_bottom(self):
-        """Scroll to the bottom of the message area."""
-        self.scroll_frame.after(50, lambda: self.scroll_frame._parent_canvas.yview_moveto(1.0))
+    def _on_configure(self, event=None):
+        """Grow the row pool to cover the viewport height."""
+        height = self.viewport.winfo_height()
+        needed = min(MAX_POOL_SIZE, height // MIN_ROW_HEIGHT + 1)
+        while len(self._pool) < needed:
+            self._pool.append(_MessageRow(self.viewport))
+        self._schedule_render()
+
+    # --- Scrolling ---
+
+    def _scroll_to(self, end: int):
+        total = len(self._messages)
+        lowest = min(total, max(1, len(self._pool) // 2))
+        end = max(lowest, min(total, end))
+        self._end = None if end >= total else end
+        self._schedule_render()
+
+    def _on_scrollbar(self, *args):
+        total = len(self._messages)
+        if not total:
+            return
+        if args[0] == "moveto":
+            shown = max(1, self._packed)
+            self._scroll_to(int(float(args[1]) * total) + shown)
+        elif args[0] == "scroll":
+            step = int(args[1]) * (max(1, self._packed - 1) if args[2] == "pages" else WHEEL_STEP)
+            self._scroll_to(self._visible_end() + step)
+
+    def _on_mousewheel(self, event):
+        if not str(event.widget).startswith(str(self)):
+            return
+        if event.num == 4 or getattr(event, "delta", 0) > 0:
+            self._scroll_to(self._visible_end() - WHEEL_STEP)
+        else:
+            self._scroll_to(self._visible_end() + WHEEL_STEP)
@@ -1,18 +1,81 @@
-"""Right sidebar: online user list with status indicators."""
+"""Right sidebar: online user list with status indicators.
+
+Members are kept in a sorted model (online first, then by name) that is
+updated in place with bisect, so joins, leaves and status changes never
+re-sort the list. Only a small pool of row widgets exists; rendering
+rebinds them to the rows in view, so large channels cost the same as
+small ones.
+"""
+
+import bisect
 
 import customtkinter as ctk
 from client_app.ui.theme import (
     BG_DARK, TEXT_PRIMARY, TEXT_SECONDARY, SEPARATOR,
     STATUS_ONLINE, STATUS_OFFLINE,
-    FONT_FAMILY, FONT_SIZE_NORMAL, FONT_SIZE_SMALL, USER_SIDEBAR_WIDTH,
+    FONT_FAMILY, FONT_SIZE_NORMAL, USER_SIDEBAR_WIDTH,
 )
+from client_app.ui.wheel import bind_wheel, unbind_wheel
+
+ROW_HEIGHT = 38        # px, row frame plus padding
+MAX_POOL_SIZE = 60
+WHEEL_STEP = 3         # rows per mouse wheel notch
+
+
+def _sort_key(username: str, status: str) -> tuple:
+    return (status != "online", username.casefold(), username)
+
+
+class _UserRow(ctk.CTkFrame):
+    """A reusable row widget showing one member."""
+
+    def __init__(self, parent):
+        super().__init__(parent, fg_color="transparent", height=36)
+        self.pack_propagate(False)
+        self._shown = None
+
+        self.dot = ctk.CTkLabel(
+            self, text="●",  # Filled circle
+            font=(FONT_FAMILY, 10),
+            text_color=STATUS_ONLINE,
+            width=20,
+        )
+        self.dot.pack(side="left", padx=(4, 0))
+
+        self.name_label = ctk.CTkLabel(
+            self, text="",
+            font=(FONT_FAMILY, FONT_SIZE_NORMAL),
+            text_color=TEXT_PRIMARY,
+            anchor="w",
+        )
+        self.name_label.pack(side="left", padx=(4, 0), fill="x", expand=True)
+
+    def show(self, username: str, status: str):
+        if self._shown == (username, status):
+            return
+        online = status == "online"
+        if self._shown is None or (self._shown[1] == "online") != online:
+            self.dot.configure(text_color=STATUS_ONLINE if online else STATUS_OFFLINE)
+            self.name_label.configure(text_color=TEXT_PRIMARY if online else TEXT_SECONDARY)
+        self.name_label.configure(text=username)
+        self._shown = (username, status)
 
 
 class SidebarUsers(ctk.CTkFrame):
     def __init__(self, parent):
         super().__init__(parent, fg_color=BG_DARK, width=USER_SIDEBAR_WIDTH, corner_radius=0)
         self.pack_propagate(False)
-        self._user_frames: dict[str, ctk.CTkFrame] = {}
+
+        # Sorted model: parallel lists of sort keys and usernames
+        self._keys: list[tuple] = []
+        self._names: list[str] = []
+        self._status: dict[str, str] = {}
+        self._online = 0
+
+        self._top = 0             # index of the first visible row
+        self._pool: list[_UserRow] = []
+        self._packed = 0
+        self._render_pending = False
 
         self._build_ui()
 
@@ -39,61 +102,175 @@ class SidebarUsers(ctk.CTkFrame):
         # Separator
         ctk.CTkFrame(self, fg_color=SEPARATOR, height=1, corner_radius=0).pack(fill="x")
 
-        # Scrollable user list
-        self.user_list = ctk.CTkScrollableFrame(
-            self, fg_color="transparent",
-            scrollbar_button_color="#3f4147",
-            scrollbar_button_hover_color="#5c5f63",
+        # Virtualized user list
+        body = ctk.CTkFrame(self, fg_color="transparent", corner_radius=0)
+        body.pack(fill="both", expand=True, padx=8, pady=8)
+
+        self.scrollbar = ctk.CTkScrollbar(
+            body, command=self._on_scrollbar,
+            button_color="#3f4147",
+            button_hover_color="#5c5f63",
         )
-        self.user_list.pack(fill="both", expand=True, padx=8, pady=8)
+        self.scrollbar.pack(side="right", fill="y")
+
+        self.viewport = ctk.CTkFrame(body, fg_color="transparent", corner_radius=0)
+        self.viewport.pack(side="left", fill="both", expand=True)
+        self.viewport.pack_propagate(False)
+        self.viewport.bind("<Configure>", self._on_configure)
+
+        self._wheel_bindings = bind_wheel(self, self._on_mousewheel)
+
+    def destroy(self):
+        unbind_wheel(self, self._wheel_bindings)
+        self._wheel_bindings = []
+        super().destroy()
+
+    # --- Public API ---
+
+    @property
+    def count(self) -> int:
+        """Members currently shown as online."""
+        return self._online
 
     def set_users(self, users: list[dict]):
-        """Update the user list. Each user dict has 'username' and 'status'."""
-        # Clear existing
-        for frame in self._user_frames.values():
-            frame.destroy()
-        self._user_frames.clear()
+        """Replace the member list. Each user dict has 'username' and 'status'.
 
+        Applied as a diff against the current list; a mostly different list
+        (e.g. after switching channels) is rebuilt with a single sort.
+        """
+        wanted = {}
         for user in users:
-            self._add_user(user["username"], user.get("status", "online"))
+            username = user.get("username")
+            if username:
+                wanted[username] = user.get("status", "online")
 
-        self.count_label.configure(text=str(len(users)))
+        changed = sum(1 for name in self._status if name not in wanted)
+        changed += sum(1 for name, status in wanted.items() if self._status.get(name) != status)
+        if changed > len(wanted) // 4:
+            self._rebuild(wanted)
+        else:
+            for name in [n for n in self._status if n not in wanted]:
+                self._remove(name)
+            for name, status in wanted.items():
+                if self._status.get(name) != status:
+                    self._remove(name)
+                    self._insert(name, status)
+        self._changed()
 
     def add_user(self, username: str, status: str = "online"):
-        if username not in self._user_frames:
-            self._add_user(username, status)
-            self._update_count()
+        if username and username not in self._status:
+            self._insert(username, status)
+            self._changed()
+
+    def add_users(self, users: list[dict]):
+        """Add a batch of members (e.g. a member_chunk) with one redraw."""
+        for user in users:
+            username = user.get("username")
+            if username and username not in self._status:
+                self._insert(username, user.get("status", "online"))
+        self._changed()
 
     def remove_user(self, username: str):
-        frame = self._user_frames.pop(username, None)
-        if frame:
-            frame.destroy()
-            self._update_count()
-
-    def _add_user(self, username: str, status: str):
-        frame = ctk.CTkFrame(self.user_list, fg_color="transparent", height=36)
-        frame.pack(fill="x", pady=1)
-        frame.pack_propagate(False)
-
-        # Status dot
-        dot_color = STATUS_ONLINE if status == "online" else STATUS_OFFLINE
-        dot = ctk.CTkLabel(
-            frame, text="\u25cf",  # Filled circle
-            font=(FONT_FAMILY, 10),
-            text_color=dot_color,
-            width=20,
-        )
-        dot.pack(side="left", padx=(4, 0))
+        if username in self._status:
+            self._remove(username)
+            self._changed()
 
-        # Username
-        ctk.CTkLabel(
-            frame, text=username,
-            font=(FONT_FAMILY, FONT_SIZE_NORMAL),
-            text_color=TEXT_PRIMARY if status == "online" else TEXT_SECONDARY,
-            anchor="w",
-        ).pack(side="left", padx=(4, 0), fill="x", expand=True)
+    def set_status(self, username: str, status: str):
+        """Update a listed member's status; unknown users are ignored."""
+        if self._status.get(username, status) != status:
+            self._remove(username)
+            self._insert(username, status)
+            self._changed()
+
+    # --- Model ---
+
+    def _rebuild(self, wanted: dict[str, str]):
+        pairs = sorted((_sort_key(name, status), name) for name, status in wanted.items())
+        self._keys = [key for key, _ in pairs]
+        self._names = [name for _, name in pairs]
+        self._status = dict(wanted)
+        self._online = sum(1 for status in wanted.values() if status == "online")
+        self._top = 0
+
+    def _insert(self, username: str, status: str):
+        key = _sort_key(username, status)
+        i = bisect.bisect_left(self._keys, key)
+        self._keys.insert(i, key)
+        self._names.insert(i, username)
+        self._status[username] = status
+        if status == "online":
+            self._online += 1
+
+    def _remove(self, username: str):
+        status = self._status.pop(username, None)
+        if status is None:
+            return
+        i = bisect.bisect_left(self._keys, _sort_key(username, status))
+        del self._keys[i]
+        del self._names[i]
+        if status == "online":
+            self._online -= 1
+
+    def _changed(self):
+        self.count_label.configure(text=str(self._online))
+        self._schedule_render()
+
+    # --- Rendering ---
+
+    def _schedule_render(self):
+        if not self._render_pending:
+            self._render_pending = True
+            self.after_idle(self._render)
+
+    def _render(self):
+        self._render_pending = False
+        total = len(self._names)
+        self._top = max(0, min(self._top, total - len(self._pool)))
+        wanted = min(len(self._pool), total - self._top)
+
+        if wanted != self._packed:
+            for row in self._pool[:self._packed]:
+                row.pack_forget()
+            for row in self._pool[:wanted]:
+                row.pack(fill="x", pady=1)
+            self._packed = wanted
+
+        for i in range(wanted):
+            name = self._names[self._top + i]
+            self._pool[i].show(name, self._status[name])
+
+        if total == 0 or wanted >= total:
+            self.scrollbar.set(0.0, 1.0)
+        else:
+            self.scrollbar.set(self._top / total, (self._top + wanted) / total)
+
+    def _on_configure(self, event=None):
+        """Grow the row pool to cover the viewport height."""
+        needed = min(MAX_POOL_SIZE, self.viewport.winfo_height() // ROW_HEIGHT)
+        while len(self._pool) < needed:
+            self._pool.append(_UserRow(self.viewport))
+        self._schedule_render()
+
+    # --- Scrolling ---
+
+    def _scroll_to(self, top: int):
+        self._top = max(0, top)
+        self._schedule_render()
 
-        self._user_frames[username] = frame
+    def _on_scrollbar(self, *args):
+        total = len(self._names)
+        if not total:
+            return
+        if args[0] == "moveto":
+            self._scroll_to(int(float(args[1]) * total))
+        elif args[0] == "scroll":
+            step = int(args[1]) * (max(1, self._packed - 1) if args[2] == "pages" else WHEEL_STEP)
+            self._scroll_to(self._top + step)
 
-    def _update_count(self):
-        self.count_label.configure(text=str(len(self._user_frames)))
+    def _on_mousewheel(self, event):
+        if not str(event.widget).startswith(str(self)):
+            return
+        if event.num == 4 or getattr(event, "delta", 0) > 0:
+            self._scroll_to(self._top - WHEEL_STEP)
+        else:
+            self._scroll_to(self._top + WHEEL_STEP)
@@ -1,19 +1,50 @@
-"""Desktop notification support."""
+"""Desktop notification support.
 
-_PLYER_AVAILABLE = False
-try:
-    from plyer import notification as _plyer_notification
-    _PLYER_AVAILABLE = True
-except ImportError:
-    _plyer_notification = None
+The plyer backend is imported on the first notification rather than at
+startup, since probing it loads platform modules the login screen never
+needs.
+
+NotificationDispatcher moves backend calls onto a worker thread: the UI
+thread only queues a notification, notifications with the same key within
+a short window are merged ("12 new messages in #general"), and a global
+cap limits how many reach the OS per period.
+"""
+
+import threading
+import time
+
+COALESCE_WINDOW = 2.0      # seconds a notification waits for others with the same key
+MAX_NOTIFICATIONS = 4      # shown per RATE_PERIOD at most
+RATE_PERIOD = 10.0         # seconds
+MAX_PENDING_KEYS = 20      # beyond this, new keys fold into one summary
+OVERFLOW_KEY = "_overflow"
+
+_backend = None
+_probed = False
+
+
+def _get_backend():
+    global _backend, _probed
+    if not _probed:
+        _probed = True
+        try:
+            from plyer import notification
+            _backend = notification
+        except ImportError:
+            _backend = None
+    return _backend
 
 
 def notify(title: str, message: str, timeout: int = 5):
-    """Send a desktop notification. Fails silently if plyer is not available."""
-    if not _PLYER_AVAILABLE:
+    """Send a desktop notification. Fails silently if plyer is not available.
+
+    This blocks on the OS; UI code should go through NotificationDispatcher.
+    """
+    backend = _get_backend()
+    if backend is None:
         return
     try:
-        _plyer_notification.notify(
+        backend.notify(
             title=title,
             message=message,
             timeout=timeout,
@@ -21,3 +52,97 @@ def notify(title: str, message: str, timeout: int = 5):
         )
     except Exception:
         pass
+
+
+class _Pending:
+    __slots__ = ("title", "message", "summary", "count", "due")
+
+    def __init__(self, title: str, message: str, summary: str, due: float):
+        self.title = title
+        self.message = message
+        self.summary = summary
+        self.count = 1
+        self.due = due
+
+
+class NotificationDispatcher:
+    """Queues notifications for a worker thread that coalesces and rate-limits them."""
+
+    def __init__(self, send=notify, window: float = COALESCE_WINDOW,
+                 max_per_period: int = MAX_NOTIFICATIONS, period: float = RATE_PERIOD,
+                 max_pending: int = MAX_PENDING_KEYS):
+        self._send = send
+        self.window = window
+        self.max_per_period = max_per_period
+        self.period = period
+        self.max_pending = max_pending
+
+        self._cond = threading.Condition()
+        self._pending: dict[str, _Pending] = {}  # insertion order == due order
+        self._sent: list[float] = []  # monotonic times of recent sends
+        self._thread = None
+        self._stopped = False
+
+    def notify(self, key: str, title: str, message: str, summary: str = "{count} new notifications"):
+        """Queue a notification; never blocks on the backend.
+
+        Notifications sharing `key` within the window are shown once, using
+        `summary` (formatted with {count}) when more than one arrived.
+        """
+        with self._cond:
+            if self._stopped:
+                return
+            item = self._pending.get(key)
+            if item is None and len(self._pending) >= self.max_pending:
+                key, summary = OVERFLOW_KEY, "{count} new notifications"
+                item = self._pending.get(key)
+            if item is not None:
+                item.count += 1
+                item.title = "Chat" if key == OVERFLOW_KEY else title
+                item.message = message
+                return
+            self._pending[key] = _Pending(title, message, summary, time.monotonic() + self.window)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="notifications", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def stop(self):
+        """Drop anything pending and stop the worker."""
+        with self._cond:
+            self._stopped = True
+            self._pending.clear()
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+
+    def _run(self):
+        with self._cond:
+            while not self._stopped:
+                if not self._pending:
+                    self._cond.wait()
+                    continue
+                now = time.monotonic()
+                self._sent = [t for t in self._sent if now - t < self.period]
+                key, item = next(iter(self._pending.items()))
+                ready_at = item.due
+                if len(self._sent) >= self.max_per_period:
+                    # Capped: keep coalescing until the oldest send ages out.
+                    ready_at = max(ready_at, self._sent[0] + self.period)
+                if ready_at > now:
+                    self._cond.wait(ready_at - now)
+                    continue
+
+                del self._pending[key]
+                self._sent.append(now)
+                if item.count == 1:
+                    title, message = item.title, item.message
+                else:
+                    title, message = item.title, item.summary.format(count=item.count)
+                self._cond.release()
+                try:
+                    self._send(title, message)
+                except Exception:
+                    pass
+                finally:
+                    self._cond.acquire()
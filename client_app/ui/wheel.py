@@ -0,0 +1,28 @@
+"""App-wide mouse wheel bindings for the virtualized list widgets.
+
+Wheel events go to the widget under the pointer (X11) or with focus
+(Windows, macOS), not to the list, so the lists listen on the "all" tag
+and filter by event.widget. customtkinter widgets refuse bind_all, so the
+bindings are made on the toplevel window. Each list removes exactly its
+own handlers when destroyed: Misc.unbind_all would also drop the ones
+CTkScrollableFrame installs.
+"""
+
+WHEEL_EVENTS = ("<MouseWheel>", "<Button-4>", "<Button-5>")
+
+
+def bind_wheel(widget, handler) -> list[tuple[str, str]]:
+    """Call `handler` for every wheel event in the app; returns the
+    bindings to pass to unbind_wheel()."""
+    root = widget.winfo_toplevel()
+    return [(sequence, root.bind_all(sequence, handler, add="+")) for sequence in WHEEL_EVENTS]
+
+
+def unbind_wheel(widget, bindings: list[tuple[str, str]]):
+    """Remove the handlers added by bind_wheel(), leaving any others."""
+    root = widget.winfo_toplevel()
+    for sequence, funcid in bindings:
+        script = root.tk.call("bind", "all", sequence)
+        kept = "\n".join(line for line in script.split("\n") if f"[{funcid} " not in line)
+        root.tk.call("bind", "all", sequence, kept)
+        root.deletecommand(funcid)
@@ -3,6 +3,7 @@
 
 import argparse
 from server_app.chat_server import ChatServer
+from server_app.fanout import FANOUT_WORKERS, SHARD_SIZE
 
 
 def main():
@@ -13,6 +14,31 @@ def main():
     ap.add_argument("--no-tls", action="store_true", help="Disable TLS (development only)")
     ap.add_argument("--cert", default="certs/server.crt", help="TLS certificate file")
     ap.add_argument("--key", default="certs/server.key", help="TLS private key file")
+    ap.add_argument("--metrics-port", type=int, default=None,
+                    help="Serve Prometheus metrics on 127.0.0.1:PORT/metrics (default: off)")
+    ap.add_argument("--profile-hz", type=float, default=100,
+                    help="Sampling profiler rate when toggled on (default: 100)")
+    ap.add_argument("--trace-rate", type=float, default=0.01,
+                    help="Fraction of chat messages traced into metrics (default: 0.01)")
+    ap.add_argument("--no-priority-lanes", action="store_true",
+                    help="Write outbound frames in FIFO order instead of by priority lane (for comparisons)")
+    ap.add_argument("--workers", type=int, default=8,
+                    help="Worker threads handling frames after login; 0 handles them on each connection's thread (default: 8)")
+    ap.add_argument("--quantum", type=int, default=4,
+                    help="Frame cost a connection may spend per scheduling turn (default: 4)")
+    ap.add_argument("--fanout-workers", type=int, default=FANOUT_WORKERS,
+                    help=f"Threads writing large broadcasts in parallel; 0 writes them on one thread (default: {FANOUT_WORKERS})")
+    ap.add_argument("--fanout-shard-size", type=int, default=SHARD_SIZE,
+                    help=f"Recipients per fan-out shard (default: {SHARD_SIZE})")
+    ap.add_argument("--gc-tuned", action="store_true",
+                    help="Freeze the startup heap and raise GC thresholds to cut collection pauses")
+    ap.add_argument("--gc-warmup", type=float, default=30,
+                    help="Seconds after startup before --gc-tuned freezes the heap again (default: 30)")
+    ap.add_argument("--overload-handler-ms", type=float, default=50,
+                    help="Mean handler latency budget before shedding load (default: 50)")
+    ap.add_argument("--overload-queue-ms", type=float, default=250,
+                    help="Mean outbound queue delay budget before shedding load (default: 250)")
+    ap.add_argument("--profile-dir", default=".", help="Directory for profiles written on SIGUSR1 (default: .)")
     args = ap.parse_args()
 
     use_tls = not args.no_tls
@@ -23,6 +49,19 @@ def main():
         use_tls=use_tls,
         certfile=args.cert if use_tls else None,
         keyfile=args.key if use_tls else None,
+        metrics_port=args.metrics_port,
+        profile_hz=args.profile_hz,
+        profile_dir=args.profile_dir,
+        trace_rate=args.trace_rate,
+        priority_lanes=not args.no_priority_lanes,
+        handler_budget=args.overload_handler_ms / 1000,
+        queue_budget=args.overload_queue_ms / 1000,
+        workers=args.workers,
+        quantum=args.quantum,
+        fanout_workers=args.fanout_workers,
+        fanout_shard_size=args.fanout_shard_size,
+        gc_tuned=args.gc_tuned,
+        gc_warmup=args.gc_warmup,
     )
     try:
         srv.start()
@@ -27,6 +27,11 @@ class ChannelManager:
         with self._lock:
             return sorted(self._channels.get(channel, set()))
 
+    def member_counts(self) -> dict[str, int]:
+        """Number of online members per channel."""
+        with self._lock:
+            return {channel: len(users) for channel, users in self._channels.items()}
+
     def get_user_channel(self, username: str) -> str | None:
         """Get the channel a user is currently in (first match)."""
         with self._lock:
@@ -1,45 +1,81 @@
 """Main chat server using length-prefixed JSON protocol."""
 
+import gc
+import itertools
+import signal
 import socket
+import sys
 import threading
+import time
 from datetime import datetime, timezone
 
-from shared.protocol import MessageReader, send_message
+from shared.protocol import MessageReader, encode_message
 from shared.constants import (
     ENCODING, SOCKET_TIMEOUT, LISTEN_BACKLOG,
-    MSG_AUTH_REGISTER, MSG_AUTH_LOGIN, MSG_AUTH_RESULT,
-    MSG_CHANNEL_JOIN, MSG_CHANNEL_LEAVE, MSG_CHANNEL_CREATE,
-    MSG_CHANNEL_LIST, MSG_CHANNEL_INFO, MSG_CHANNEL_JOINED,
-    MSG_CHANNEL_CREATED,
+    MSG_AUTH_REGISTER, MSG_AUTH_LOGIN, MSG_AUTH_RESULT, MSG_AUTH_RESUME,
+    MSG_CHANNEL_INFO, MSG_CHANNEL_JOINED,
+    MSG_CHANNEL_CREATED, MSG_CHANNEL_HISTORY, MSG_HISTORY_CHUNK, MSG_MEMBER_CHUNK,
     MSG_MESSAGE, MSG_PRIVATE_MESSAGE, MSG_ACTION,
     MSG_USER_LIST, MSG_USER_JOINED, MSG_USER_LEFT, MSG_STATUS_CHANGE,
     MSG_ERROR, MSG_SYSTEM,
-    DEFAULT_CHANNEL, MESSAGE_HISTORY_LIMIT,
+    DEFAULT_CHANNEL, MESSAGE_HISTORY_LIMIT, HISTORY_CHUNK_SIZE, HISTORY_CHUNK_BYTES, MEMBER_CHUNK_SIZE,
     RATE_LIMIT_MESSAGES, RATE_LIMIT_WINDOW,
 )
-from shared.validators import validate_message, validate_channel_name, sanitize_content
+from shared.message_types import CLIENT_MESSAGES, FieldError, frame_cost
+from shared.content import parse as parse_entities
 from server_app.database import Database
 from server_app.auth import hash_password, verify_password, generate_session_token
 from server_app.rate_limiter import RateLimiter
 from server_app.channel_manager import ChannelManager
+from server_app.metrics import ServerMetrics, MetricsHTTPServer
+from server_app.profiler import SamplingProfiler
+from server_app.tracing import Tracer
+from server_app.outbound import OutboundQueue, LANE_CHAT, LANE_PRESENCE, LANE_BULK, LANE_NAMES, lane_for, limit_unsent
+from server_app.overload import OverloadController, STAGE_NAMES, HANDLER_BUDGET, QUEUE_BUDGET
+from server_app.scheduler import FairScheduler, WORKERS, QUANTUM
+from server_app.client_registry import ClientRegistry
+from server_app.fanout import FanoutPool, FANOUT_WORKERS, SHARD_SIZE
+from server_app.gc_tuning import GCMonitor, GCTuner, WARMUP as GC_WARMUP
+
+
+_AUTH_TYPES = frozenset({MSG_AUTH_REGISTER, MSG_AUTH_LOGIN, MSG_AUTH_RESUME})
+
+# Reader threads get a small stack: with the default 8 MB, 100k idle
+# connections would reserve 800 GB of address space. Deeply nested JSON
+# still fails cleanly with RecursionError at this size.
+READER_STACK_SIZE = 512 * 1024
+
+# One outbound write in this many is timed into the queue wait histogram and
+# the overload controller, so fan-out does not take their locks per recipient.
+WRITE_SAMPLE_EVERY = 16
 
 
 class ClientConnection:
     """Represents a connected client's state."""
 
-    def __init__(self, sock, addr):
+    __slots__ = ("sock", "addr", "outbound", "inbox", "username", "user_id", "session_token",
+                 "authenticated", "current_channel", "rate_limiter", "trace", "ref")
+
+    def __init__(self, sock, addr, on_written=None, inbox=None):
         self.sock = sock
         self.addr = addr
+        self.outbound = OutboundQueue(sock, on_written)
+        self.inbox = inbox  # scheduler Inbox for frames after login
         self.username = None
         self.user_id = None
         self.session_token = None
         self.authenticated = False
         self.current_channel = None
         self.rate_limiter = RateLimiter(RATE_LIMIT_MESSAGES, RATE_LIMIT_WINDOW)
+        self.trace = None  # MessageTrace for the frame being handled, if sampled
+        self.ref = None    # "ref" of the frame being handled, echoed on direct replies
 
 
 class ChatServer:
-    def __init__(self, host="127.0.0.1", port=5050, db_path="chat_data.db", use_tls=False, certfile=None, keyfile=None):
+    def __init__(self, host="127.0.0.1", port=5050, db_path="chat_data.db", use_tls=False, certfile=None, keyfile=None,
+                 metrics_port=None, profile_hz=100, profile_dir=".", trace_rate=0.01, priority_lanes=True,
+                 handler_budget=HANDLER_BUDGET, queue_budget=QUEUE_BUDGET, workers=WORKERS, quantum=QUANTUM,
+                 fanout_workers=FANOUT_WORKERS, fanout_shard_size=SHARD_SIZE, gc_tuned=False, gc_warmup=GC_WARMUP):
         self.host = host
         self.port = port
         self.use_tls = use_tls
@@ -47,12 +83,33 @@ class ChatServer:
         self.keyfile = keyfile
         self.server_sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self.server_sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        self.clients = {}  # sock -> ClientConnection
-        self.lock = threading.Lock()
+        self.clients = ClientRegistry()
         self.running = False
+        # With lanes off every frame is written in FIFO order (for comparisons)
+        self._lane_for = lane_for if priority_lanes else (lambda msg_type: LANE_CHAT)
 
-        self.db = Database(db_path)
+        self.metrics = ServerMetrics()
+        self.tracer = Tracer(self.metrics, trace_rate)
+        self.db = Database(db_path, metrics=self.metrics)
         self.channel_mgr = ChannelManager()
+        self.overload = OverloadController(handler_budget, queue_budget, on_change=self._on_overload_stage)
+        # workers=0 handles every frame on its connection's reader thread
+        self.scheduler = FairScheduler(self._run_frame, workers, quantum) if workers > 0 else None
+        self.fanout = FanoutPool(fanout_workers, fanout_shard_size)
+        self.gc_monitor = GCMonitor(self.metrics.gc_pause_seconds, self.metrics.gc_collected)
+        self.metrics.before_render(self.gc_monitor.flush)
+        self.gc_tuner = GCTuner(warmup=gc_warmup) if gc_tuned else None
+        self._handlers = {t: getattr(self, spec.handler) for t, spec in CLIENT_MESSAGES.items()}
+        self._writes = itertools.count()  # next() is atomic, so no lock for sampling
+        self._register_gauges()
+
+        self.metrics_port = metrics_port
+        self.metrics_server = None
+
+        # thread ident -> message type being handled (read by the profiler)
+        self._active_types = {}
+        self.profile_dir = profile_dir
+        self.profiler = SamplingProfiler(hz=profile_hz, tag_lookup=self._active_types.get)
 
         self.ssl_context = None
         if self.use_tls:
@@ -60,17 +117,79 @@ class ChatServer:
             self.ssl_context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
             self.ssl_context.load_cert_chain(certfile, keyfile)
 
+    def _register_gauges(self):
+        self.metrics.gauge("chat_connections", "Open client connections.", lambda: len(self.clients))
+        self.metrics.gauge(
+            "chat_authenticated_connections", "Authenticated client connections.",
+            lambda: len(self.clients.members()),
+        )
+        self.metrics.gauge(
+            "chat_channel_members", "Online members per channel.",
+            self.channel_mgr.member_counts, label="channel",
+        )
+        self.metrics.gauge(
+            "chat_outbound_queued_bytes", "Bytes waiting in connection outbound queues by lane.",
+            self._outbound_queued, label="lane",
+        )
+        if self.scheduler is not None:
+            self.metrics.gauge(
+                "chat_sched_pending", "Frames waiting for a worker.", lambda: self.scheduler.pending,
+            )
+        self.metrics.gauge(
+            "chat_overload_stage",
+            "Load shedding stage: " + ", ".join(f"{i} {name}" for i, name in enumerate(STAGE_NAMES)) + ".",
+            self.overload.current_stage,
+        )
+        self.metrics.gauge(
+            "chat_overload_pressure", "Handler latency or queue delay relative to its budget, whichever is worse.",
+            lambda: round(self.overload.pressure, 3),
+        )
+        self.metrics.gauge(
+            "chat_gc_frozen_objects", "Objects moved to the permanent generation by --gc-tuned.", gc.get_freeze_count,
+        )
+
+    def _outbound_queued(self) -> dict:
+        totals = [0] * len(LANE_NAMES)
+        for c in self.clients.snapshot().conns.values():
+            for lane, queued in enumerate(c.outbound.queued_bytes()):
+                totals[lane] += queued
+        return dict(zip(LANE_NAMES, totals))
+
+    def _on_overload_stage(self, old: int, new: int, pressure: float):
+        verb = "Shedding load" if new > old else "Recovering"
+        print(f"[SERVER] {verb}: stage {STAGE_NAMES[old]} -> {STAGE_NAMES[new]} (pressure {pressure:.2f})")
+
+    def _observe_write(self, lane: int, seconds: float):
+        if next(self._writes) % WRITE_SAMPLE_EVERY:
+            return
+        self.metrics.outbound_wait_seconds.observe(LANE_NAMES[lane], seconds)
+        if lane != LANE_BULK:  # bulk frames wait behind live traffic by design
+            self.overload.observe_queue(seconds)
+
     def start(self):
         self.server_sock.bind((self.host, self.port))
         self.server_sock.listen(LISTEN_BACKLOG)
         self.running = True
         tls_status = " (TLS)" if self.use_tls else ""
-        print(f"[SERVER] Listening on {self.host}:{self.port}{tls_status}")
+        print(f"[SERVER] Listening on {self.host}:{self.server_sock.getsockname()[1]}{tls_status}")
+        if self.metrics_port is not None:
+            self.metrics_server = MetricsHTTPServer(self.metrics, "127.0.0.1", self.metrics_port)
+            self._register_profiler_routes(self.metrics_server)
+            self.metrics_server.start()
+            print(f"[SERVER] Metrics on http://127.0.0.1:{self.metrics_server.port}/metrics")
+        if self.scheduler is not None:
+            self.scheduler.start()
+        self.gc_monitor.install()
+        if self.gc_tuner is not None:
+            self.gc_tuner.apply()
+        if hasattr(signal, "SIGUSR1") and threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGUSR1, lambda signum, frame: self._toggle_profiler())
         try:
             while self.running:
                 try:
                     client_sock, addr = self.server_sock.accept()
                     client_sock.settimeout(SOCKET_TIMEOUT)
+                    limit_unsent(client_sock)
 
                     if self.ssl_context:
                         try:
@@ -79,73 +198,116 @@ class ChatServer:
                             print(f"[SERVER] TLS handshake failed for {addr}: {e}")
                             client_sock.close()
                             continue
-
-                    conn = ClientConnection(client_sock, addr)
-                    with self.lock:
-                        self.clients[client_sock] = conn
-                    threading.Thread(target=self._handle_client, args=(conn,), daemon=True).start()
+                    # Workers write to the socket and must never wait on a
+                    # slow peer; see server_app.outbound
+                    client_sock.setblocking(False)
+
+                    inbox = self.scheduler.inbox() if self.scheduler is not None else None
+                    conn = ClientConnection(client_sock, addr, self._observe_write, inbox)
+                    self.clients.add(conn)
+                    default_stack = threading.stack_size(READER_STACK_SIZE)
+                    try:
+                        threading.Thread(target=self._handle_client, args=(conn,), daemon=True).start()
+                    finally:
+                        threading.stack_size(default_stack)
                 except OSError:
                     break
         finally:
             self.shutdown()
 
+    def _toggle_profiler(self):
+        path = self.profiler.toggle(self.profile_dir)
+        if path:
+            print(f"[SERVER] Profiler stopped, wrote {path}")
+        else:
+            print("[SERVER] Profiler started.")
+
+    def _register_profiler_routes(self, http_server: MetricsHTTPServer):
+        def start():
+            if self.profiler.running:
+                return 200, "already running\n"  # keep the samples of the run in progress
+            self.profiler.reset()
+            started = self.profiler.start()
+            return 200, "started\n" if started else "already running\n"
+
+        def stop():
+            return 200, self.profiler.stop()
+
+        def status():
+            state = "running" if self.profiler.running else "stopped"
+            return 200, f"{state} samples={self.profiler.samples} dropped={self.profiler.dropped}\n"
+
+        http_server.post_routes["/profile/start"] = start
+        http_server.post_routes["/profile/stop"] = stop
+        http_server.routes["/profile"] = status
+
     def shutdown(self):
         self.running = False
-        with self.lock:
-            for sock in list(self.clients.keys()):
-                try:
-                    sock.shutdown(socket.SHUT_RDWR)
-                except Exception:
-                    pass
-                try:
-                    sock.close()
-                except Exception:
-                    pass
-            self.clients.clear()
+        if self.scheduler is not None:
+            self.scheduler.stop()
+        self.fanout.shutdown()
+        self.gc_monitor.uninstall()
+        if self.gc_tuner is not None:
+            self.gc_tuner.restore()
+        if self.profiler.running:
+            self.profiler.stop()
+        for conn in self.clients.clear():
+            conn.outbound.close()
+            try:
+                conn.sock.shutdown(socket.SHUT_RDWR)
+            except Exception:
+                pass
+            try:
+                conn.sock.close()
+            except Exception:
+                pass
         try:
             self.server_sock.close()
         except Exception:
             pass
+        if self.metrics_server:
+            self.metrics_server.stop()
+            self.metrics_server = None
         print("[SERVER] Shutdown complete.")
 
-    def _send(self, conn: ClientConnection, msg: dict):
+    def _send(self, conn: ClientConnection, msg: dict, trace=None):
         try:
-            send_message(conn.sock, msg)
+            conn.outbound.push(encode_message(msg), self._lane_for(msg["type"]), trace)
+            self.metrics.frames_out.inc(msg["type"])
         except Exception:
             self._drop_client(conn)
 
-    def _broadcast_to_channel(self, channel: str, msg: dict, exclude=None):
+    def _broadcast_to_channel(self, channel: str, msg: dict, exclude=None, trace=None):
         """Send a message to all authenticated users in a channel."""
-        dead = []
-        with self.lock:
-            targets = [
-                c for c in self.clients.values()
-                if c.authenticated and c.current_channel == channel and c is not exclude
-            ]
-        for c in targets:
-            try:
-                send_message(c.sock, msg)
-            except Exception:
-                dead.append(c)
-        for c in dead:
-            self._drop_client(c)
+        targets = [
+            c for c in self.clients.members()
+            if c.current_channel == channel and c is not exclude
+        ]
+        self._fan_out(targets, msg, "channel", trace)
 
     def _broadcast_global(self, msg: dict, exclude=None):
         """Send a message to all authenticated users."""
-        dead = []
-        with self.lock:
-            targets = [c for c in self.clients.values() if c.authenticated and c is not exclude]
-        for c in targets:
-            try:
-                send_message(c.sock, msg)
-            except Exception:
-                dead.append(c)
+        targets = self.clients.members()
+        if exclude is not None:
+            targets = [c for c in targets if c is not exclude]
+        self._fan_out(targets, msg, "global")
+
+    def _fan_out(self, targets, msg: dict, scope: str, trace=None):
+        if lane_for(msg["type"]) == LANE_PRESENCE and self.overload.shed_presence():
+            self.metrics.shed.inc("presence", len(targets))
+            return
+        start = time.perf_counter()
+        data = encode_message(msg)
+        dead = self.fanout.deliver(targets, data, self._lane_for(msg["type"]), trace)
+        self.metrics.broadcast_seconds.observe(scope, time.perf_counter() - start)
+        self.metrics.frames_out.inc(msg["type"], len(targets) - len(dead))
         for c in dead:
             self._drop_client(c)
 
     def _drop_client(self, conn: ClientConnection):
-        with self.lock:
-            self.clients.pop(conn.sock, None)
+        if not self.clients.remove(conn):
+            return  # already dropped, e.g. by a failed broadcast write
+        conn.outbound.close()
         try:
             conn.sock.close()
         except Exception:
@@ -165,122 +327,202 @@ class ChatServer:
             })
             print(f"[SERVER] {conn.username} disconnected.")
 
+    def _reply(self, conn: ClientConnection, msg: dict):
+        """Send a direct response to the frame being handled, echoing its
+        "ref" so clients can match pipelined requests to replies."""
+        if conn.ref is not None:
+            msg["ref"] = conn.ref
+        self._send(conn, msg)
+
     def _send_error(self, conn: ClientConnection, code: str, message: str):
-        self._send(conn, {"type": MSG_ERROR, "code": code, "message": message})
+        self._reply(conn, {"type": MSG_ERROR, "code": code, "message": message})
 
     def _handle_client(self, conn: ClientConnection):
+        """Reader loop for one connection. Frames before login are handled
+        here; after login they go to the fair scheduler's worker pool
+        (unless it is disabled with workers=0)."""
         print(f"[SERVER] New connection from {conn.addr}")
         try:
-            reader = MessageReader(conn.sock)
+            reader = MessageReader(conn.sock, timeout=SOCKET_TIMEOUT)
             for msg in reader:
-                if not isinstance(msg, dict) or "type" not in msg:
-                    self._send_error(conn, "invalid", "Invalid message format.")
-                    continue
-
-                msg_type = msg["type"]
-
-                # Authentication phase
-                if not conn.authenticated:
-                    if msg_type == MSG_AUTH_REGISTER:
-                        self._handle_register(conn, msg)
-                    elif msg_type == MSG_AUTH_LOGIN:
-                        self._handle_login(conn, msg)
-                    else:
-                        self._send_error(conn, "not_authenticated", "You must log in first.")
-                    continue
-
-                # Authenticated phase - rate limit check
-                if msg_type in (MSG_MESSAGE, MSG_PRIVATE_MESSAGE, MSG_ACTION):
-                    if not conn.rate_limiter.is_allowed():
-                        self._send_error(conn, "rate_limited", "Slow down! Too many messages.")
-                        continue
-
-                # Dispatch by message type
-                if msg_type == MSG_MESSAGE:
-                    self._handle_message(conn, msg)
-                elif msg_type == MSG_PRIVATE_MESSAGE:
-                    self._handle_private_message(conn, msg)
-                elif msg_type == MSG_ACTION:
-                    self._handle_action(conn, msg)
-                elif msg_type == MSG_CHANNEL_JOIN:
-                    self._handle_channel_join(conn, msg)
-                elif msg_type == MSG_CHANNEL_LEAVE:
-                    self._handle_channel_leave(conn, msg)
-                elif msg_type == MSG_CHANNEL_CREATE:
-                    self._handle_channel_create(conn, msg)
-                elif msg_type == MSG_CHANNEL_LIST:
-                    self._handle_channel_list(conn)
-                elif msg_type == MSG_USER_LIST:
-                    self._handle_user_list(conn, msg)
+                received = time.perf_counter()
+                if conn.authenticated and self.scheduler is not None:
+                    cost = frame_cost(msg.get("type")) if isinstance(msg, dict) else 1
+                    if not self.scheduler.submit(conn.inbox, (conn, msg, received), cost):
+                        break
                 else:
-                    self._send_error(conn, "unknown", f"Unknown message type: {msg_type}")
-
+                    self._process(conn, msg, received)
+                msg = None  # do not pin the last frame while the connection idles
         except Exception as e:
             print(f"[SERVER] Error with client {conn.addr}: {e}")
         finally:
+            # Queued frames are handled before the connection is dropped
+            if not (conn.authenticated and self.scheduler is not None
+                    and self.scheduler.submit(conn.inbox, (conn, None, 0.0), 0)):
+                self._drop_client(conn)
+
+    def _run_frame(self, item):
+        """Scheduler worker: handle one queued frame (None = connection closed)."""
+        conn, msg, received = item
+        if msg is None:
+            self._drop_client(conn)
+            return
+        if conn.outbound.closed:
+            return  # dropped meanwhile
+        wait = time.perf_counter() - received
+        self.metrics.sched_wait_seconds.observe("", wait)
+        self.overload.observe_queue(wait)
+        try:
+            self._process(conn, msg, received)
+        except Exception as e:
+            print(f"[SERVER] Error with client {conn.addr}: {e}")
             self._drop_client(conn)
 
-    # --- Auth handlers ---
+    def _process(self, conn: ClientConnection, msg, received: float):
+        if not isinstance(msg, dict) or "type" not in msg:
+            self._send_error(conn, "invalid", "Invalid message format.")
+            return
+
+        msg_type = msg["type"]
+        spec = CLIENT_MESSAGES.get(msg_type) if isinstance(msg_type, str) else None
+        label = spec.type if spec is not None else "unknown"
+        self.metrics.frames_in.inc(label)
+
+        if spec is not None and spec.rate_cost:  # chat frames
+            conn.trace = self.tracer.begin(msg, received)
 
-    def _handle_register(self, conn, msg):
-        username = msg.get("username", "").strip()
-        password = msg.get("password", "")
+        ref = msg.get("ref")
+        conn.ref = ref if isinstance(ref, (int, str)) and not isinstance(ref, bool) else None
 
-        from shared.validators import validate_username, validate_password
-        ok, err = validate_username(username)
-        if not ok:
-            self._send(conn, {"type": MSG_AUTH_RESULT, "success": False, "error": err})
+        ident = threading.get_ident()
+        self._active_types[ident] = label
+        start = time.perf_counter()
+        try:
+            self._dispatch(conn, spec, msg)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.metrics.handler_seconds.observe(label, elapsed)
+            if label not in _AUTH_TYPES:  # bcrypt is slow by design
+                self.overload.observe_handler(elapsed)
+            self._active_types.pop(ident, None)
+            conn.ref = None
+            if conn.trace:
+                self.tracer.finish(conn.trace)
+                conn.trace = None
+
+    def _dispatch(self, conn: ClientConnection, spec, msg: dict):
+        """Check the frame against its type's spec and call the handler."""
+        # Authentication phase
+        if not conn.authenticated:
+            if spec is None or spec.login:
+                self._send_error(conn, "not_authenticated", "You must log in first.")
+                return
+            if spec.type != MSG_AUTH_RESUME and self.overload.defer_logins():
+                self.metrics.shed.inc("login")
+                self._reply(conn, {
+                    "type": MSG_AUTH_RESULT, "success": False, "code": "overloaded",
+                    "error": "Server is busy. Retrying shortly.",
+                    "retry_after": self.overload.retry_after(),
+                })
+                return
+        # Authenticated phase - rate limit check
+        elif spec is None or not spec.login:
+            self._send_error(conn, "unknown", f"Unknown message type: {msg['type']}")
             return
-        ok, err = validate_password(password)
-        if not ok:
-            self._send(conn, {"type": MSG_AUTH_RESULT, "success": False, "error": err})
+        elif spec.rate_cost and not conn.rate_limiter.is_allowed(spec.rate_cost):
+            self._send_error(conn, "rate_limited", "Slow down! Too many messages.")
             return
 
+        try:
+            args = spec.parse(msg)
+        except FieldError as e:
+            self.metrics.frames_rejected.inc(spec.type)
+            if spec.login:
+                self._send_error(conn, "invalid", str(e))
+            else:
+                self._reply(conn, {"type": MSG_AUTH_RESULT, "success": False, "error": str(e)})
+            return
+        self._handlers[spec.type](conn, args)
+
+    # --- Auth handlers ---
+
+    def _handle_register(self, conn, args):
+        username = args["username"]
+        password = args["password"]
+
         pw_hash = hash_password(password)
         success = self.db.create_user(username, pw_hash)
         if not success:
-            self._send(conn, {"type": MSG_AUTH_RESULT, "success": False, "error": "Username already taken."})
+            self._reply(conn, {"type": MSG_AUTH_RESULT, "success": False, "error": "Username already taken."})
             return
 
         user = self.db.get_user_by_username(username)
         token = generate_session_token()
         self.db.create_session(token, user["id"])
 
-        conn.authenticated = True
-        conn.username = user["username"]
-        conn.user_id = user["id"]
-        conn.session_token = token
+        self._mark_authenticated(conn, user, token)
 
-        self._send(conn, {"type": MSG_AUTH_RESULT, "success": True, "token": token, "username": user["username"]})
+        self._reply(conn, {"type": MSG_AUTH_RESULT, "success": True, "token": token, "username": user["username"]})
         self._finalize_login(conn)
 
-    def _handle_login(self, conn, msg):
-        username = msg.get("username", "").strip()
-        password = msg.get("password", "")
+    def _handle_login(self, conn, args):
+        username = args["username"]
+        password = args["password"]
 
         user = self.db.get_user_by_username(username)
         if not user or not verify_password(password, user["password_hash"]):
-            self._send(conn, {"type": MSG_AUTH_RESULT, "success": False, "error": "Invalid username or password."})
+            self._reply(conn, {"type": MSG_AUTH_RESULT, "success": False, "error": "Invalid username or password."})
             return
 
         token = generate_session_token()
         self.db.create_session(token, user["id"])
 
+        self._mark_authenticated(conn, user, token)
+
+        self._reply(conn, {"type": MSG_AUTH_RESULT, "success": True, "token": token, "username": user["username"]})
+        self._finalize_login(conn)
+
+    def _handle_resume(self, conn, args):
+        """Re-authenticate a reconnecting client with its session token.
+
+        Optional "channel" and "since_id" rejoin that channel and send only
+        the messages newer than since_id.
+        """
+        token = args["token"]
+        user_id = self.db.validate_session(token) if token else None
+        user = self.db.get_user_by_id(user_id) if user_id is not None else None
+        if not user:
+            self._reply(conn, {
+                "type": MSG_AUTH_RESULT, "success": False, "code": "session_expired",
+                "error": "Session expired. Please log in again.",
+            })
+            return
+
+        self._mark_authenticated(conn, user, token)
+
+        self._reply(conn, {
+            "type": MSG_AUTH_RESULT, "success": True, "token": token,
+            "username": user["username"], "resumed": True,
+        })
+        channel = args["channel"]
+        if not channel or not self.db.get_channel_by_name(channel):
+            channel = DEFAULT_CHANNEL
+        self._finalize_login(conn, channel, args["since_id"])
+
+    def _mark_authenticated(self, conn, user, token):
         conn.authenticated = True
-        conn.username = user["username"]
+        conn.username = sys.intern(user["username"])  # shared with channel membership sets
         conn.user_id = user["id"]
         conn.session_token = token
+        self.clients.login(conn)  # visible to broadcasts and PMs from here on
 
-        self._send(conn, {"type": MSG_AUTH_RESULT, "success": True, "token": token, "username": user["username"]})
-        self._finalize_login(conn)
-
-    def _finalize_login(self, conn):
-        """After successful auth, auto-join general and send channel list."""
+    def _finalize_login(self, conn, channel=DEFAULT_CHANNEL, since_id=None):
+        """After successful auth, auto-join a channel (general by default) and send channel list."""
         print(f"[SERVER] {conn.username} logged in.")
         # Send channel list
         self._handle_channel_list(conn)
-        # Auto-join default channel
-        self._handle_channel_join(conn, {"channel": DEFAULT_CHANNEL})
+        # Auto-join channel
+        self._handle_channel_join(conn, {"channel": channel, "since_id": since_id})
         # Notify others
         self._broadcast_global({
             "type": MSG_STATUS_CHANGE,
@@ -290,8 +532,8 @@ class ChatServer:
 
     # --- Channel handlers ---
 
-    def _handle_channel_join(self, conn, msg):
-        channel_name = msg.get("channel", "").strip().lower()
+    def _handle_channel_join(self, conn, args):
+        channel_name = args["channel"]
         if not channel_name:
             self._send_error(conn, "invalid", "Channel name required.")
             return
@@ -300,36 +542,32 @@ class ChatServer:
         if not channel:
             self._send_error(conn, "not_found", f"Channel '{channel_name}' not found.")
             return
+        channel_name = sys.intern(channel_name)  # one copy per channel across connections
 
         # Leave current channel first
         if conn.current_channel and conn.current_channel != channel_name:
             self._handle_channel_leave(conn, {"channel": conn.current_channel}, silent=True)
 
-        conn.current_channel = channel_name
         self.channel_mgr.join(conn.username, channel_name)
 
-        # Get message history
-        history = self.db.get_message_history(channel["id"], limit=MESSAGE_HISTORY_LIMIT)
-        history_msgs = [
-            {
-                "sender": h["username"],
-                "content": h["content"],
-                "timestamp": h["created_at"],
-                "msg_type": h["msg_type"],
-                "id": h["id"],
-            }
-            for h in history
-        ]
-
-        # Get online users in channel
+        since_id = args["since_id"]
         users = self.channel_mgr.get_users(channel_name)
 
-        self._send(conn, {
+        # A small header first, then history and members in chunks, so the
+        # client can paint the newest page before the rest arrives.
+        joined = {
             "type": MSG_CHANNEL_JOINED,
             "channel": channel_name,
-            "history": history_msgs,
-            "users": [{"username": u, "status": "online"} for u in users],
-        })
+            "user_count": len(users),
+        }
+        if since_id is not None:
+            joined["since_id"] = since_id
+        self._reply(conn, joined)
+        # Live messages for the channel start after the header. They may
+        # still overtake the history chunks, which go out in the bulk lane.
+        conn.current_channel = channel_name
+        self._stream_history(conn, channel_name, channel["id"], since_id)
+        self._stream_members(conn, channel_name, users)
 
         # Notify others in channel
         self._broadcast_to_channel(channel_name, {
@@ -338,8 +576,115 @@ class ChatServer:
             "username": conn.username,
         }, exclude=conn)
 
-    def _handle_channel_leave(self, conn, msg, silent=False):
-        channel_name = msg.get("channel", "").strip().lower()
+    def _stream_history(self, conn, channel_name: str, channel_id: int, since_id: int | None):
+        """Send history as history_chunk frames, newest page first; each
+        chunk's entries are in chronological order. The final chunk has
+        last=True (and, when backfilling since_id, complete=False if more
+        than a page was missed, telling the client to replace its view).
+        Each chunk is queued as soon as it is built, one chunk behind the
+        database read so the final one can be marked, and live messages
+        can pass between them."""
+        limit = self._history_limit()
+        pages = self.db.iter_message_history(
+            channel_id, limit=limit, since_id=since_id, batch_size=HISTORY_CHUNK_SIZE,
+        )
+        frame, sent = None, 0
+        try:
+            for rows in self._history_chunks(pages):
+                if frame is not None:
+                    self._reply(conn, frame)
+                    if conn.outbound.closed:
+                        return
+                frame = {
+                    "type": MSG_HISTORY_CHUNK,
+                    "channel": channel_name,
+                    "history": [self._history_entry(h) for h in reversed(rows)],
+                    "last": False,
+                }
+                sent += len(rows)
+        finally:
+            pages.close()
+        frame["last"] = True
+        if since_id is not None or limit < MESSAGE_HISTORY_LIMIT:
+            frame["complete"] = sent < limit
+        self._reply(conn, frame)
+
+    @staticmethod
+    def _history_chunks(pages):
+        """Regroup newest-first database pages into chunks of at most
+        HISTORY_CHUNK_SIZE rows and about HISTORY_CHUNK_BYTES of content, so
+        no single bulk frame holds up the connection for long. Always yields
+        at least one (possibly empty) chunk."""
+        chunk, size = [], 0
+        for rows in pages:
+            for row in rows:
+                cost = len(row["content"]) + 100  # plus sender, timestamp and keys
+                if chunk and (len(chunk) >= HISTORY_CHUNK_SIZE or size + cost > HISTORY_CHUNK_BYTES):
+                    yield chunk
+                    chunk, size = [], 0
+                chunk.append(row)
+                size += cost
+        yield chunk
+
+    def _stream_members(self, conn, channel_name: str, users: list[str]):
+        for start in range(0, max(len(users), 1), MEMBER_CHUNK_SIZE):
+            self._reply(conn, {
+                "type": MSG_MEMBER_CHUNK,
+                "channel": channel_name,
+                "users": [{"username": u, "status": "online"} for u in users[start:start + MEMBER_CHUNK_SIZE]],
+                "last": start + MEMBER_CHUNK_SIZE >= len(users),
+            })
+
+    def _handle_channel_history(self, conn, args):
+        """Send a channel's history without joining it (used for prefetch)."""
+        channel_name = args["channel"]
+        channel = self.db.get_channel_by_name(channel_name) if channel_name else None
+        if not channel:
+            self._send_error(conn, "not_found", f"Channel '{channel_name}' not found.")
+            return
+
+        since_id = args["since_id"]
+        limit = self._history_limit()
+        history_msgs = self._history_entries(channel["id"], since_id, limit)
+        reply = {
+            "type": MSG_CHANNEL_HISTORY,
+            "channel": channel_name,
+            "history": history_msgs,
+        }
+        if since_id is not None:
+            reply["since_id"] = since_id
+        if since_id is not None or limit < MESSAGE_HISTORY_LIMIT:
+            reply["complete"] = len(history_msgs) < limit
+        self._reply(conn, reply)
+
+    def _history_limit(self) -> int:
+        """History page size; smaller while the server is shedding load."""
+        limit = self.overload.history_limit(MESSAGE_HISTORY_LIMIT)
+        if limit < MESSAGE_HISTORY_LIMIT:
+            self.metrics.shed.inc("history")
+        return limit
+
+    def _history_entries(self, channel_id: int, since_id: int | None = None,
+                         limit: int = MESSAGE_HISTORY_LIMIT) -> list[dict]:
+        history = self.db.get_message_history(channel_id, limit=limit, since_id=since_id)
+        return [self._history_entry(h) for h in history]
+
+    @staticmethod
+    def _history_entry(row: dict) -> dict:
+        entry = {
+            "sender": row["username"],
+            "content": row["content"],
+            "timestamp": row["created_at"],
+            "msg_type": row["msg_type"],
+            "id": row["id"],
+        }
+        entities = parse_entities(row["content"])
+        if entities:
+            entry["entities"] = entities
+        return entry
+
+    def _handle_channel_leave(self, conn, args, silent=False):
+        channel_name = args["channel"]
         if not channel_name:
             return
 
@@ -354,14 +699,9 @@ class ChatServer:
                 "username": conn.username,
             })
 
-    def _handle_channel_create(self, conn, msg):
-        name = msg.get("name", "").strip().lower()
-        description = msg.get("description", "").strip()
-
-        ok, err = validate_channel_name(name)
-        if not ok:
-            self._send_error(conn, "invalid", err)
-            return
+    def _handle_channel_create(self, conn, args):
+        name = args["name"]
+        description = args["description"]
 
         channel_id = self.db.create_channel(name, description, conn.user_id)
         if not channel_id:
@@ -375,25 +715,18 @@ class ChatServer:
             "channel": channel,
         })
 
-    def _handle_channel_list(self, conn):
+    def _handle_channel_list(self, conn, args=None):
         channels = self.db.list_channels()
-        self._send(conn, {
+        self._reply(conn, {
             "type": MSG_CHANNEL_INFO,
             "channels": [{"id": c["id"], "name": c["name"], "description": c["description"]} for c in channels],
         })
 
     # --- Chat handlers ---
 
-    def _handle_message(self, conn, msg):
-        content = msg.get("content", "")
-        channel = msg.get("channel", conn.current_channel)
-
-        ok, err = validate_message(content)
-        if not ok:
-            self._send_error(conn, "invalid", err)
-            return
-
-        content = sanitize_content(content)
+    def _handle_message(self, conn, args):
+        content = args["content"]
+        channel = args["channel"] or conn.current_channel
 
         if not channel:
             self._send_error(conn, "no_channel", "You must join a channel first.")
@@ -404,69 +737,66 @@ class ChatServer:
             self._send_error(conn, "not_found", f"Channel '{channel}' not found.")
             return
 
+        entities = parse_entities(content)
+        trace = conn.trace
+        if trace:
+            trace.mark_validated()
+
         timestamp = datetime.now(timezone.utc).isoformat()
         msg_id = self.db.save_message(ch["id"], conn.user_id, content, "message")
+        if trace:
+            trace.mark_persisted()
 
-        self._broadcast_to_channel(channel, {
+        out = {
             "type": MSG_MESSAGE,
             "channel": channel,
             "sender": conn.username,
             "content": content,
             "timestamp": timestamp,
             "id": msg_id,
-        })
-
-    def _handle_private_message(self, conn, msg):
-        to_user = msg.get("to", "").strip()
-        content = msg.get("content", "")
+        }
+        if entities:
+            out["entities"] = entities
+        if trace and trace.opt_in:
+            out["trace"] = trace.wire_field()
+        self._broadcast_to_channel(channel, out, trace=trace)
 
-        ok, err = validate_message(content)
-        if not ok:
-            self._send_error(conn, "invalid", err)
-            return
-
-        content = sanitize_content(content)
+    def _handle_private_message(self, conn, args):
+        to_user = args["to"]
+        content = args["content"]
 
         # Find target user
-        target_conn = None
-        with self.lock:
-            for c in self.clients.values():
-                if c.authenticated and c.username and c.username.lower() == to_user.lower():
-                    target_conn = c
-                    break
-
+        target_conn = self.clients.find_user(to_user)
         if not target_conn:
             self._send_error(conn, "not_found", f"User '{to_user}' not found or offline.")
             return
 
+        entities = parse_entities(content)
+        trace = conn.trace
+        if trace:
+            trace.mark_validated()
+
         timestamp = datetime.now(timezone.utc).isoformat()
 
         # Send to target
-        self._send(target_conn, {
+        out = {
             "type": MSG_PRIVATE_MESSAGE,
             "from": conn.username,
             "content": content,
             "timestamp": timestamp,
-        })
+        }
+        if entities:
+            out["entities"] = entities
+        echo = dict(out, to=to_user)
+        if trace and trace.opt_in:
+            out["trace"] = trace.wire_field()
+        self._send(target_conn, out, trace)
         # Echo back to sender
-        self._send(conn, {
-            "type": MSG_PRIVATE_MESSAGE,
-            "from": conn.username,
-            "to": to_user,
-            "content": content,
-            "timestamp": timestamp,
-        })
-
-    def _handle_action(self, conn, msg):
-        content = msg.get("content", "")
-        channel = msg.get("channel", conn.current_channel)
-
-        ok, err = validate_message(content)
-        if not ok:
-            self._send_error(conn, "invalid", err)
-            return
+        self._reply(conn, echo)
 
-        content = sanitize_content(content)
+    def _handle_action(self, conn, args):
+        content = args["content"]
+        channel = args["channel"] or conn.current_channel
 
         if not channel:
             self._send_error(conn, "no_channel", "You must join a channel first.")
@@ -476,23 +806,43 @@ class ChatServer:
         if not ch:
             return
 
+        entities = parse_entities(content)
+        trace = conn.trace
+        if trace:
+            trace.mark_validated()
+
         timestamp = datetime.now(timezone.utc).isoformat()
-        self.db.save_message(ch["id"], conn.user_id, content, "action")
+        msg_id = self.db.save_message(ch["id"], conn.user_id, content, "action")
+        if trace:
+            trace.mark_persisted()
 
-        self._broadcast_to_channel(channel, {
+        out = {
             "type": MSG_ACTION,
             "channel": channel,
             "sender": conn.username,
             "content": content,
             "timestamp": timestamp,
-        })
-
-    def _handle_user_list(self, conn, msg):
-        channel = msg.get("channel", conn.current_channel)
+            "id": msg_id,
+        }
+        if entities:
+            out["entities"] = entities
+        if trace and trace.opt_in:
+            out["trace"] = trace.wire_field()
+        self._broadcast_to_channel(channel, out, trace=trace)
+
+    def _handle_user_list(self, conn, args):
+        channel = args["channel"] or conn.current_channel
         if not channel:
             return
+        if self.overload.shed_presence():
+            self.metrics.shed.inc("user_list")
+            self._reply(conn, {
+                "type": MSG_ERROR, "code": "overloaded", "message": "Server is busy; member list not refreshed.",
+                "retry_after": self.overload.retry_after(),
+            })
+            return
         users = self.channel_mgr.get_users(channel)
-        self._send(conn, {
+        self._reply(conn, {
             "type": MSG_USER_LIST,
             "channel": channel,
             "users": [{"username": u, "status": "online"} for u in users],
@@ -0,0 +1,94 @@
+"""Registry of connected clients with lock-free reads.
+
+Broadcasts, PM lookups and gauges run far more often than accepts and
+drops, so the registry is copy-on-write: writers take a lock, build new
+containers and publish them in one attribute assignment; readers take the
+current snapshot without locking and iterate it while writers publish
+newer ones. A snapshot is never modified after it is published.
+
+Each write copies the registry, O(connections), which is cheap next to
+the per-broadcast list building it replaces.
+"""
+
+import threading
+
+
+class Snapshot:
+    """An immutable view of the connected clients."""
+
+    __slots__ = ("conns", "members", "users")
+
+    def __init__(self, conns: dict, members: tuple, users: dict):
+        self.conns = conns      # sock -> ClientConnection, every connection
+        self.members = members  # authenticated connections, in login order
+        self.users = users      # lowercase username -> most recent connection
+
+
+_EMPTY = Snapshot({}, (), {})
+
+
+class ClientRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()  # serializes writers only
+        self._snapshot = _EMPTY
+
+    def snapshot(self) -> Snapshot:
+        return self._snapshot
+
+    def __len__(self) -> int:
+        return len(self._snapshot.conns)
+
+    def members(self) -> tuple:
+        """Authenticated connections."""
+        return self._snapshot.members
+
+    def find_user(self, username: str):
+        """The connection of an online user (case-insensitive), or None."""
+        return self._snapshot.users.get(username.lower())
+
+    def add(self, conn):
+        with self._lock:
+            snap = self._snapshot
+            conns = dict(snap.conns)
+            conns[conn.sock] = conn
+            self._snapshot = Snapshot(conns, snap.members, snap.users)
+
+    def login(self, conn):
+        """Publish `conn` as authenticated, after its username is set."""
+        with self._lock:
+            snap = self._snapshot
+            if conn.sock not in snap.conns or conn in snap.members:
+                return
+            users = dict(snap.users)
+            users[conn.username.lower()] = conn
+            self._snapshot = Snapshot(snap.conns, snap.members + (conn,), users)
+
+    def remove(self, conn) -> bool:
+        """Unregister `conn`. Returns False if it was already removed."""
+        with self._lock:
+            snap = self._snapshot
+            if snap.conns.get(conn.sock) is not conn:
+                return False
+            conns = dict(snap.conns)
+            del conns[conn.sock]
+            members, users = snap.members, snap.users
+            if conn in members:
+                members = tuple(c for c in members if c is not conn)
+                key = conn.username.lower()
+                if users.get(key) is conn:
+                    users = dict(users)
+                    # Fall back to another session of the same user, if any
+                    others = [c for c in members if c.username.lower() == key]
+                    if others:
+                        users[key] = others[-1]
+                    else:
+                        del users[key]
+            self._snapshot = Snapshot(conns, members, users)
+            return True
+
+    def clear(self) -> list:
+        """Unregister everything; returns the connections that were registered."""
+        with self._lock:
+            conns = list(self._snapshot.conns.values())
+            self._snapshot = _EMPTY
+            return conns
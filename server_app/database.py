@@ -1,15 +1,34 @@
 """SQLite database wrapper for the chat application."""
 
+import functools
 import sqlite3
 import threading
+import time
 from datetime import datetime, timedelta, timezone
 
 from shared.constants import DEFAULT_CHANNEL, SESSION_EXPIRY_HOURS
 
 
+def _timed(method):
+    """Record the call's latency in the database's metrics, if any."""
+    name = method.__name__
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self.metrics is None:
+            return method(self, *args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            self.metrics.db_seconds.observe(name, time.perf_counter() - start)
+    return wrapper
+
+
 class Database:
-    def __init__(self, db_path: str):
+    def __init__(self, db_path: str, metrics=None):
         self.db_path = db_path
+        self.metrics = metrics
         self._lock = threading.Lock()
         self._init_schema()
 
@@ -70,6 +89,7 @@ class Database:
 
     # --- Users ---
 
+    @_timed
     def create_user(self, username: str, password_hash: str) -> bool:
         with self._lock:
             conn = self._get_conn()
@@ -85,6 +105,7 @@ class Database:
             finally:
                 conn.close()
 
+    @_timed
     def get_user_by_username(self, username: str) -> dict | None:
         conn = self._get_conn()
         try:
@@ -96,8 +117,21 @@ class Database:
         finally:
             conn.close()
 
+    @_timed
+    def get_user_by_id(self, user_id: int) -> dict | None:
+        conn = self._get_conn()
+        try:
+            row = conn.execute(
+                "SELECT id, username, created_at FROM users WHERE id = ?",
+                (user_id,),
+            ).fetchone()
+            return dict(row) if row else None
+        finally:
+            conn.close()
+
     # --- Channels ---
 
+    @_timed
     def create_channel(self, name: str, description: str, created_by: int) -> int | None:
         with self._lock:
             conn = self._get_conn()
@@ -113,6 +147,7 @@ class Database:
             finally:
                 conn.close()
 
+    @_timed
     def get_channel_by_name(self, name: str) -> dict | None:
         conn = self._get_conn()
         try:
@@ -124,6 +159,7 @@ class Database:
         finally:
             conn.close()
 
+    @_timed
     def list_channels(self) -> list[dict]:
         conn = self._get_conn()
         try:
@@ -136,6 +172,7 @@ class Database:
 
     # --- Messages ---
 
+    @_timed
     def save_message(self, channel_id: int, user_id: int, content: str, msg_type: str = "message") -> int:
         with self._lock:
             conn = self._get_conn()
@@ -149,25 +186,84 @@ class Database:
             finally:
                 conn.close()
 
-    def get_message_history(self, channel_id: int, limit: int = 50) -> list[dict]:
+    @_timed
+    def get_message_history(self, channel_id: int, limit: int = 50, since_id: int | None = None) -> list[dict]:
+        """Most recent `limit` messages, optionally only those with id > since_id."""
         conn = self._get_conn()
         try:
-            rows = conn.execute(
-                """SELECT m.id, m.content, m.msg_type, m.created_at, u.username
-                   FROM messages m
-                   JOIN users u ON m.user_id = u.id
-                   WHERE m.channel_id = ?
-                   ORDER BY m.created_at DESC
-                   LIMIT ?""",
-                (channel_id, limit),
-            ).fetchall()
+            if since_id is None:
+                rows = conn.execute(
+                    """SELECT m.id, m.content, m.msg_type, m.created_at, u.username
+                       FROM messages m
+                       JOIN users u ON m.user_id = u.id
+                       WHERE m.channel_id = ?
+                       ORDER BY m.created_at DESC
+                       LIMIT ?""",
+                    (channel_id, limit),
+                ).fetchall()
+            else:
+                rows = conn.execute(
+                    """SELECT m.id, m.content, m.msg_type, m.created_at, u.username
+                       FROM messages m
+                       JOIN users u ON m.user_id = u.id
+                       WHERE m.channel_id = ? AND m.id > ?
+                       ORDER BY m.id DESC
+                       LIMIT ?""",
+                    (channel_id, since_id, limit),
+                ).fetchall()
             # Return in chronological order
             return [dict(r) for r in reversed(rows)]
         finally:
             conn.close()
 
+    def iter_message_history(self, channel_id: int, limit: int = 50, since_id: int | None = None,
+                             batch_size: int = 25):
+        """Yield the most recent `limit` messages newest first, in lists of at
+        most `batch_size` rows fetched with fetchmany.
+
+        The connection stays open until the generator is exhausted or
+        closed, so consume it promptly. Only time spent in the database is
+        recorded in the metrics.
+        """
+        elapsed = 0.0
+        start = time.perf_counter()
+        conn = self._get_conn()
+        try:
+            if since_id is None:
+                cursor = conn.execute(
+                    """SELECT m.id, m.content, m.msg_type, m.created_at, u.username
+                       FROM messages m
+                       JOIN users u ON m.user_id = u.id
+                       WHERE m.channel_id = ?
+                       ORDER BY m.created_at DESC
+                       LIMIT ?""",
+                    (channel_id, limit),
+                )
+            else:
+                cursor = conn.execute(
+                    """SELECT m.id, m.content, m.msg_type, m.created_at, u.username
+                       FROM messages m
+                       JOIN users u ON m.user_id = u.id
+                       WHERE m.channel_id = ? AND m.id > ?
+                       ORDER BY m.id DESC
+                       LIMIT ?""",
+                    (channel_id, since_id, limit),
+                )
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                elapsed += time.perf_counter() - start
+                if not rows:
+                    return
+                yield [dict(r) for r in rows]
+                start = time.perf_counter()
+        finally:
+            conn.close()
+            if self.metrics is not None:
+                self.metrics.db_seconds.observe("iter_message_history", elapsed)
+
     # --- Sessions ---
 
+    @_timed
     def create_session(self, token: str, user_id: int):
         expires = datetime.now(timezone.utc) + timedelta(hours=SESSION_EXPIRY_HOURS)
         with self._lock:
@@ -181,6 +277,7 @@ class Database:
             finally:
                 conn.close()
 
+    @_timed
     def validate_session(self, token: str) -> int | None:
         conn = self._get_conn()
         try:
@@ -0,0 +1,54 @@
+"""Parallel fan-out of one encoded frame to many connections.
+
+A broadcast to a large channel is split into shards of `shard_size`
+recipients. The calling thread writes the first shard itself while a
+small thread pool writes the rest, and the call returns once every shard
+is done, so each recipient still sees broadcasts in the order they were
+made. Socket writes (and TLS encryption) release the GIL, so the shards
+overlap where a single thread would pay for every recipient in turn.
+
+Recipient sets of one shard or less never touch the pool.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+FANOUT_WORKERS = min(4, os.cpu_count() or 1)
+SHARD_SIZE = 256  # recipients written by one thread
+
+
+def write_shard(targets, data: bytes, lane: int, trace=None) -> list:
+    """Queue `data` on each target's outbound queue; returns the
+    connections that failed."""
+    dead = []
+    for c in targets:
+        try:
+            c.outbound.push(data, lane, trace)
+        except Exception:
+            dead.append(c)
+    return dead
+
+
+class FanoutPool:
+    """Writes large recipient sets in parallel shards."""
+
+    def __init__(self, workers: int = FANOUT_WORKERS, shard_size: int = SHARD_SIZE):
+        self.shard_size = max(1, shard_size)
+        self._executor = ThreadPoolExecutor(workers, thread_name_prefix="fanout") if workers > 0 else None
+
+    def deliver(self, targets, data: bytes, lane: int, trace=None) -> list:
+        """Write `data` to every target; returns the connections that failed.
+        Each copy's socket write is recorded on `trace` if given."""
+        if self._executor is None or len(targets) <= self.shard_size:
+            return write_shard(targets, data, lane, trace)
+        size = self.shard_size
+        shards = [targets[i:i + size] for i in range(0, len(targets), size)]
+        futures = [self._executor.submit(write_shard, shard, data, lane, trace) for shard in shards[1:]]
+        dead = write_shard(shards[0], data, lane, trace)
+        for f in futures:
+            dead += f.result()
+        return dead
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
@@ -0,0 +1,260 @@
+"""In-process metrics with a Prometheus text-format HTTP endpoint.
+
+Counters and histograms are cheap enough to leave on permanently: each
+record is a dict lookup and a couple of integer adds under a short lock.
+Gauges are computed lazily from callbacks when the endpoint is scraped.
+"""
+
+import bisect
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Latency buckets in seconds (upper bounds, +Inf is implicit)
+DEFAULT_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+    0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+)
+# Garbage collections are mostly far shorter than a handler
+GC_BUCKETS = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001,
+    0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Counter:
+    """Monotonic counter keyed by a single label value."""
+
+    def __init__(self, name: str, help_text: str, label: str = ""):
+        self.name = name
+        self.help_text = help_text
+        self.label = label
+        self._values: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, label_value: str = "", amount: float = 1):
+        with self._lock:
+            self._values[label_value] = self._values.get(label_value, 0) + amount
+
+    def value(self, label_value: str = "") -> float:
+        return self._values.get(label_value, 0)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for label_value, value in items:
+            if self.label:
+                lines.append(f'{self.name}{{{self.label}="{_escape(label_value)}"}} {value}')
+            else:
+                lines.append(f"{self.name} {value}")
+        return lines
+
+
+class Histogram:
+    """Fixed-bucket latency histogram keyed by a single label value."""
+
+    def __init__(self, name: str, help_text: str, label: str = "", buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label = label
+        self.buckets = tuple(buckets)
+        self._series: dict[str, list] = {}  # label value -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, label_value: str, seconds: float):
+        idx = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._series.get(label_value)
+            if series is None:
+                series = self._series[label_value] = [0] * (len(self.buckets) + 3)
+            series[idx] += 1
+            series[-2] += seconds
+            series[-1] += 1
+
+    def count(self, label_value: str = "") -> int:
+        series = self._series.get(label_value)
+        return series[-1] if series else 0
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._series.items())
+        for label_value, series in items:
+            prefix = f'{self.label}="{_escape(label_value)}",' if self.label else ""
+            cumulative = 0
+            for bound, n in zip(self.buckets, series):
+                cumulative += n
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+            cumulative += series[len(self.buckets)]
+            lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {cumulative}')
+            label_part = f"{{{prefix.rstrip(',')}}}" if prefix else ""
+            lines.append(f"{self.name}_sum{label_part} {series[-2]}")
+            lines.append(f"{self.name}_count{label_part} {series[-1]}")
+        return lines
+
+
+class Gauge:
+    """Gauge whose values are read from a callback at scrape time.
+
+    The callback returns either a number or a dict of label value -> number.
+    """
+
+    def __init__(self, name: str, help_text: str, callback, label: str = ""):
+        self.name = name
+        self.help_text = help_text
+        self.label = label
+        self._callback = callback
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} gauge"]
+        try:
+            values = self._callback()
+        except Exception:
+            return lines
+        if isinstance(values, dict):
+            for label_value, value in sorted(values.items()):
+                lines.append(f'{self.name}{{{self.label}="{_escape(label_value)}"}} {value}')
+        else:
+            lines.append(f"{self.name} {values}")
+        return lines
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered together in Prometheus text format."""
+
+    def __init__(self):
+        self._metrics = []
+        self._hooks = []  # callables run before each render
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, help_text: str, label: str = "") -> Counter:
+        return self._register(Counter(name, help_text, label))
+
+    def histogram(self, name: str, help_text: str, label: str = "", buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, label, buckets))
+
+    def gauge(self, name: str, help_text: str, callback, label: str = "") -> Gauge:
+        return self._register(Gauge(name, help_text, callback, label))
+
+    def before_render(self, callback):
+        """Run `callback()` before every render, to fold in data gathered
+        where taking a metric's lock is unsafe."""
+        with self._lock:
+            self._hooks.append(callback)
+
+    def _register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics)
+            hooks = list(self._hooks)
+        for hook in hooks:
+            hook()
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class ServerMetrics(MetricsRegistry):
+    """The chat server's standard metric set."""
+
+    def __init__(self):
+        super().__init__()
+        self.frames_in = self.counter(
+            "chat_frames_in_total", "Frames received from clients by message type.", "type")
+        self.frames_out = self.counter(
+            "chat_frames_out_total", "Frames sent to clients by message type.", "type")
+        self.frames_rejected = self.counter(
+            "chat_frames_rejected_total", "Client frames with an invalid field by message type.", "type")
+        self.handler_seconds = self.histogram(
+            "chat_handler_seconds", "Time spent handling a client frame by message type.", "type")
+        self.db_seconds = self.histogram(
+            "chat_db_seconds", "Database call latency by method.", "method")
+        self.broadcast_seconds = self.histogram(
+            "chat_broadcast_seconds", "Fan-out time for broadcasts by scope.", "scope")
+        self.trace_seconds = self.histogram(
+            "chat_trace_seconds", "Sampled per-message latency by pipeline stage.", "stage")
+        self.outbound_wait_seconds = self.histogram(
+            "chat_outbound_wait_seconds", "Sampled wait of the oldest frame in an outbound write by lane.", "lane")
+        self.sched_wait_seconds = self.histogram(
+            "chat_sched_wait_seconds", "Time a frame waits for a worker after it is read.")
+        self.gc_pause_seconds = self.histogram(
+            "chat_gc_pause_seconds", "Garbage collection pauses by generation.", "generation", GC_BUCKETS)
+        self.gc_collected = self.counter(
+            "chat_gc_collected_total", "Objects freed by the garbage collector by generation.", "generation")
+        self.shed = self.counter(
+            "chat_shed_total", "Work skipped by overload shedding by kind.", "kind")
+
+
+class MetricsHTTPServer:
+    """Serves a registry at /metrics on a background thread.
+
+    Extra GET routes can be added to `routes`, and routes that change
+    server state to `post_routes`, so crawlers and scrapers cannot trigger
+    them (path -> callable returning a (status, body) tuple). A request
+    with the other method gets 405.
+    """
+
+    def __init__(self, registry: MetricsRegistry, host: str = "127.0.0.1", port: int = 9100):
+        self.registry = registry
+        self.routes = {"/metrics": lambda: (200, registry.render())}
+        self.post_routes = {}
+
+        routes = self.routes
+        post_routes = self.post_routes
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                self._respond(routes, post_routes, "POST")
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                if length:
+                    self.rfile.read(length)  # request bodies are ignored
+                self._respond(post_routes, routes, "GET")
+
+            def _respond(self, own, other, other_method):
+                path = self.path.split("?", 1)[0]
+                route = own.get(path)
+                allow = None
+                if route is not None:
+                    status, body = route()
+                elif path in other:
+                    status, body, allow = 405, "method not allowed\n", other_method
+                else:
+                    status, body = 404, "not found\n"
+                data = body.encode("utf-8")
+                self.send_response(status)
+                if allow:
+                    self.send_header("Allow", allow)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer((host, port), _Handler)
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def port(self) -> int:
+        return self._httpd.server_address[1]
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
@@ -0,0 +1,362 @@
+"""Per-connection outbound queues with priority lanes.
+
+Every frame for a connection goes through its OutboundQueue. Frames are
+sorted into lanes (control, chat, presence, bulk) and written highest lane
+first, so a live chat message never waits behind a queued history page or
+a burst of presence updates.
+
+There is no writer thread per connection. Whichever thread queues a frame
+while nobody is writing becomes the writer and drains the queue, batching
+small frames into one send; threads that queue while a write is in
+progress return at once and leave their frame to that writer. This also
+keeps frames from different threads from interleaving on the socket.
+
+Server sockets are non-blocking, so that writer never waits on a slow
+peer. When the kernel will take no more, the unsent rest of the batch and
+the writing role pass to one shared background thread, which waits on all
+such sockets with a selector and resumes each queue once its socket is
+writable. A peer that accepts nothing for WRITE_STALL_TIMEOUT is
+disconnected. Blocking sockets still work: their sends simply wait.
+
+A lane's deque exists only while it holds frames, so an idle connection
+carries no queue storage.
+"""
+
+import selectors
+import socket
+import sys
+import threading
+import time
+from collections import deque
+
+from shared.constants import (
+    MSG_AUTH_RESULT, MSG_ERROR, MSG_SYSTEM,
+    MSG_CHANNEL_JOINED, MSG_CHANNEL_CREATED, MSG_CHANNEL_INFO,
+    MSG_CHANNEL_HISTORY, MSG_HISTORY_CHUNK, MSG_MEMBER_CHUNK,
+    MSG_MESSAGE, MSG_PRIVATE_MESSAGE, MSG_ACTION,
+    MSG_USER_LIST, MSG_USER_JOINED, MSG_USER_LEFT, MSG_STATUS_CHANGE,
+)
+
+LANE_CONTROL, LANE_CHAT, LANE_PRESENCE, LANE_BULK = range(4)
+LANE_NAMES = ("control", "chat", "presence", "bulk")
+
+# Frames of one stream must share a lane to stay in order: member_chunk
+# travels with user_joined/user_left so presence edits apply to the list.
+LANES = {
+    MSG_AUTH_RESULT: LANE_CONTROL,
+    MSG_ERROR: LANE_CONTROL,
+    MSG_SYSTEM: LANE_CONTROL,
+    MSG_CHANNEL_JOINED: LANE_CONTROL,
+    MSG_CHANNEL_CREATED: LANE_CONTROL,
+    MSG_CHANNEL_INFO: LANE_CONTROL,
+    MSG_MESSAGE: LANE_CHAT,
+    MSG_PRIVATE_MESSAGE: LANE_CHAT,
+    MSG_ACTION: LANE_CHAT,
+    MSG_USER_LIST: LANE_PRESENCE,
+    MSG_USER_JOINED: LANE_PRESENCE,
+    MSG_USER_LEFT: LANE_PRESENCE,
+    MSG_STATUS_CHANGE: LANE_PRESENCE,
+    MSG_MEMBER_CHUNK: LANE_PRESENCE,
+    MSG_HISTORY_CHUNK: LANE_BULK,
+    MSG_CHANNEL_HISTORY: LANE_BULK,
+}
+
+MAX_BATCH_BYTES = 64 * 1024         # frames combined into one sendall
+MAX_QUEUED_BYTES = 4 * 1024 * 1024  # a client this far behind is dropped
+UNSENT_LOW_WATER = 16 * 1024        # unsent bytes the kernel may hold per socket
+WRITE_STALL_TIMEOUT = 60.0          # seconds a peer may accept nothing before it is dropped
+
+# Not exported by the socket module on every Python version
+_TCP_NOTSENT_LOWAT = getattr(socket, "TCP_NOTSENT_LOWAT", 25 if sys.platform.startswith("linux") else None)
+
+
+def _blocked_on(exc: BaseException):
+    """The selector event a failed non-blocking send has to wait for, or
+    None if `exc` is a real error. A TLS send may need to read first."""
+    if isinstance(exc, BlockingIOError):
+        return selectors.EVENT_WRITE
+    ssl = sys.modules.get("ssl")  # loaded by then if any socket uses TLS
+    if ssl is not None:
+        if isinstance(exc, ssl.SSLWantWriteError):
+            return selectors.EVENT_WRITE
+        if isinstance(exc, ssl.SSLWantReadError):
+            return selectors.EVENT_READ
+    return None
+
+
+def lane_for(msg_type: str) -> int:
+    return LANES.get(msg_type, LANE_CONTROL)
+
+
+def limit_unsent(sock, nbytes: int = UNSENT_LOW_WATER):
+    """Keep at most about `nbytes` of unsent data in the kernel for `sock`.
+
+    Without this the kernel's autotuned send buffer (megabytes) takes whole
+    history streams in FIFO order and the lanes have nothing to reorder.
+    Ignored where TCP_NOTSENT_LOWAT is unavailable.
+    """
+    if _TCP_NOTSENT_LOWAT is None:
+        return
+    try:
+        sock.setsockopt(socket.IPPROTO_TCP, _TCP_NOTSENT_LOWAT, nbytes)
+    except OSError:
+        pass
+
+
+class OutboundQueue:
+    """Prioritized send queue for one socket."""
+
+    __slots__ = ("sock", "max_bytes", "_on_written", "_lanes", "_queued", "_lock", "_writing", "_unsent",
+                 "_written", "closed")
+
+    def __init__(self, sock, on_written=None, max_bytes: int = MAX_QUEUED_BYTES):
+        self.sock = sock
+        self.max_bytes = max_bytes
+        self._on_written = on_written  # callback(lane, seconds its oldest frame queued) per written batch
+        self._lanes = [None] * len(LANE_NAMES)  # deque of (bytes, enqueue time, trace) while non-empty
+        self._queued = [0] * len(LANE_NAMES)  # bytes per lane
+        self._lock = threading.Lock()
+        self._writing = False
+        self._unsent = None   # rest of a batch the socket would not take, while parked
+        self._written = None  # (lane, enqueue time, trace) of each frame in that batch
+        self.closed = False
+
+    def push(self, data: bytes, lane: int = LANE_CONTROL, trace=None):
+        """Queue an encoded frame and, unless another thread is already
+        writing, write out the queue. A MessageTrace given as `trace` is
+        told when the frame has been written (or dropped).
+
+        Raises:
+            ConnectionError: If the queue is closed or over its byte limit.
+            OSError: If this thread's send fails; the queue is then closed.
+        """
+        self.push_many((data,), lane, trace)
+
+    def push_many(self, frames, lane: int, trace=None):
+        """Queue several frames of one lane before writing any of them, so
+        frames in higher lanes can still go out between them."""
+        size = sum(len(data) for data in frames)
+        with self._lock:
+            if self.closed:
+                raise ConnectionError("Connection closed")
+            if sum(self._queued) + size > self.max_bytes:
+                self._close()
+                raise ConnectionError("Outbound queue full")
+            now = time.perf_counter()
+            if self._lanes[lane] is None:
+                self._lanes[lane] = deque()
+            self._lanes[lane].extend((data, now, trace) for data in frames)
+            self._queued[lane] += size
+            if trace is not None:
+                for _ in frames:
+                    trace.write_queued()
+            if self._writing:
+                return
+            self._writing = True
+        self._drain()
+
+    def queued_bytes(self) -> list[int]:
+        """Bytes waiting per lane."""
+        return list(self._queued)
+
+    def close(self):
+        """Discard queued frames. Call before closing the socket, so the
+        background writer lets go of it first."""
+        with self._lock:
+            self._close()
+
+    def _close(self):
+        self.closed = True
+        for frames in self._lanes:
+            if frames is not None:
+                _drop_traces(frames)
+        if self._written is not None:
+            _drop_traces(self._written)
+        self._lanes = [None] * len(LANE_NAMES)
+        self._queued = [0] * len(LANE_NAMES)
+        self._unsent = self._written = None
+        _writer.release(self)
+
+    def _drain(self):
+        """Send queued frames until the queue is empty or the socket would
+        block; in that case the background writer resumes the drain."""
+        unsent = written = None
+        if self._unsent is not None:  # resumed by the background writer
+            with self._lock:  # close() may drop the parked batch meanwhile
+                unsent, written = self._unsent, self._written
+                self._unsent = self._written = None
+        try:
+            while True:
+                if unsent is None:
+                    with self._lock:
+                        batch = self._take_batch()
+                        if not batch:
+                            self._writing = False
+                            return
+                    unsent = memoryview(b"".join(data for _, data, _, _ in batch))
+                    written = [(lane, queued_at, trace) for lane, _, queued_at, trace in batch]
+                try:
+                    sent = self.sock.send(unsent)
+                except OSError as e:
+                    event = _blocked_on(e)
+                    if event is None:
+                        raise
+                    # TLS must retry with the same buffer, so keep it whole
+                    self._park(unsent, written, event)
+                    return
+                if sent < len(unsent):
+                    unsent = unsent[sent:]
+                    continue
+                unsent = None
+                now = time.perf_counter()
+                seen = None
+                done, written = written, None
+                for lane, queued_at, trace in done:
+                    # The batch is in lane order, so each lane's first frame is its oldest
+                    if lane != seen and self._on_written is not None:
+                        self._on_written(lane, now - queued_at)
+                        seen = lane
+                    if trace is not None:
+                        trace.write_done(now)
+        except BaseException:
+            with self._lock:
+                self._writing = False
+                if written is not None:
+                    _drop_traces(written)
+                self._close()
+            raise
+
+    def _park(self, unsent, written, event: int):
+        """Leave the rest of the drain to the background writer."""
+        with self._lock:
+            if self.closed:
+                self._writing = False
+                _drop_traces(written)
+                return
+            self._unsent, self._written = unsent, written
+            # Under the lock, so a concurrent close() cannot release the
+            # socket before it is registered
+            _writer.park(self, event)
+
+    def _take_batch(self) -> list[tuple]:
+        """Pop frames in lane order up to MAX_BATCH_BYTES. At most one bulk
+        frame is taken per batch, so anything queued meanwhile in a higher
+        lane goes out before the next one."""
+        batch = []
+        size = 0
+        for lane, frames in enumerate(self._lanes):
+            if frames is None:
+                continue
+            while frames and (not batch or size + len(frames[0][0]) <= MAX_BATCH_BYTES):
+                data, queued_at, trace = frames.popleft()
+                self._queued[lane] -= len(data)
+                size += len(data)
+                batch.append((lane, data, queued_at, trace))
+                if lane == LANE_BULK:
+                    break
+            if not frames:
+                self._lanes[lane] = None
+            if frames or lane == LANE_BULK:
+                break
+        return batch
+
+
+def _drop_traces(entries):
+    """Tell the traces among queued or in-flight frames that their copy
+    will never be written."""
+    for entry in entries:
+        if entry[-1] is not None:
+            entry[-1].write_done(None)
+
+
+class _BackgroundWriter:
+    """One thread that finishes the drains of queues whose sockets would
+    block, so no worker ever waits on a slow peer.
+
+    A parked queue keeps its writing role; its socket is registered with a
+    selector until it is ready, then the drain continues on this thread
+    (and parks again if the peer is still behind). A queue parked for
+    longer than WRITE_STALL_TIMEOUT is closed and its socket shut down,
+    which ends the connection's reader and so drops the client.
+    """
+
+    def __init__(self, stall_timeout: float = WRITE_STALL_TIMEOUT):
+        self.stall_timeout = stall_timeout
+        self._selector = None
+        self._parked = {}  # OutboundQueue -> monotonic time parked
+        self._lock = threading.Lock()
+        self._wake_r = self._wake_w = None
+
+    def park(self, queue: OutboundQueue, event: int):
+        """Resume `queue`'s drain once its socket is ready for `event`."""
+        with self._lock:
+            if self._selector is None:
+                self._start()
+            self._parked[queue] = time.monotonic()
+            try:
+                self._selector.register(queue.sock, event, queue)
+            except KeyError:
+                # A socket closed while registered left its descriptor
+                # number behind, and the new socket reuses it
+                self._selector.unregister(queue.sock)
+                self._selector.register(queue.sock, event, queue)
+        try:
+            self._wake_w.send(b"\0")  # select() may not see sockets added meanwhile
+        except OSError:
+            pass  # wakeup already pending
+
+    def release(self, queue: OutboundQueue) -> bool:
+        """Stop waiting on `queue`'s socket; False if it was not parked."""
+        with self._lock:
+            if self._parked.pop(queue, None) is None:
+                return False
+            try:
+                self._selector.unregister(queue.sock)
+            except (KeyError, ValueError):
+                pass
+            return True
+
+    def _start(self):
+        self._selector = selectors.DefaultSelector()
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self._wake_w.setblocking(False)
+        self._selector.register(self._wake_r, selectors.EVENT_READ)
+        threading.Thread(target=self._run, name="outbound-writer", daemon=True).start()
+
+    def _run(self):
+        while True:
+            for key, _ in self._selector.select(min(self.stall_timeout, 1.0)):
+                queue = key.data
+                if queue is None:
+                    try:
+                        self._wake_r.recv(4096)
+                    except OSError:
+                        pass
+                elif self.release(queue):  # else closed meanwhile
+                    self._resume(queue)
+            self._expire()
+
+    def _resume(self, queue: OutboundQueue):
+        try:
+            queue._drain()
+        except Exception:
+            _shutdown(queue.sock)  # the drain closed the queue; wake the reader
+
+    def _expire(self):
+        deadline = time.monotonic() - self.stall_timeout
+        with self._lock:
+            stalled = [queue for queue, parked_at in self._parked.items() if parked_at < deadline]
+        for queue in stalled:
+            queue.close()
+            _shutdown(queue.sock)
+
+
+def _shutdown(sock):
+    try:
+        sock.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass
+
+
+_writer = _BackgroundWriter()
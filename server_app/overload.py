@@ -0,0 +1,113 @@
+"""Server-wide overload detection and staged load shedding.
+
+The controller averages handler latency and outbound queue delay over
+short windows and compares them against budgets. The worse of the two
+ratios ("pressure") selects a stage; each stage sheds everything the
+previous one did, plus one more kind of work:
+
+    1  shrink_history   history pages are cut to SHRUNK_HISTORY_LIMIT
+    2  drop_presence    presence broadcasts and user-list refreshes are dropped
+    3  defer_logins     password logins and registrations (bcrypt) are
+                        refused with a retry hint; session resumes still work
+
+Escalation is immediate. De-escalation is one stage at a time and only
+after pressure has stayed well below the current stage's entry level for
+a cooldown period, so the server does not flap at a threshold.
+"""
+
+import random
+import threading
+import time
+
+STAGE_NORMAL, STAGE_SHRINK_HISTORY, STAGE_DROP_PRESENCE, STAGE_DEFER_LOGINS = range(4)
+STAGE_NAMES = ("normal", "shrink_history", "drop_presence", "defer_logins")
+STAGE_PRESSURE = (0.0, 1.0, 2.0, 4.0)  # pressure at which each stage is entered
+
+HANDLER_BUDGET = 0.050   # seconds, mean handler latency per window
+QUEUE_BUDGET = 0.250     # seconds, mean outbound queue delay per window
+WINDOW = 1.0             # seconds per evaluation
+COOLDOWN = 5.0           # seconds of calm before stepping down a stage
+EXIT_RATIO = 0.5         # calm means pressure below this fraction of the stage's entry level
+SHRUNK_HISTORY_LIMIT = 15
+RETRY_AFTER = 5.0        # base login retry hint in seconds; replies add up to 100% jitter
+
+
+class OverloadController:
+    """Picks a shedding stage from recent handler latency and queue delay."""
+
+    def __init__(self, handler_budget: float = HANDLER_BUDGET, queue_budget: float = QUEUE_BUDGET,
+                 window: float = WINDOW, cooldown: float = COOLDOWN, on_change=None, clock=time.monotonic):
+        self.handler_budget = handler_budget
+        self.queue_budget = queue_budget
+        self.window = window
+        self.cooldown = cooldown
+        self._on_change = on_change  # callback(old stage, new stage, pressure)
+        self._clock = clock
+
+        self.stage = STAGE_NORMAL
+        self.pressure = 0.0
+        self._lock = threading.Lock()
+        self._handler = [0.0, 0]  # sum, count in the current window
+        self._queue = [0.0, 0]
+        self._window_start = clock()
+        self._calm_since = None
+
+    def observe_handler(self, seconds: float):
+        with self._lock:
+            self._handler[0] += seconds
+            self._handler[1] += 1
+            self._maybe_evaluate()
+
+    def observe_queue(self, seconds: float):
+        with self._lock:
+            self._queue[0] += seconds
+            self._queue[1] += 1
+            self._maybe_evaluate()
+
+    def current_stage(self) -> int:
+        """The stage in effect, re-evaluated if a window has passed."""
+        with self._lock:
+            self._maybe_evaluate()
+            return self.stage
+
+    def history_limit(self, limit: int) -> int:
+        if self.current_stage() >= STAGE_SHRINK_HISTORY:
+            return min(limit, SHRUNK_HISTORY_LIMIT)
+        return limit
+
+    def shed_presence(self) -> bool:
+        return self.current_stage() >= STAGE_DROP_PRESENCE
+
+    def defer_logins(self) -> bool:
+        return self.current_stage() >= STAGE_DEFER_LOGINS
+
+    def retry_after(self) -> float:
+        """A jittered retry hint, so deferred clients do not return together."""
+        return round(RETRY_AFTER * (1 + random.random()), 1)
+
+    def _maybe_evaluate(self):
+        now = self._clock()
+        if now - self._window_start < self.window:
+            return
+        handler = self._handler[0] / self._handler[1] if self._handler[1] else 0.0
+        queue = self._queue[0] / self._queue[1] if self._queue[1] else 0.0
+        self._handler = [0.0, 0]
+        self._queue = [0.0, 0]
+        self._window_start = now
+
+        self.pressure = max(handler / self.handler_budget, queue / self.queue_budget)
+        target = sum(1 for level in STAGE_PRESSURE[1:] if self.pressure >= level)
+        old = self.stage
+        if target > self.stage:
+            self.stage = target
+            self._calm_since = None
+        elif target < self.stage and self.pressure < STAGE_PRESSURE[self.stage] * EXIT_RATIO:
+            if self._calm_since is None:
+                self._calm_since = now
+            elif now - self._calm_since >= self.cooldown:
+                self.stage -= 1
+                self._calm_since = now  # the next step down needs its own cooldown
+        else:
+            self._calm_since = None
+        if self.stage != old and self._on_change is not None:
+            self._on_change(old, self.stage, self.pressure)
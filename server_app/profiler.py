@@ -0,0 +1,141 @@
+"""On-demand sampling profiler producing collapsed stacks for flamegraphs.
+
+A background thread periodically snapshots every thread's stack with
+sys._current_frames() and counts identical stacks. Output uses the
+collapsed format understood by flamegraph.pl and speedscope:
+
+    <tag>;<outermost frame>;...;<innermost frame> <count>
+
+The tag is the message type the thread was handling when sampled.
+"""
+
+import os
+import sys
+import threading
+import time
+
+IDLE_TAG = "idle"
+
+
+class SamplingProfiler:
+    """Samples thread stacks at `hz` while running.
+
+    tag_lookup: callable(thread_ident) -> str | None giving the message
+        type a thread is currently handling (None means idle).
+    include_idle: also record threads that are not handling a message.
+    max_overhead: fraction of wall time the sampler may spend sampling;
+        the interval stretches automatically when sampling gets expensive.
+    max_stacks: cap on distinct stacks kept, to bound memory.
+    """
+
+    def __init__(self, hz: float = 100, tag_lookup=None, include_idle: bool = False,
+                 max_depth: int = 64, max_overhead: float = 0.05, max_stacks: int = 50_000):
+        self.interval = 1.0 / max(1.0, min(hz, 1000.0))
+        self.tag_lookup = tag_lookup or (lambda ident: None)
+        self.include_idle = include_idle
+        self.max_depth = max_depth
+        self.max_overhead = max_overhead
+        self.max_stacks = max_stacks
+        self._counts: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._labels = {}  # code object -> frame label
+        self.samples = 0
+        self.dropped = 0
+        self.started_at = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> bool:
+        """Start sampling. Returns False if already running."""
+        if self.running:
+            return False
+        self._stop.clear()
+        self.started_at = time.time()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self) -> str:
+        """Stop sampling and return the collapsed stacks collected so far."""
+        if self._thread:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        return self.collapsed()
+
+    def toggle(self, output_dir: str = ".") -> str | None:
+        """Start if stopped; otherwise stop, write the profile and return its path."""
+        if not self.running:
+            self.reset()
+            self.start()
+            return None
+        self.stop()
+        return self.write(os.path.join(output_dir, time.strftime("profile-%Y%m%d-%H%M%S.collapsed")))
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+            self.samples = 0
+            self.dropped = 0
+
+    def collapsed(self) -> str:
+        with self._lock:
+            items = sorted(self._counts.items())
+        return "".join(f"{stack} {count}\n" for stack, count in items)
+
+    def write(self, path: str) -> str:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.collapsed())
+        return path
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            filename = os.path.basename(code.co_filename)
+            label = self._labels[code] = f"{code.co_name} ({filename}:{code.co_firstlineno})"
+        return label
+
+    def _sample(self, own_ident: int):
+        frames = sys._current_frames()
+        stacks = []
+        for ident, frame in frames.items():
+            if ident == own_ident:
+                continue
+            tag = self.tag_lookup(ident)
+            if tag is None:
+                if not self.include_idle:
+                    continue
+                tag = IDLE_TAG
+            parts = []
+            depth = 0
+            while frame is not None and depth < self.max_depth:
+                parts.append(self._label(frame.f_code))
+                frame = frame.f_back
+                depth += 1
+            parts.append(tag)
+            parts.reverse()
+            stacks.append(";".join(parts))
+        del frames
+
+        with self._lock:
+            self.samples += 1
+            for stack in stacks:
+                if stack in self._counts:
+                    self._counts[stack] += 1
+                elif len(self._counts) < self.max_stacks:
+                    self._counts[stack] = 1
+                else:
+                    self.dropped += 1
+
+    def _run(self):
+        own_ident = threading.get_ident()
+        while not self._stop.is_set():
+            start = time.perf_counter()
+            self._sample(own_ident)
+            cost = time.perf_counter() - start
+            # Keep sampling cost under max_overhead of wall time.
+            self._stop.wait(max(self.interval, cost / self.max_overhead - cost))
@@ -1,28 +1,43 @@
-"""Per-user rate limiting using a sliding window."""
+"""Per-user rate limiting using a sliding window.
+
+The last `max_messages` send times are kept in a fixed ring (an array of
+floats) instead of a growing list. Since sends are recorded in time order,
+the slot about to be overwritten always holds the oldest one, so a check
+is a single comparison. The ring is allocated on the first send, so a
+connection that never chats holds none.
+"""
 
 import time
+from array import array
 
 
 class RateLimiter:
+    __slots__ = ("max_messages", "window_seconds", "_times", "_next")
+
     def __init__(self, max_messages: int = 5, window_seconds: float = 1.0):
         self.max_messages = max_messages
         self.window_seconds = window_seconds
-        self._timestamps: list[float] = []
+        self._times = None  # ring of the last max_messages send times
+        self._next = 0  # ring slot of the oldest send
 
-    def is_allowed(self) -> bool:
-        """Check if a message is allowed under the rate limit.
+    def is_allowed(self, cost: int = 1) -> bool:
+        """Check if a message worth `cost` messages is allowed under the
+        rate limit.
 
-        Returns True if allowed (and records the timestamp).
+        Returns True if allowed (and records the timestamps).
         Returns False if rate limited.
         """
+        if cost > self.max_messages:
+            return False
         now = time.monotonic()
-        cutoff = now - self.window_seconds
-
-        # Remove expired timestamps
-        self._timestamps = [t for t in self._timestamps if t > cutoff]
-
-        if len(self._timestamps) >= self.max_messages:
+        times = self._times
+        if times is None:
+            times = self._times = array("d", [float("-inf")]) * self.max_messages
+        # The cost-th oldest send must have left the window
+        first = self._next
+        if times[(first + cost - 1) % self.max_messages] > now - self.window_seconds:
             return False
-
-        self._timestamps.append(now)
+        for i in range(cost):
+            times[(first + i) % self.max_messages] = now
+        self._next = (first + cost) % self.max_messages
         return True
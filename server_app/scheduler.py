@@ -0,0 +1,125 @@
+"""Fair scheduling of client frames over a shared worker pool.
+
+Each connection's reader thread only parses frames and submits them to the
+connection's inbox. A fixed pool of workers serves inboxes by deficit
+round-robin: an inbox earns `quantum` credits per turn and runs frames
+while it has credit for them, expensive request types costing more than
+chat. An inbox is served by one worker at a time, so frames of one
+connection are still handled in order. A flooding connection therefore
+gets the same share of the workers as any other busy connection, and its
+reader blocks once `max_pending` frames are waiting, which pushes back on
+the client through TCP.
+
+As in FQ-CoDel, an inbox that was idle joins a "new" queue that is served
+before the round-robin of backlogged inboxes, so a client sending the
+occasional request does not wait a full round behind every flooder. It
+moves to the back of the round-robin if it is still busy after its turn.
+"""
+
+import threading
+from collections import deque
+
+WORKERS = 8
+QUANTUM = 4          # credits an inbox earns per turn
+MAX_PENDING = 256    # frames queued per connection before its reader blocks
+
+
+class Inbox:
+    """Frames waiting for one connection."""
+
+    __slots__ = ("frames", "deficit", "scheduled")
+
+    def __init__(self):
+        self.frames = None  # deque of (item, cost) while the inbox is scheduled
+        self.deficit = 0
+        self.scheduled = False  # in the ready queue or being served
+
+
+class FairScheduler:
+    """Deficit round-robin over inboxes, served by `workers` threads.
+
+    `handler(item)` is called on a worker for each submitted item.
+    """
+
+    def __init__(self, handler, workers: int = WORKERS, quantum: int = QUANTUM, max_pending: int = MAX_PENDING):
+        self.handler = handler
+        self.workers = workers
+        self.quantum = quantum
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._work = threading.Condition(self._lock)
+        self._space = threading.Condition(self._lock)  # readers waiting on a full inbox
+        self._new: deque[Inbox] = deque()    # inboxes that were idle
+        self._ready: deque[Inbox] = deque()  # backlogged inboxes
+        self._threads = []
+        self._running = False
+        self.pending = 0  # frames queued across all inboxes
+
+    def start(self):
+        self._running = True
+        for i in range(self.workers):
+            t = threading.Thread(target=self._run, name=f"worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def stop(self):
+        with self._lock:
+            self._running = False
+            self._work.notify_all()
+            self._space.notify_all()
+        self._threads.clear()
+
+    def inbox(self) -> Inbox:
+        return Inbox()
+
+    def submit(self, inbox: Inbox, item, cost: int = 1) -> bool:
+        """Queue `item`, blocking while the inbox is full. Returns False if
+        the scheduler has stopped."""
+        with self._lock:
+            while inbox.frames and len(inbox.frames) >= self.max_pending and self._running:
+                self._space.wait(1.0)
+            if not self._running:
+                return False
+            if inbox.frames is None:
+                inbox.frames = deque()
+            inbox.frames.append((item, cost))
+            self.pending += 1
+            if not inbox.scheduled:
+                inbox.scheduled = True
+                self._new.append(inbox)
+                self._work.notify()
+            return True
+
+    def _run(self):
+        while True:
+            with self._lock:
+                while not (self._new or self._ready) and self._running:
+                    self._work.wait()
+                if not self._running:
+                    return
+                inbox = (self._new or self._ready).popleft()
+                inbox.deficit += self.quantum
+                was_full = len(inbox.frames) >= self.max_pending
+                batch = []
+                while inbox.frames and inbox.frames[0][1] <= inbox.deficit:
+                    item, cost = inbox.frames.popleft()
+                    inbox.deficit -= cost
+                    batch.append(item)
+                self.pending -= len(batch)
+                if was_full and batch:
+                    self._space.notify_all()
+
+            for item in batch:
+                try:
+                    self.handler(item)
+                except Exception as e:
+                    print(f"[SERVER] Worker error: {e}")
+
+            with self._lock:
+                if inbox.frames:
+                    self._ready.append(inbox)  # back of the line
+                    self._work.notify()
+                else:
+                    inbox.scheduled = False
+                    inbox.deficit = 0
+                    inbox.frames = None  # idle inboxes hold no deque
@@ -0,0 +1,128 @@
+"""Per-message latency tracing through receive, validate, persist and fan-out.
+
+A sampled subset of chat frames (plus any frame the client opts in with a
+"trace" field) gets a MessageTrace. Handlers stamp it with monotonic times
+as the message moves through the server. Each delivered copy is stamped by
+the outbound queue once its socket write has completed, which may be on
+another thread after the handler returns; the stage durations go into the
+trace histogram of the metrics registry once the handler is done and
+every queued copy has been written or dropped.
+"""
+
+import random
+import threading
+import time
+
+
+class MessageTrace:
+    """Monotonic timestamps for one message's trip through the server."""
+
+    __slots__ = ("received", "received_wall", "validated", "persisted",
+                 "first_write", "last_write", "writes", "client_ts", "opt_in",
+                 "_pending", "_on_done", "_lock")
+
+    def __init__(self, received: float, client_ts=None, opt_in: bool = False):
+        self.received = received
+        self.received_wall = time.time() - (time.perf_counter() - received)
+        self.validated = None
+        self.persisted = None
+        self.first_write = None
+        self.last_write = None
+        self.writes = 0
+        self.client_ts = client_ts
+        self.opt_in = opt_in
+        self._pending = 1  # queued copies not yet written, plus one for the handler
+        self._on_done = None
+        self._lock = threading.Lock()
+
+    def mark_validated(self):
+        self.validated = time.perf_counter()
+
+    def mark_persisted(self):
+        self.persisted = time.perf_counter()
+
+    def write_queued(self):
+        """A copy of the message was queued for a recipient."""
+        with self._lock:
+            self._pending += 1
+
+    def write_done(self, written_at: float | None):
+        """A queued copy was written to its socket at perf_counter()
+        `written_at`, or dropped with its connection (None)."""
+        with self._lock:
+            if written_at is not None:
+                if self.first_write is None or written_at < self.first_write:
+                    self.first_write = written_at
+                if self.last_write is None or written_at > self.last_write:
+                    self.last_write = written_at
+                self.writes += 1
+            self._pending -= 1
+            done = self._on_done if self._pending == 0 else None
+        if done is not None:
+            done(self)
+
+    def handled(self, on_done):
+        """The handler has returned; call `on_done(trace)` once every
+        queued copy is written (now, if none are left)."""
+        with self._lock:
+            self._on_done = on_done
+        self.write_done(None)
+
+    def wire_field(self) -> dict:
+        """The "trace" field attached to delivered frames for opted-in messages.
+
+        Times are wall-clock seconds so clients can compare them with their
+        own clocks; durations are server-side milliseconds.
+        """
+        now = time.perf_counter()
+        field = {
+            "server_recv": round(self.received_wall, 6),
+            "server_sent": round(self.received_wall + (now - self.received), 6),
+        }
+        if self.client_ts is not None:
+            field["client_ts"] = self.client_ts
+        if self.validated is not None:
+            field["validate_ms"] = round((self.validated - self.received) * 1000, 3)
+        if self.persisted is not None:
+            field["persist_ms"] = round((self.persisted - (self.validated or self.received)) * 1000, 3)
+        return field
+
+
+class Tracer:
+    """Decides which frames to trace and records finished traces."""
+
+    def __init__(self, metrics, sample_rate: float = 0.01):
+        self.metrics = metrics
+        self.sample_rate = sample_rate
+
+    def begin(self, msg: dict, received: float) -> MessageTrace | None:
+        """Start a trace for a frame received at perf_counter() `received`.
+
+        A client opts in by sending "trace": true or "trace": <its send
+        time as epoch seconds>; opted-in frames are always traced.
+        """
+        opt_in = msg.get("trace")
+        if opt_in is not None and opt_in is not False:
+            client_ts = opt_in if isinstance(opt_in, (int, float)) and not isinstance(opt_in, bool) else None
+            return MessageTrace(received, client_ts, opt_in=True)
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            return MessageTrace(received)
+        return None
+
+    def finish(self, trace: MessageTrace):
+        """Record `trace` once its handler is done and its writes complete."""
+        trace.handled(self._record)
+
+    def _record(self, trace: MessageTrace):
+        observe = self.metrics.trace_seconds.observe
+        prev = trace.received
+        if trace.validated is not None:
+            observe("validate", trace.validated - prev)
+            prev = trace.validated
+        if trace.persisted is not None:
+            observe("persist", trace.persisted - prev)
+            prev = trace.persisted
+        if trace.first_write is not None:
+            observe("first_write", trace.first_write - prev)
+            observe("last_write", trace.last_write - prev)
+            observe("total", trace.last_write - trace.received)
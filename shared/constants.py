@@ -14,6 +14,7 @@ LISTEN_BACKLOG = 50
 MSG_AUTH_REGISTER = "auth_register"
 MSG_AUTH_LOGIN = "auth_login"
 MSG_AUTH_RESULT = "auth_result"
+MSG_AUTH_RESUME = "auth_resume"
 
 # Message types - Channels
 MSG_CHANNEL_JOIN = "channel_join"
@@ -23,6 +24,9 @@ MSG_CHANNEL_LIST = "channel_list"
 MSG_CHANNEL_INFO = "channel_info"
 MSG_CHANNEL_JOINED = "channel_joined"
 MSG_CHANNEL_CREATED = "channel_created"
+MSG_CHANNEL_HISTORY = "channel_history"  # history without joining (prefetch)
+MSG_HISTORY_CHUNK = "history_chunk"      # streamed after channel_joined, newest page first
+MSG_MEMBER_CHUNK = "member_chunk"        # streamed after the history chunks
 
 # Message types - Chat
 MSG_MESSAGE = "message"
@@ -47,6 +51,9 @@ MESSAGE_MAX_LEN = 2000
 CHANNEL_NAME_MIN_LEN = 2
 CHANNEL_NAME_MAX_LEN = 30
 MESSAGE_HISTORY_LIMIT = 50
+HISTORY_CHUNK_SIZE = 25   # messages per history_chunk frame
+HISTORY_CHUNK_BYTES = 16 * 1024  # approximate content bytes per history_chunk; long messages make smaller chunks
+MEMBER_CHUNK_SIZE = 200   # users per member_chunk frame
 
 # Rate limiting
 RATE_LIMIT_MESSAGES = 5
@@ -0,0 +1,54 @@
+"""Chat content processing: control-character stripping and markup parsing.
+
+clean() removes control characters (except newline and tab) without a
+Python-level loop. Text with no unprintable characters is returned as is
+after one C-level check. ASCII text, which usually fails that check only
+because of newlines or tabs, has its controls deleted with bytes.translate.
+Anything else goes through a compiled regex.
+
+parse() finds mentions (@name), links (http/https URLs), inline code
+(`x`) and code blocks (```x```) in one scan with a combined regex. Text
+inside code is not scanned for mentions or links. The result is a list of
+[kind, start, end] entities with offsets into the text, which the server
+attaches to chat frames so clients and other server code do not parse the
+content again. Text without '@', '`' or '://' skips the scan entirely.
+"""
+
+import re
+
+ENTITY_MENTION = "mention"
+ENTITY_LINK = "link"
+ENTITY_CODE = "code"
+ENTITY_CODE_BLOCK = "code_block"
+
+# C0 controls other than tab (\x09) and newline (\x0a)
+_CONTROL_RE = re.compile(r"[\x00-\x08\x0b-\x1f]+")
+_CONTROL_BYTES = bytes(c for c in range(32) if c not in (9, 10))
+
+# Every entity starts with one of these characters. Matching it first lets
+# the regex engine skip ahead to candidates instead of trying each branch at
+# every position; the lookbehinds then pick the branch.
+_MARKUP_RE = re.compile(
+    r"[`@h](?:"
+    r"(?<=`)(?:``(?P<code_block>.+?)```|(?P<code>[^`\n]+)`)"
+    r"|(?<=h)(?<!\wh)(?P<link>ttps?://[^\s<>`]*[^\s<>`.,;:!?)\]'\"])"
+    r"|(?<=@)(?<![\w@]@)(?P<mention>[A-Za-z0-9_]{3,20})(?!\w))",
+    re.DOTALL,
+)
+
+
+def clean(text: str) -> str:
+    """Strip control characters except newlines and tabs."""
+    if text.isprintable():
+        return text
+    if text.isascii():
+        return text.encode("ascii").translate(None, _CONTROL_BYTES).decode("ascii")
+    return _CONTROL_RE.sub("", text)
+
+
+def parse(text: str) -> list[list]:
+    """Mentions, links and code spans in `text` as [kind, start, end]."""
+    if "@" not in text and "`" not in text and "://" not in text:
+        return []
+    # Offsets are those of the whole match, so they include the markers
+    return [[m.lastgroup, m.start(), m.end()] for m in _MARKUP_RE.finditer(text)]
@@ -0,0 +1,117 @@
+"""Registry of the message types clients send to the server.
+
+Each MessageSpec declares the fields its handler reads, what a frame costs
+the fair scheduler and the per-user rate limiter, whether it needs a login,
+and the name of the server method that handles it. The field checks are
+resolved once, when the spec is built, so MessageSpec.parse() validates
+and normalizes a frame in a single pass and handlers only see clean values.
+"""
+
+from .constants import (
+    MSG_AUTH_REGISTER, MSG_AUTH_LOGIN, MSG_AUTH_RESUME,
+    MSG_CHANNEL_JOIN, MSG_CHANNEL_LEAVE, MSG_CHANNEL_CREATE, MSG_CHANNEL_LIST, MSG_CHANNEL_HISTORY,
+    MSG_MESSAGE, MSG_PRIVATE_MESSAGE, MSG_ACTION, MSG_USER_LIST,
+)
+from .content import clean
+from .validators import validate_username, validate_password, validate_message, validate_channel_name
+
+
+class FieldError(ValueError):
+    """A frame field has the wrong type or an invalid value."""
+
+
+def _validated(validator, value: str):
+    ok, err = validator(value)
+    if not ok:
+        raise FieldError(err)
+    return value
+
+
+# Field kinds: check(name, value) returns the cleaned value or raises FieldError
+def _check_str(name, value):
+    if not isinstance(value, str):
+        raise FieldError(f"'{name}' must be a string.")
+    return value
+
+
+def _check_int(name, value):
+    """Optional integer; anything else is ignored."""
+    return value if isinstance(value, int) and not isinstance(value, bool) else None
+
+
+_CHECKS = {
+    "str": _check_str,
+    "name": lambda name, value: _check_str(name, value).strip(),
+    "channel": lambda name, value: _check_str(name, value).strip().lower(),
+    "int": _check_int,
+    "username": lambda name, value: _validated(validate_username, _check_str(name, value).strip()),
+    "password": lambda name, value: _validated(validate_password, _check_str(name, value)),
+    "new_channel": lambda name, value: _validated(validate_channel_name, _check_str(name, value).strip().lower()),
+    "text": lambda name, value: clean(_validated(validate_message, _check_str(name, value))),
+}
+
+
+class MessageSpec:
+    """One client-to-server message type.
+
+    `fields` is a sequence of (name, kind, default); a missing or null
+    field takes the default, and a default of None is passed through
+    unchecked. `cost` is the frame's fair-scheduler cost and `rate_cost`
+    what it takes from the sender's rate limit.
+    """
+
+    __slots__ = ("type", "handler", "cost", "rate_cost", "login", "_fields")
+
+    def __init__(self, msg_type: str, handler: str, fields=(), cost: int = 1, rate_cost: int = 0,
+                 login: bool = True):
+        self.type = msg_type
+        self.handler = handler  # ChatServer method name, called as handler(conn, args)
+        self.cost = cost
+        self.rate_cost = rate_cost
+        self.login = login  # False for the types accepted before login
+        self._fields = tuple((name, _CHECKS[kind], default) for name, kind, default in fields)
+
+    def parse(self, msg: dict) -> dict:
+        """The declared fields of `msg`, checked and normalized.
+
+        Raises FieldError on the first invalid field.
+        """
+        args = {}
+        for name, check, default in self._fields:
+            value = msg.get(name)
+            if value is None:
+                value = default
+            args[name] = value if value is None else check(name, value)
+        return args
+
+
+CLIENT_MESSAGES = {spec.type: spec for spec in (
+    MessageSpec(MSG_AUTH_REGISTER, "_handle_register",
+                (("username", "username", ""), ("password", "password", "")), login=False),
+    MessageSpec(MSG_AUTH_LOGIN, "_handle_login",
+                (("username", "name", ""), ("password", "str", "")), login=False),
+    MessageSpec(MSG_AUTH_RESUME, "_handle_resume",
+                (("token", "str", ""), ("channel", "str", None), ("since_id", "int", None)), login=False),
+    # A join sends a history page, the member list and a broadcast
+    MessageSpec(MSG_CHANNEL_JOIN, "_handle_channel_join",
+                (("channel", "channel", ""), ("since_id", "int", None)), cost=4),
+    MessageSpec(MSG_CHANNEL_HISTORY, "_handle_channel_history",
+                (("channel", "channel", ""), ("since_id", "int", None)), cost=3),
+    MessageSpec(MSG_CHANNEL_LEAVE, "_handle_channel_leave", (("channel", "channel", ""),)),
+    MessageSpec(MSG_CHANNEL_CREATE, "_handle_channel_create",
+                (("name", "new_channel", ""), ("description", "name", "")), cost=2),
+    MessageSpec(MSG_CHANNEL_LIST, "_handle_channel_list", cost=2),
+    MessageSpec(MSG_USER_LIST, "_handle_user_list", (("channel", "str", None),), cost=2),
+    MessageSpec(MSG_MESSAGE, "_handle_message",
+                (("content", "text", ""), ("channel", "str", None)), rate_cost=1),
+    MessageSpec(MSG_PRIVATE_MESSAGE, "_handle_private_message",
+                (("content", "text", ""), ("to", "name", "")), rate_cost=1),
+    MessageSpec(MSG_ACTION, "_handle_action",
+                (("content", "text", ""), ("channel", "str", None)), rate_cost=1),
+)}
+
+
+def frame_cost(msg_type) -> int:
+    """Fair-scheduler cost of a frame; unknown types cost 1."""
+    spec = CLIENT_MESSAGES.get(msg_type) if isinstance(msg_type, str) else None
+    return spec.cost if spec is not None else 1
@@ -4,16 +4,30 @@ Wire format: [4-byte big-endian uint32 payload length][UTF-8 JSON payload]
 """
 
 import json
+import select
+import socket
 import struct
+import sys
 from .constants import ENCODING, HEADER_SIZE, MAX_MESSAGE_SIZE, RECV_BUFSIZE
 
+_HEADER = struct.Struct("!I")
+_poll = getattr(select, "poll", None)  # not on Windows
+
+
+def _would_block(exc: OSError) -> bool:
+    """True if a non-blocking recv() failed only because no data is ready."""
+    if isinstance(exc, BlockingIOError):
+        return True
+    ssl = sys.modules.get("ssl")  # loaded by then if the socket uses TLS
+    return ssl is not None and isinstance(exc, (ssl.SSLWantReadError, ssl.SSLWantWriteError))
+
 
 def encode_message(msg: dict) -> bytes:
     """Serialize a message dict to wire format (length-prefixed JSON)."""
     payload = json.dumps(msg, ensure_ascii=False).encode(ENCODING)
     if len(payload) > MAX_MESSAGE_SIZE:
         raise ValueError(f"Message payload exceeds max size ({len(payload)} > {MAX_MESSAGE_SIZE})")
-    header = struct.pack("!I", len(payload))
+    header = _HEADER.pack(len(payload))
     return header + payload
 
 
@@ -30,11 +44,25 @@ class MessageReader:
         reader = MessageReader(sock)
         for msg in reader:
             handle(msg)  # msg is a dict
+
+    Between frames the buffer is the shared empty bytes object, and an idle
+    reader waits for the socket to become readable before calling recv()
+    (which allocates its full receive buffer up front), so an idle reader
+    holds no buffer memory. Frames are consumed by advancing an offset; the
+    buffer is compacted once most of it has been consumed.
+
+    Non-blocking sockets are supported: the reader waits for data itself,
+    for at most `timeout` seconds (None waits forever). For other sockets
+    their own timeout applies.
     """
 
-    def __init__(self, sock):
+    __slots__ = ("sock", "timeout", "_buffer", "_pos")
+
+    def __init__(self, sock, timeout: float | None = None):
         self.sock = sock
-        self._buffer = b""
+        self.timeout = timeout  # used when the socket is non-blocking
+        self._buffer = b""  # bytes, or a bytearray while a frame is being assembled
+        self._pos = 0       # start of unconsumed data in _buffer
 
     def __iter__(self):
         return self
@@ -57,12 +85,62 @@ class MessageReader:
 
             # Need more data
             try:
-                chunk = self.sock.recv(RECV_BUFSIZE)
-            except OSError:
+                if not self._buffer:
+                    self._wait_readable()
+                while True:
+                    try:
+                        chunk = self.sock.recv(RECV_BUFSIZE)
+                        break
+                    except OSError as e:
+                        if not _would_block(e):
+                            raise
+                        self._wait_readable()  # non-blocking socket, or a TLS record still arriving
+            except (OSError, ValueError):
                 raise StopIteration
             if not chunk:
                 raise StopIteration
-            self._buffer += chunk
+            if self._pos == 0 and type(self._buffer) is bytearray:
+                self._buffer += chunk  # common case: the rest of a fragmented frame
+            else:
+                self._append(chunk)
+
+    def _wait_readable(self):
+        """Block until the socket has data, honouring its timeout (or the
+        reader's, for a non-blocking socket).
+
+        Raises:
+            TimeoutError: If the timeout passes first.
+        """
+        if not isinstance(self.sock, socket.socket):
+            return
+        if hasattr(self.sock, "pending") and self.sock.pending():
+            return  # TLS may hold decrypted data the kernel no longer reports
+        timeout = self.sock.gettimeout()
+        if timeout == 0:
+            timeout = self.timeout
+        elif _poll is None:
+            return  # recv() waits by itself
+        if _poll is None:
+            ready = select.select([self.sock], [], [], timeout)[0]
+        else:
+            poller = _poll()
+            poller.register(self.sock, select.POLLIN)
+            ready = poller.poll(None if timeout is None else timeout * 1000)
+        if not ready:
+            raise TimeoutError("timed out")
+
+    def _append(self, data: bytes):
+        if self._pos == len(self._buffer):
+            self._buffer = data  # nothing pending: adopt the chunk without copying
+            self._pos = 0
+            return
+        if not isinstance(self._buffer, bytearray):
+            self._buffer = bytearray(memoryview(self._buffer)[self._pos:])
+            self._pos = 0
+        elif self._pos > len(self._buffer) // 2:
+            del self._buffer[:self._pos]
+            self._pos = 0
+        self._buffer += data
 
     def _try_extract(self):
         """Try to extract a complete message from the internal buffer.
@@ -70,32 +148,45 @@ class MessageReader:
         Returns:
             Decoded message dict, or None if not enough data yet.
         """
-        if len(self._buffer) < HEADER_SIZE:
+        if len(self._buffer) - self._pos < HEADER_SIZE:
             return None
 
-        payload_len = struct.unpack("!I", self._buffer[:HEADER_SIZE])[0]
+        payload_len = _HEADER.unpack_from(self._buffer, self._pos)[0]
 
         if payload_len > MAX_MESSAGE_SIZE:
             raise ConnectionError(f"Message too large: {payload_len} bytes")
 
-        total_needed = HEADER_SIZE + payload_len
-        if len(self._buffer) < total_needed:
+        end = self._pos + HEADER_SIZE + payload_len
+        if len(self._buffer) < end:
             return None
 
-        payload = self._buffer[HEADER_SIZE:total_needed]
-        self._buffer = self._buffer[total_needed:]
+        payload = self._buffer[self._pos + HEADER_SIZE:end]
+        if end == len(self._buffer):
+            self._buffer = b""  # release the buffer between frames
+            self._pos = 0
+        else:
+            self._pos = end
         return decode_message(payload)
 
     def feed(self, data: bytes):
         """Manually feed data into the buffer (useful for testing)."""
-        self._buffer += data
+        self._append(bytes(data))
+
+    def drain(self):
+        """Yield every complete message already in the buffer without reading
+        from the socket (for callers that do their own non-blocking reads)."""
+        while True:
+            msg = self._try_extract()
+            if msg is None:
+                return
+            yield msg
 
     def pending(self) -> bool:
         """Check if there might be a complete message in the buffer."""
-        if len(self._buffer) < HEADER_SIZE:
+        if len(self._buffer) - self._pos < HEADER_SIZE:
             return False
-        payload_len = struct.unpack("!I", self._buffer[:HEADER_SIZE])[0]
-        return len(self._buffer) >= HEADER_SIZE + payload_len
+        payload_len = _HEADER.unpack_from(self._buffer, self._pos)[0]
+        return len(self._buffer) >= self._pos + HEADER_SIZE + payload_len
 
 
 def send_message(sock, msg: dict):
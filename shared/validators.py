@@ -1,6 +1,7 @@
 """Input validation and sanitization for the chat application."""
 
 import re
+from .content import clean
 from .constants import (
     USERNAME_MIN_LEN, USERNAME_MAX_LEN,
     PASSWORD_MIN_LEN,
@@ -58,6 +59,5 @@ def validate_channel_name(name: str) -> tuple[bool, str]:
     return True, ""
 
 
-def sanitize_content(text: str) -> str:
-    """Strip control characters except newlines and tabs."""
-    return "".join(ch for ch in text if ch in ('\n', '\t') or (ord(ch) >= 32))
+# Strips control characters except newlines and tabs; see shared.content
+sanitize_content = clean
@@ -0,0 +1,42 @@
+"""Tests for the load generator's frame handling."""
+
+import socket
+import threading
+import unittest
+
+from bench import loadgen
+from shared.constants import MSG_AUTH_RESULT, MSG_CHANNEL_JOINED
+from shared.protocol import MessageReader, encode_message
+
+
+class WaitForTest(unittest.TestCase):
+    def setUp(self):
+        self.server, client = socket.socketpair()
+        opts = loadgen.build_parser().parse_args(["--timeout", "1"])
+        self.user = loadgen.SimUser(0, opts, loadgen.Stats(), threading.Event(), threading.Event())
+        self.user.sock = client
+        self.user.reader = MessageReader(client)
+
+    def tearDown(self):
+        self.server.close()
+        self.user.sock.close()
+
+    def test_coalesced_frames_are_kept(self):
+        # auth_result and the login's channel_joined arrive in one read
+        self.server.sendall(encode_message({"type": MSG_AUTH_RESULT, "success": True})
+                            + encode_message({"type": MSG_CHANNEL_JOINED, "channel": "general"}))
+        self.assertIsNotNone(self.user._wait_for(MSG_AUTH_RESULT, 1.0))
+        joined = self.user._wait_for(MSG_CHANNEL_JOINED, 0.2)
+        self.assertEqual(joined, {"type": MSG_CHANNEL_JOINED, "channel": "general"})
+
+    def test_unmatched_frames_are_observed_once(self):
+        self.user.measuring.set()
+        self.server.sendall(encode_message({"type": "error", "code": "x"})
+                            + encode_message({"type": MSG_AUTH_RESULT, "success": True}))
+        self.assertIsNotNone(self.user._wait_for(MSG_AUTH_RESULT, 1.0))
+        self.assertIsNone(self.user._wait_for(MSG_CHANNEL_JOINED, 0.2))
+        self.assertEqual(self.user.stats.errors, {"x": 1})
+
+
+if __name__ == "__main__":
+    unittest.main()